@@ -49,17 +49,12 @@ A Python Tk application to view Jamf computer records.
 #
 ################################################################################
 
-# TTD: #########################################################################
-#
-#     Unify all jss calls in single generic method, something like:
-#           ('call_jss(logger, api_call)')
-#
-################################################################################
-
 from __future__ import print_function
-import base64
+import argparse
 import ConfigParser
-import inspect
+import csv
+import functools
+import getpass
 import json
 import locale
 import os
@@ -75,17 +70,313 @@ import tkMessageBox
 import ttk
 import urllib
 import urllib2
-import multiprocess
 from management_tools import loggers
 from Tkinter import *
 
+try:
+    from jamf_common import cache, client, fetch, logs, metrics, privileges, profiling, records, render, scope, startup, watchdog, worker
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    from jamf_common import cache, client, fetch, logs, metrics, privileges, profiling, records, render, scope, startup, watchdog, worker
+
+#
+# This is really important. This list contains the required rights for the fields we need to access.
+REQUIRED_PRIVILEGES = ['Read Accounts', 'Read Buildings', 'Read Computers', 'Update Computers', 'Read Departments', 'Read User', 'Update User']
+
+#
+# number of policy records requested from Jamf at once during startup
+POLICY_CONCURRENCY = fetch.DEFAULT_CONCURRENCY
+
+#
+# seconds before cached policies and profiles are refreshed in the background
+CACHE_TTL = 60 * 60
+
+#
+# change when the shape of a policy entry changes, so older caches are ignored
+POLICY_CACHE_KEY = 'policies.v3'
+
+#
+# milliseconds between updates of the Jamf call summary under the status bar
+CALL_SUMMARY_INTERVAL = 2000
+
+#
+# the parts of a computer record the report reads, the rest is never transferred
+REPORT_SUBSET = 'General&GroupsAccounts&ConfigurationProfiles&Software'
+REPORT_SECTIONS = ['groups', 'profile_ids', 'casper_packages', 'installer_packages']
+REPORT_COLUMNS = ['id', 'name', 'serial_number', 'policies', 'profiles', 'packages', 'error']
+
+#
+# computers reported between progress lines
+REPORT_PROGRESS_INTERVAL = 100
+
+
+def fetch_profiles(jamf_client, logger):
+    """
+    Fetch profile list and parse into dictionary, raises on communication errors
+    """
+    with startup.timer.phase('profiles'):
+        response = jamf_client.get('osxconfigurationprofiles')
+        response_json = json.loads(response.read())
+
+        tmp_profiles = {}
+
+        for item in response_json['os_x_configuration_profiles']:
+            tmp_profiles[item["id"]] = item["name"]
+
+    startup.timer.note(profiles=len(tmp_profiles))
+    logger.info("%s: %i profiles" % (logs.caller(), len(tmp_profiles)))
+    return tmp_profiles
+
+
+def fetch_policies(jamf_client, logger):
+    """
+    Fetch and parse every policy, raises on communication errors
+    returns the parsed policies and the number that could not be loaded
+    """
+    #
+    # communicate with Jamf and grab generic policy list
+    #
+    #             --- this is the slow bit ---
+    # communicate with Jamf and grab each individual policy record
+    #  with each record
+    #   retain name, id and if the policy applies to all computers
+    #   retain IDs of specific computers the policy applies to
+    #   retain ID's and names of computer groups the policy applies to
+    #   retain IDs of computers and names of computer groups excluded from the policy
+    #  add these values as a Policy to previously processed policies
+    # the individual records are fetched concurrently from this process,
+    #  POLICY_CONCURRENCY limits the number of requests in flight.
+    with startup.timer.phase('policy_list'):
+        response = jamf_client.get('policies')
+        response_json = json.loads(response.read())
+
+    policy_count = len(response_json['policies'])
+    startup.timer.note(policies=policy_count)
+    logger.info("%s: %i policies" % (logs.caller(), policy_count))
+
+    policy_id_list = []
+    for item in response_json['policies']:
+        policy_id_list.append(str(item['id']))
+
+    start_time = time.time()
+
+    #
+    # each record is retried on transient errors, records that still fail
+    #  come back as FetchErrors rather than ending the whole load
+    with startup.timer.phase('policy_fanout'):
+        tmp_policies = fetch.fetch_all(jamf_client, ['policies/id/' + policy_id + '/subset/general&scope' for policy_id in policy_id_list], POLICY_CONCURRENCY, logger, partial=True)
+
+    elapsed_time = time.time() - start_time
+    logger.info("%s: Elapsed time spent fetching and parsing policies." % logs.caller(), policies=policy_count, seconds=elapsed_time)
+
+    #
+    # parse once every record has been retrieved
+    #  failed records are kept as error entries, named from the policy list
+    #  with unknown scope, the error message is the last field of each entry
+    final_policies = []
+    failed_policies = 0
+    for index, item in enumerate(tmp_policies):
+        if isinstance(item, fetch.FetchError):
+            failed_policies += 1
+            tmp_name = response_json['policies'][index]['name']
+            tmp_id = response_json['policies'][index]['id']
+            final_policies.append(scope.Policy(tmp_name, tmp_id, None, [], [], [], [], str(item.cause)))
+            continue
+
+        tmp_name = item['policy']['general']['name']
+        tmp_id = item['policy']['general']['id']
+        tmp_allcomputers = item['policy']['scope']['all_computers']
+
+        tmp_scopecomputergroups = []
+        for subpolicy in item['policy']['scope']['computer_groups']:
+            tmp_scopecomputergroups.append(subpolicy['name'])
+
+        tmp_scopecomputers = []
+        for subpolicy in item['policy']['scope']['computers']:
+            tmp_scopecomputers.append(subpolicy['id'])
+
+        tmp_exclusions = item['policy']['scope'].get('exclusions', {})
+
+        tmp_excludedcomputergroups = []
+        for subpolicy in tmp_exclusions.get('computer_groups', []):
+            tmp_excludedcomputergroups.append(subpolicy['name'])
+
+        tmp_excludedcomputers = []
+        for subpolicy in tmp_exclusions.get('computers', []):
+            tmp_excludedcomputers.append(subpolicy['id'])
+
+        final_policies.append(scope.Policy(tmp_name, tmp_id, tmp_allcomputers, tmp_scopecomputers, tmp_scopecomputergroups, tmp_excludedcomputers, tmp_excludedcomputergroups, None))
+
+    if failed_policies:
+        logger.warn("%s: %i policies could not be loaded." % (logs.caller(), failed_policies))
+
+    return final_policies, failed_policies
+
+
+def expected_software(record, scope_index, jamf_profiles):
+    """
+    report row of the policies, profiles and packages display_info would show for a records.ComputerRecord
+    """
+    by_name = lambda item: item.lower()
+
+    packages = ['Casper:' + item for item in sorted(record.casper_packages, key=by_name)]
+    packages += ['Installer:' + item for item in sorted(record.installer_packages, key=by_name)]
+
+    return {
+        'id': record.id,
+        'name': record.name,
+        'serial_number': record.serial_number or '',
+        'policies': sorted(scope_index.names(scope_index.applicable(record.id, record.groups)), key=by_name),
+        'profiles': sorted([jamf_profiles[profile_id] for profile_id in record.profile_ids if profile_id in jamf_profiles], key=by_name),
+        'packages': packages,
+        'error': None,
+    }
+
+
+class ReportWriter(object):
+    """
+    Write report rows as JSON lines or CSV as they arrive
+    """
+    def __init__(self, report_file, report_format):
+        self.report_file = report_file
+        self.report_format = report_format
+        if report_format == 'csv':
+            self.writer = csv.writer(report_file)
+            self.writer.writerow(REPORT_COLUMNS)
+
+    def write(self, row):
+        if self.report_format != 'csv':
+            self.report_file.write(json.dumps(row, sort_keys=True) + '\n')
+            return
+
+        values = []
+        for column in REPORT_COLUMNS:
+            value = row[column]
+            if isinstance(value, list):
+                value = '; '.join(value)
+            elif value is None:
+                value = ''
+            values.append(unicode(value).encode('utf-8'))
+        self.writer.writerow(values)
+
+
+def report_ids(ids):
+    """
+    Jamf ids from a comma separated list, or from a file of them
+    """
+    if os.path.isfile(ids):
+        with open(ids) as ids_file:
+            ids = ids_file.read()
+
+    computer_ids = []
+    for item in re.split(r'[\s,]+', ids.strip()):
+        if not item or item.lower() == 'id':
+            continue
+        if not item.isdigit():
+            raise ValueError("Not a Jamf id: %r" % item)
+        computer_ids.append(int(item))
+    return computer_ids
+
+
+def report_computers(logger, args):
+    """
+    write the policies, profiles and packages expected on each computer without the window
+    """
+    logger.info("%s: activated" % logs.caller())
+
+    computer_ids = []
+    if args.ids:
+        try:
+            computer_ids = report_ids(args.ids)
+        except ValueError as exception_message:
+            print(exception_message, file=sys.stderr)
+            return 2
+
+    report_format = args.format or ('csv' if args.report.lower().endswith('.csv') else 'jsonl')
+
+    jamf_username = args.username or getpass.getuser()
+    jamf_password = getpass.getpass("Jamf password for %s: " % jamf_username)
+    jamf_client = client.JamfClient(args.host, jamf_username, jamf_password, logger)
+    report_cache = cache.Cache(cache.default_path('cargo_ship'), logger)
+
+    #
+    # the computer list, policies and profiles are fetched once, before any computer
+    try:
+        access, _ = privileges.authorize(jamf_client, jamf_username, jamf_password, REQUIRED_PRIVILEGES, [], report_cache, logger=logger)
+        if not access.level:
+            print("%s lacks the privileges to read computers: %s" % (jamf_username, ", ".join(access.missing)), file=sys.stderr)
+            return 1
+
+        if args.all:
+            computer_ids = [item['id'] for item in jamf_client.get_json('computers')['computers']]
+        elif args.group:
+            response_json = jamf_client.get_json('computergroups/name/' + urllib.quote(args.group, safe=''))
+            computer_ids = [item['id'] for item in response_json['computer_group']['computers']]
+
+        jamf_policies, failed_policies = fetch_policies(jamf_client, logger)
+        jamf_profiles = fetch_profiles(jamf_client, logger)
+    except urllib2.HTTPError, error:
+        if error.code == 401:
+            print("Invalid username or password.", file=sys.stderr)
+        elif error.code == 404 and args.group:
+            print("No computer group named %r." % args.group, file=sys.stderr)
+        else:
+            print("HTTP error from %s: %i %s" % (args.host, error.code, error.msg), file=sys.stderr)
+        return 1
+    except urllib2.URLError, error:
+        print("Unable to contact %s. [%s]" % (args.host, error), file=sys.stderr)
+        return 1
+
+    if failed_policies:
+        print("%i policies could not be loaded, they are missing from the report." % failed_policies, file=sys.stderr)
+    else:
+        report_cache.set(args.host, POLICY_CACHE_KEY, jamf_policies)
+        report_cache.set(args.host, 'profiles', jamf_profiles.items())
+
+    scope_index = scope.ScopeIndex(jamf_policies)
+    api_calls = ['computers/id/%i/subset/%s' % (computer_id, REPORT_SUBSET) for computer_id in computer_ids]
+
+    #
+    # records are reduced to their report row on the fetching threads,
+    #  so a full record is never held for longer than it takes to read it
+    def reduce_record(response_json):
+        return expected_software(records.ComputerRecord.from_json(response_json, REPORT_SECTIONS), scope_index, jamf_profiles)
+
+    report_file = sys.stdout if args.report == '-' else open(args.report, 'wb')
+    report_writer = ReportWriter(report_file, report_format)
+    total = len(api_calls)
+    finished = 0
+    failed = 0
+    start_time = time.time()
+    try:
+        for index, row in fetch.stream_all(jamf_client, api_calls, args.concurrency, logger, transform=reduce_record):
+            if isinstance(row, fetch.FetchError):
+                failed += 1
+                row = {'id': computer_ids[index], 'name': '', 'serial_number': '', 'policies': [], 'profiles': [], 'packages': [], 'error': str(row.cause)}
+            report_writer.write(row)
+
+            finished += 1
+            if finished % REPORT_PROGRESS_INTERVAL == 0 or finished == total:
+                report_file.flush()
+                print("[%*i/%i] %i failed" % (len(str(total)), finished, total, failed), file=sys.stderr)
+    except KeyboardInterrupt:
+        print("\nInterrupted after %i of %i computers." % (finished, total), file=sys.stderr)
+        return 130
+    finally:
+        if report_file is not sys.stdout:
+            report_file.close()
+
+    logger.info("%s: complete" % logs.caller(), computers=finished, failed=failed, seconds=time.time() - start_time)
+    print("%i computers reported, %i failed%s." % (finished - failed, failed, "" if args.report == '-' else ", in " + args.report), file=sys.stderr)
+    return 1 if failed or failed_policies else 0
+
 
 class Summarize(object):
     """
     Store keys, manipulate keys, output script and build the package
     """
 
-    def __init__(self, root, logger, jamf_hostname, jamf_username, jamf_password):
+    def __init__(self, root, logger, jamf_hostname, jamf_username, jamf_password, revalidate=False):
         """
         Initialize object and variables
         """
@@ -96,10 +387,17 @@ class Summarize(object):
         self.jamf_password = jamf_password
         self.local_jamf_id = None
 
+        self.jamf_client = client.JamfClient(jamf_hostname, jamf_username, jamf_password, logger)
+
+        #
+        # network calls made from the UI run on background threads
+        self.worker = worker.Worker(root, logger)
+
         self.computer_name_string = StringVar()
         self.fullname_string = StringVar()
         self.search_string = StringVar()
         self.status_string = StringVar()
+        self.call_summary_string = StringVar()
         self.checkin_string = StringVar()
         self.id_string = StringVar()
         self.inventory_string = StringVar()
@@ -112,12 +410,41 @@ class Summarize(object):
         self.status_normal = ttk.Style()
         self.status_normal.configure('Normal.TLabel', foreground='black')
 
+        self.cache = cache.Cache(cache.default_path('cargo_ship'), logger)
+
         #
         # These methods are time intensive based on the number of each in your database
-        self.jamf_policies = self.build_policies()
-        self.jamf_profiles = self.build_profiles()
+        #  paint from the cache when possible and revalidate once the window is up
+        with startup.timer.phase('cache_read'):
+            cache_age = self.load_cached()
+        startup.timer.note(cached=cache_age is not None)
+        if cache_age is None:
+            self.jamf_policies = self.build_policies()
+            self.jamf_profiles = self.build_profiles()
+            if not [item for item in self.jamf_policies if item.error]:
+                self.store_cached()
+
+        with startup.timer.phase('index'):
+            self.scope_index = scope.ScopeIndex(self.jamf_policies)
+
+        with startup.timer.phase('first_paint'):
+            self.build_ui()
+            self.root.update_idletasks()
+
+        if cache_age is not None:
+            if cache_age > CACHE_TTL:
+                self.refresh()
+            else:
+                self.status_string.set("Using policies and profiles cached %i minutes ago." % (cache_age / 60))
 
-        self.build_ui()
+        #
+        # access remembered from an earlier login is confirmed once the window is up
+        if revalidate:
+            self.revalidate_access()
+
+        #
+        # the startup report is written once the refresh and revalidation started above finish
+        startup.timer.painted()
 
     def build_ui(self):
         """
@@ -374,14 +701,20 @@ class Summarize(object):
         ttk.Label(self.mainframe, text="Policies:", font="TkHeadingFont").grid(column=4, row=160, sticky=EW)
         self.jamf_policies_field = ScrolledText.ScrolledText(self.mainframe, width=single_width_column, height=15, wrap='none')
         self.jamf_policies_field.grid(column=4, row=165, pady=1, padx=1)
+        self.jamf_policies_field.tag_configure("ITAL", font='monoco 12 italic')
 
         ttk.Label(self.mainframe, text="Extension Attributes:", font="TkHeadingFont").grid(column=1, row=180, sticky=W)
         self.ea_field = ScrolledText.ScrolledText(self.mainframe, width=double_width_column, height=15, wrap='none')
         self.ea_field.grid(column=1, row=185, columnspan=2, pady=1, padx=1)
+        self.ea_field.tag_configure("BOLD", font='monoco 12 bold')
+        self.ea_field.tag_configure("NORM", font='monoco 12 normal')
+        self.ea_field.tag_configure("ITAL", font='monoco 12 italic')
 
         ttk.Label(self.mainframe, text="Packages:", font="TkHeadingFont").grid(column=3, row=180, sticky=W)
         self.package_field = ScrolledText.ScrolledText(self.mainframe, width=double_width_column, height=15, wrap='none')
         self.package_field.grid(column=3, row=185, columnspan=2, pady=1, padx=1)
+        self.package_field.tag_configure("BOLD", font='monoco 12 bold')
+        self.package_field.tag_configure("NORM", font='monoco 12 normal')
 
         ttk.Separator(self.mainframe, orient=HORIZONTAL).grid(row=290, columnspan=35, sticky=EW)
 
@@ -390,21 +723,39 @@ class Summarize(object):
         self.status_label = ttk.Label(self.mainframe, textvariable=self.status_string)
         self.status_label.grid(column=1, row=300, sticky=W, columnspan=50)
 
+        #
+        # Jamf call count and latency, double-click to log every endpoint
+        self.call_summary_label = ttk.Label(self.mainframe, textvariable=self.call_summary_string, foreground='gray')
+        self.call_summary_label.grid(column=1, row=310, sticky=W, columnspan=50)
+        self.call_summary_label.bind('<Double-Button-1>', self.log_call_report)
+        self.update_call_summary()
+
+        #
+        # shown while Jamf is being queried, escape cancels the lookup
+        self.busy_bar = ttk.Progressbar(self.mainframe, mode='indeterminate', length=60)
+        self.busy_bar.grid(column=3, row=300, sticky=W)
+        self.worker.set_indicator(self.busy_bar)
+        self.root.bind('<Escape>', self.cancel_queries)
+
+        self.refresh_button = ttk.Button(self.mainframe, text="Refresh", command=self.refresh)
+        self.refresh_button.grid(column=3, row=300, sticky=E)
+
         ttk.Button(self.mainframe, text="Quit", command=self.root.destroy).grid(column=4, row=300, sticky=E)
 
     def search_string_jamf(self):
         """
         This method handles searching Jamf with a string
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
-        def double_click(*event):
+        def double_click(event):
             """
             handle clicks
             """
 
             #
             # when a click occurs, parse out ID from string and call query method
+            listbox = event.widget
             selected = listbox.get(listbox.curselection())
             trim_select = re.search(r'\((.*)\)', selected).group(1)
 
@@ -422,14 +773,14 @@ class Summarize(object):
                 self.query_jamf_id()
                 self.status_label.configure(style='Normal.TLabel')
                 self.status_string.set("Searched for ID.")
-                self.logger.info("%s: searched for ID: %r" % (inspect.stack()[0][3], self.id_string.get()))
+                self.logger.info("%s: searched for ID: %r" % (logs.caller(), self.id_string.get()))
             else:
-                self.logger.error("%s: No search string" % inspect.stack()[0][3])
+                self.logger.error("%s: No search string" % logs.caller())
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("No search string entered.")
 
         else:
-            self.logger.info("%s: searched for string: %r" % (inspect.stack()[0][3], self.search_string.get()))
+            self.logger.info("%s: searched for string: %r" % (logs.caller(), self.search_string.get()))
 
             #
             # erase previous displayed values
@@ -437,160 +788,100 @@ class Summarize(object):
 
             #
             # encode special characters included in search string
-            url = self.jamf_hostname + '/JSSResource/computers/match/' + urllib.quote('*' + self.search_string.get() + '*')
-            self.logger.info("%s: searched with url: %r" % (inspect.stack()[0][3], url))
+            api_call = 'computers/match/' + urllib.quote('*' + self.search_string.get() + '*')
+            self.logger.info("%s: searched with url: %r" % (logs.caller(), self.jamf_client.url(api_call)))
 
             #
-            # communicate with Jamf server
-            try:
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-                response = urllib2.urlopen(request)
-                try:
-                    response_json = json.loads(response.read())
-                except Exception as exception_message:
-                    self.logger.error("issue parsing JSON: %r" % exception_message)
-                    return
+            # communicate with Jamf server, show_matches is called with the result
+            def show_matches(response_json):
                 #
-                # a non-200 response is bad, report and return
-                if response.code != 200:
-                    self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("%i returned." % response.code)
-                    return
+                # begin parsing data returned from Jamf
+                self.status_label.configure(style='Normal.TLabel')
+                self.status_string.set("%i matches returned." % len(response_json['computers']))
+                self.logger.info("%s: %r" % (logs.caller(), self.status_string.get()))
 
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 400:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
-                elif error.code == 401:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
-                elif error.code == 403:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
-                elif error.code == 404:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
-                elif error.code == 409:
-                    contents = error.read()
-                    error_message = re.findall(r"Error: (.*)<", contents)
-                    print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
-                else:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-                return
-            except urllib2.URLError, error:
-                self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error contacting JSS.")
-                return
-            except Exception as exception_message:
-                self.logger.error("%s: Error querying Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error querying Jamf. [%s]" % exception_message)
-                return
+                search_font = tkFont.Font(font='TkDefaultFont')
+                match_results = []
+                max_length = 0
+                #
+                # parse each returned computer element, retaining Jamf ID and Computer name
+                # properly format value to display
+                # build a version of the computer name used to sort by
+                #  these rules are for our environment and may have no effect in yours.
+                #  if the name is in the format "labmac-1" the integer is expanded to -0001
+                #  if the name is in the format "[lost] labmac-1" the sorting name is stored as
+                #    "labmac-1a" to differentiate it from "labmac-1"
+                # the values are added to a list containing the previously processed values as
+                #   [sorting name, computer name, jamf id]
+                for node in response_json['computers']:
+                    match_id = node['id']
+                    match_name = node['name']
+                    if not match_name:
+                        match_name = "Not named."
+
+                    name_trim = match_name
 
-            #
-            # begin parsing data returned from Jamf
-            self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("%i matches returned." % len(response_json['computers']))
-            self.logger.info("%s: %r" % (inspect.stack()[0][3], self.status_string.get()))
+                    try:
+                        number_part = re.search(r'(\d+)', name_trim).group(1)
+                        number_free = "".join([i for i in name_trim if not i.isdigit()])
+                        expanded_number = '{:04d}'.format(int(number_part))
+                        expanded_x = number_free + expanded_number
+                        name_trim = expanded_x
+                    except:
+                        pass
 
-            search_font = tkFont.Font(font='TkDefaultFont')
-            match_results = []
-            max_length = 0
-            #
-            # parse each returned computer element, retaining Jamf ID and Computer name
-            # properly format value to display
-            # build a version of the computer name used to sort by
-            #  these rules are for our environment and may have no effect in yours.
-            #  if the name is in the format "labmac-1" the integer is expanded to -0001
-            #  if the name is in the format "[lost] labmac-1" the sorting name is stored as
-            #    "labmac-1a" to differentiate it from "labmac-1"
-            # the values are added to a list containing the previously processed values as
-            #   [sorting name, computer name, jamf id]
-            for node in response_json['computers']:
-                match_id = node['id']
-                match_name = node['name']
-                if not match_name:
-                    match_name = "Not named."
-
-                name_trim = match_name
+                    if "[" in name_trim:
+                        name_trim = re.search(r']([ -]*)(.*)', name_trim).group(2)
+                        name_trim = str(name_trim) + "a"
 
-                try:
-                    number_part = re.search(r'(\d+)', name_trim).group(1)
-                    number_free = "".join([i for i in name_trim if not i.isdigit()])
-                    expanded_number = '{:04d}'.format(int(number_part))
-                    expanded_x = number_free + expanded_number
-                    name_trim = expanded_x
-                except:
-                    pass
-
-                if "[" in name_trim:
-                    name_trim = re.search(r']([ -]*)(.*)', name_trim).group(2)
-                    name_trim = str(name_trim) + "a"
-
-                match_results.append([name_trim, match_name, match_id])
-                (string_width, string_height) = (search_font.measure(match_name + " (" + str(match_id) + ")"), search_font.metrics("linespace"))
-                if max_length < string_width:
-                    max_length = string_width
+                    match_results.append([name_trim, match_name, match_id])
+                    (string_width, string_height) = (search_font.measure(match_name + " (" + str(match_id) + ")"), search_font.metrics("linespace"))
+                    if max_length < string_width:
+                        max_length = string_width
 
-            #
-            # if there were returned results, build and display search results window
-            #
-            #
-            # position results window next to the main window, even if it has moved
-            #  from the original location
-            # while sorting the list based on the synthetic string,
-            #  display the computer name and ID
-            # bind clicks to function
-            if match_results:
+                #
+                # if there were returned results, build and display search results window
+                #
+                #
+                # position results window next to the main window, even if it has moved
+                #  from the original location
+                # while sorting the list based on the synthetic string,
+                #  display the computer name and ID
+                # bind clicks to function
+                if match_results:
 
-                search_window = Toplevel()
+                    search_window = Toplevel()
 
-                split_geom = self.root.winfo_geometry().split("+")
-                r_h = int(split_geom[0].split("x")[0])
-                r_pos_x = int(split_geom[1])
-                r_pos_y = int(split_geom[2])
-                string_width = int(max_length + 22)
+                    split_geom = self.root.winfo_geometry().split("+")
+                    r_h = int(split_geom[0].split("x")[0])
+                    r_pos_x = int(split_geom[1])
+                    r_pos_y = int(split_geom[2])
+                    string_width = int(max_length + 22)
 
-                search_window_geo = "%ix%i+%i+%i" % (string_width, 400, (r_h + r_pos_x + 10), (r_pos_y))
-                search_window.geometry(search_window_geo)
+                    search_window_geo = "%ix%i+%i+%i" % (string_width, 400, (r_h + r_pos_x + 10), (r_pos_y))
+                    search_window.geometry(search_window_geo)
 
-                search_window.title("Search results")
+                    search_window.title("Search results")
 
-                list_frame = ttk.Frame(search_window, width=string_width, height=400, padding=(4, 0, 0, 0))
+                    list_frame = ttk.Frame(search_window, width=string_width, height=400, padding=(4, 0, 0, 0))
 
-                scrollbar = Scrollbar(list_frame)
-                scrollbar.pack(side=RIGHT, fill=Y)
+                    scrollbar = Scrollbar(list_frame)
+                    scrollbar.pack(side=RIGHT, fill=Y)
 
-                listbox = Listbox(list_frame, bd=0, yscrollcommand=scrollbar.set, selectmode=SINGLE, width=190, height=400)
-                listbox.pack()
+                    listbox = Listbox(list_frame, bd=0, yscrollcommand=scrollbar.set, selectmode=SINGLE, width=190, height=400)
+                    listbox.pack()
 
-                scrollbar.config(command=listbox.yview)
+                    scrollbar.config(command=listbox.yview)
 
-                list_frame.pack()
+                    list_frame.pack()
 
-                for item in sorted(match_results):
-                    insert_string = item[1] + " (" + str(item[2]) + ")"
-                    listbox.insert(END, insert_string)
+                    for item in sorted(match_results):
+                        insert_string = item[1] + " (" + str(item[2]) + ")"
+                        listbox.insert(END, insert_string)
 
-                listbox.bind("<<ListboxSelect>>", double_click)
+                    listbox.bind("<<ListboxSelect>>", double_click)
 
-                search_window.mainloop()
+            self.worker.run('search', lambda: self.jamf_client.get_json(api_call), show_matches, functools.partial(self.report_error, logs.caller()))
 
     def build_profiles(self):
         """
@@ -603,421 +894,383 @@ class Summarize(object):
 
         #
         # communicate with Jamf server
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         try:
-            url = self.jamf_hostname + '/JSSResource/osxconfigurationprofiles'
-            request = urllib2.Request(url)
-            request.add_header('Accept', 'application/json')
-            request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-            response = urllib2.urlopen(request)
-            response_json = json.loads(response.read())
-
-            #
-            # a non-200 response is bad, report and return
-            if response.code != 200:
-                self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("%i returned." % response.code)
-                return
+            tmp_profiles = self.fetch_profiles()
 
         #
         # handle various communication errors
         except urllib2.HTTPError, error:
             if error.code == 400:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Request error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Request error.")))
             elif error.code == 401:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Authorization error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Authorization error.")))
             elif error.code == 403:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Permissions error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Permissions error.")))
             elif error.code == 404:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Resource not found."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Resource not found.")))
             elif error.code == 409:
                 contents = error.read()
                 error_message = re.findall(r"Error: (.*)<", contents)
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Resource conflict. " + error_message[0]))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Resource conflict. " + error_message[0])))
             else:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Generic error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Generic error.")))
 
             sys.exit()
         except urllib2.URLError, error:
-            self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
+            self.logger.error("%s: Error contacting JSS." % (logs.caller()))
             tkMessageBox.showerror("Error", "Error contacting JAMF server.")
             sys.exit()
         except Exception as exception_message:
-            self.logger.error("%s: Error querying Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
+            self.logger.error("%s: Error querying Jamf. [%s]" % (logs.caller(), exception_message))
             tkMessageBox.showerror("Error", ("Error querying Jamf. [%s]" % exception_message))
             sys.exit()
 
-        tmp_profiles = {}
-
-        for item in response_json['os_x_configuration_profiles']:
-            tmp_profiles[item["id"]] = item["name"]
-
-        self.logger.info("%s: %i profiles" % (inspect.stack()[0][3], len(tmp_profiles)))
-        self.logger.info("%s: complete" % inspect.stack()[0][3])
+        self.logger.info("%s: complete" % logs.caller())
         return tmp_profiles
 
+    def fetch_profiles(self):
+        """
+        Fetch profile list and parse into dictionary, raises on communication errors
+        """
+        return fetch_profiles(self.jamf_client, self.logger)
+
     def build_policies(self):
         """
         fetch and build policy data structures
         """
-        #
-        # communicate with Jamf and grab generic policy list
-        #
-        #             --- this is the slow bit ---
-        # communicate with Jamf and grab each individual policy record
-        #  with each record
-        #   retain name, id and if the policy applies to all computers
-        #   retain IDs of specific computers the policy applies to
-        #   retain ID's and names of computer groups the policy applies to
-        #  add these values as a list to previously processed policies
-        # this will not proceed quickly.
-
-        #
-        # There have to be better ways to handle this...
-        #
-        # Split off account info, to limit the number of parameters going into the mapped funtion
-        local_jamf_hostname = self.jamf_hostname
-        local_jamf_password = self.jamf_password
-        local_jamf_username = self.jamf_username
-        local_logger = self.logger
-
-        def fetch_parse_policy(this_policy):
-            """
-            pull policy from jss and parse.
-            does it make more sense to parse outside the function?!? speedwise?
-            """
-            local_logger.info("fetch_parse_policy: fetching policy #%s" % this_policy)
-
-            #
-            # communicate with Jamf server
-            try:
-                url = local_jamf_hostname + '/JSSResource/policies/id/' + this_policy + '/subset/general&scope'
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(local_jamf_username + ':' + local_jamf_password))
-
-                response = urllib2.urlopen(request)
-                response_json = json.loads(response.read())
-
-                #
-                # a non-200 response is bad, report and return
-                if response.code != 200:
-                    local_logger.error("fetch_parse_policy: Unexpected response: %i" % response.code)
-                    return None
-
-            #
-            # nowhere near enough error handling...
-            # do we really need to exit? try the policy again? Report the error when the UI is drawn?
-            # add policy to list, how? it's a single function...
-            #
-            #
-            # return the policy with the name and set an error flag in the list?
-            #   return([tmp_name, tmp_id, tmp_all, tmp_cs, tmp_cgroups, error_condition]) ?!?!?
-            # check tmp_policies at the end for error flags?
-            #   pop the bad policy off the list and note the error in the UI?
-            #   quit exit and not the error in the dialog?
-            #   have the ui check for error and color red for every machine?
-            #   parse final list for errors "error-103"?
-            #
-            #
-            #
-            except Exception as exception_message:
-                local_logger.error("fetch_parse_policy: Error querying Jamf. [%s] Exiting." % (exception_message))
-                sys.exit()
-
-            #
-            # return the whole response, postpone processing until all data retrieved
-            return response_json
-
         #
         # communicate with Jamf server
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         try:
-            url = self.jamf_hostname + '/JSSResource/policies'
-            request = urllib2.Request(url)
-            request.add_header('Accept', 'application/json')
-            request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-            response = urllib2.urlopen(request)
-            response_json = json.loads(response.read())
-
-            #
-            # a non-200 response is bad, report and return
-            if response.code != 200:
-                self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                self.status_string.set("%i returned." % response.code)
-                return
+            final_policies, failed_policies = self.fetch_policies()
 
         #
         # handle various communication errors
         except urllib2.HTTPError, error:
             if error.code == 400:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Request error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Request error.")))
             elif error.code == 401:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Authorization error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Authorization error.")))
             elif error.code == 403:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Permissions error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Permissions error.")))
             elif error.code == 404:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Resource not found."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Resource not found.")))
             elif error.code == 409:
                 contents = error.read()
                 error_message = re.findall(r"Error: (.*)<", contents)
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Resource conflict. " + error_message[0]))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Resource conflict. " + error_message[0])))
             else:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
+                self.logger.error("%s: HTTP code %i: %s" % (logs.caller(), error.code, "Generic error."))
                 tkMessageBox.showerror("Error", ("HTTP code %i: %s " % (error.code, "Generic error.")))
 
             sys.exit()
         except urllib2.URLError, error:
-            self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
+            self.logger.error("%s: Error contacting JSS." % (logs.caller()))
             tkMessageBox.showerror("Error", "Error contacting JAMF server.")
             sys.exit()
         except Exception as exception_message:
-            self.logger.error("%s: Error querying Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
+            self.logger.error("%s: Error querying Jamf. [%s]" % (logs.caller(), exception_message))
             tkMessageBox.showerror("Error", ("Error querying Jamf. [%s]" % exception_message))
             sys.exit()
 
-        tmp_policies = []
-        policy_count = len(response_json['policies'])
-        self.logger.info("%s: %i policies" % (inspect.stack()[0][3], policy_count))
-
-        policy_id_list = []
-        for item in response_json['policies']:
-            policy_id_list.append(str(item['id']))
+        if failed_policies:
+            self.status_string.set("%i policies could not be loaded, their scope is unknown." % failed_policies)
 
-        pool = multiprocess.Pool()
+        self.logger.info("%s: complete" % logs.caller())
+        return final_policies
 
-        start_time = time.time()
+    def fetch_policies(self):
+        """
+        Fetch and parse every policy, raises on communication errors
+        returns the parsed policies and the number that could not be loaded
+        """
+        return fetch_policies(self.jamf_client, self.logger)
 
-        tmp_policies = pool.map(fetch_parse_policy, policy_id_list)
+    def load_cached(self):
+        """
+        Load policies and profiles cached for this Jamf server
+        returns the age of the oldest, or None if either is missing
+        """
+        tmp_policies, policies_age = self.cache.get(self.jamf_hostname, POLICY_CACHE_KEY)
+        tmp_profiles, profiles_age = self.cache.get(self.jamf_hostname, 'profiles')
 
-        elapsed_time = time.time() - start_time
-        self.logger.info("%s: Elapsed time spent fetching and parsing policies: %r" % (inspect.stack()[0][3], elapsed_time))
+        if tmp_policies is None or tmp_profiles is None:
+            self.logger.info("%s: nothing cached for %s" % (logs.caller(), self.jamf_hostname))
+            return None
 
         #
-        # postponed processing from mapped function
-        # hoping for additional performance increases
-        final_policies = []
-        for item in tmp_policies:
-            tmp_name = item['policy']['general']['name']
-            tmp_id = item['policy']['general']['id']
-            tmp_allcomputers = item['policy']['scope']['all_computers']
-
-            tmp_scopecomputergroups = []
-            for subpolicy in item['policy']['scope']['computer_groups']:
-                tmp_scopecomputergroups.append(subpolicy['name'])
+        # json turns the integer profile ids into strings, profiles are stored as [id, name] pairs
+        self.jamf_policies = [scope.Policy(*item) for item in tmp_policies]
+        self.jamf_profiles = dict(tmp_profiles)
 
-            tmp_scopecomputers = []
-            for subpolicy in item['policy']['scope']['computers']:
-                tmp_scopecomputers.append(subpolicy['id'])
+        cache_age = max(policies_age, profiles_age)
+        self.logger.info("%s: %i policies, %i profiles, %i seconds old" % (logs.caller(), len(self.jamf_policies), len(self.jamf_profiles), cache_age))
+        return cache_age
 
-            final_policies.append([tmp_name, tmp_id, tmp_allcomputers, tmp_scopecomputers, tmp_scopecomputergroups])
-
-        self.logger.info("%s: complete" % inspect.stack()[0][3])
-        return final_policies
+    def store_cached(self):
+        """
+        Cache policies and profiles for this Jamf server
+        """
+        self.cache.set(self.jamf_hostname, POLICY_CACHE_KEY, self.jamf_policies)
+        self.cache.set(self.jamf_hostname, 'profiles', self.jamf_profiles.items())
+        self.logger.info("%s: complete" % logs.caller())
 
-    def query_jamf_me(self):
+    def refresh(self):
         """
-        Query jamf about this particular machine
+        Reload policies and profiles from Jamf without blocking the UI
         """
+        self.logger.info("%s: activated" % logs.caller())
 
-        #
-        # this method finds the UUID for the local machine
-        # query's jamf and parses the ID from the record
-        # and then calls the main query method
-        # it's wasteful the first time it's called.
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
-        if not self.local_jamf_id:
+        self.refresh_button.configure(state=DISABLED)
+        self.status_label.configure(style='Normal.TLabel')
+        self.status_string.set("Refreshing policies and profiles...")
 
-            if platform.system() == 'Darwin':
-                local_uuid_raw = subprocess.check_output(["system_profiler", "SPHardwareDataType"])
-                local_uuid = re.findall(r'Hardware UUID: (.*)', local_uuid_raw)[0]
-            elif platform.system() == 'Windows':
-                local_uuid_raw = subprocess.check_output("wmic CsProduct Get UUID")
-                local_uuid_raw = local_uuid_raw.split("\r\r\n")[1]
-                local_uuid = local_uuid_raw.split(" ")[0]
-            else:
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Missing native UUID discovery.")
-                return
+        startup_token = startup.timer.begin('refresh')
 
-            #
-            # communicate with Jamf server
+        def refresh_worker():
             try:
-                url = self.jamf_hostname + '/JSSResource/computers/udid/' + local_uuid
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
+                tmp_policies, failed_policies = self.fetch_policies()
+                tmp_profiles = self.fetch_profiles()
+                return tmp_policies, tmp_profiles, failed_policies
+            finally:
+                startup.timer.end(startup_token)
 
-                response = urllib2.urlopen(request)
-                response_json = json.loads(response.read())
+        self.worker.run('refresh', refresh_worker, self.refresh_complete, self.refresh_failed)
 
-                #
-                # a non-200 response is bad, report and return
-                if response.code != 200:
-                    self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("%i returned." % response.code)
-                    return
-
-                self.local_jamf_id = response_json['computer']['general']['id']
-                self.id_string.set(self.local_jamf_id)
-
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 400:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
-                elif error.code == 401:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
-                elif error.code == 403:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
-                elif error.code == 404:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
-                elif error.code == 409:
-                    contents = error.read()
-                    error_message = re.findall(r"Error: (.*)<", contents)
-                    print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
-                else:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-                return
-            except urllib2.URLError, error:
-                self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error contacting JSS.")
-                return
-            except Exception as exception_message:
-                self.logger.error("%s: Error querying Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error querying Jamf. [%s]" % exception_message)
-                return
-
-        else:
-            self.logger.info("%s: local jamf id %r" % (inspect.stack()[0][3], self.local_jamf_id))
-            self.id_string.set(self.local_jamf_id)
-
-        self.query_jamf_id()
-
-    def query_jamf_id(self):
+    def refresh_complete(self, result):
         """
-        Query jamf about other machine
+        Swap in refreshed policies and profiles
         """
+        tmp_policies, tmp_profiles, failed_policies = result
+
+        self.refresh_button.configure(state=NORMAL)
+
+        self.jamf_policies = tmp_policies
+        self.jamf_profiles = tmp_profiles
+        self.scope_index = scope.ScopeIndex(self.jamf_policies)
 
         #
-        # requests full record from Jamf for a specific computer
-        #  call display method and pass record
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
-        self.reset_display()
+        # redraw the current record against the new data
+        if self.id_string.get():
+            self.query_jamf_id()
 
-        if not self.id_string.get():
-            self.logger.error("%s: No JAMF ID set" % inspect.stack()[0][3])
+        if failed_policies:
             self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("No JAMF ID set.")
-            return
+            self.status_string.set("%i policies could not be loaded, their scope is unknown." % failed_policies)
         else:
-            self.logger.info("%s: Querying Jamf ID %s" % (inspect.stack()[0][3], self.id_string.get()))
+            self.store_cached()
             self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("Querying Jamf ID %s." % self.id_string.get())
+            self.status_string.set("Policies and profiles refreshed.")
 
-        #
-        # communicate with Jamf server
-        try:
-            url = self.jamf_hostname + '/JSSResource/computers/id/' + self.id_string.get()
+        self.logger.info("%s: complete" % logs.caller())
 
-            request = urllib2.Request(url)
-            request.add_header('Accept', 'application/json')
-            request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
+    def refresh_failed(self, error):
+        """
+        Keep showing cached data when a refresh fails
+        """
+        self.refresh_button.configure(state=NORMAL)
 
-            response = urllib2.urlopen(request)
-            response_json = json.loads(response.read())
-
-            #
-            # a non-200 response is bad, report and return
-            if response.code != 200:
-                self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("%i returned." % response.code)
-                return
+        self.logger.error("%s: Error refreshing from Jamf. [%s]" % (logs.caller(), error))
+        self.status_label.configure(style='Warning.TLabel')
+        self.status_string.set("Refresh failed, showing cached policies and profiles. [%s]" % error)
 
+    def report_error(self, caller, error):
+        """
+        report an error from a Jamf call in the status bar
+        """
         #
         # handle various communication errors
-        except urllib2.HTTPError, error:
+        if isinstance(error, urllib2.HTTPError):
             if error.code == 400:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Request error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
             elif error.code == 401:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Authorization error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
             elif error.code == 403:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Permissions error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
             elif error.code == 404:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Resource not found."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
             elif error.code == 409:
                 contents = error.read()
                 error_message = re.findall(r"Error: (.*)<", contents)
                 print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Resource conflict. " + error_message[0]))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
             else:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Generic error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-            return
-        except urllib2.URLError, error:
-            self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
+        elif isinstance(error, urllib2.URLError):
+            self.logger.error("%s: Error contacting JSS." % caller)
             self.status_label.configure(style='Warning.TLabel')
             self.status_string.set("Error contacting JSS.")
-            return
-        except Exception as exception_message:
-            self.logger.error("%s: Error querying Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
+        else:
+            self.logger.error("%s: Error querying Jamf. [%s]" % (caller, error))
             self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("Error querying Jamf. [%s]" % exception_message)
+            self.status_string.set("Error querying Jamf. [%s]" % error)
+
+    def update_call_summary(self):
+        """
+        show the number and latency of Jamf calls so far
+        """
+        self.call_summary_string.set(metrics.calls.summary())
+        self.root.after(CALL_SUMMARY_INTERVAL, self.update_call_summary)
+
+    def log_call_report(self, *event):
+        """
+        write the timing of every Jamf endpoint to the log
+        """
+        metrics.log_report(self.logger)
+        self.status_label.configure(style='Normal.TLabel')
+        self.status_string.set("Jamf call timings written to the log.")
+
+    def revalidate_access(self):
+        """
+        check privileges in the background, replacing the remembered access level
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        startup_token = startup.timer.begin('privileges')
+
+        def check():
+            try:
+                access = privileges.check_access(self.jamf_client, self.jamf_username, REQUIRED_PRIVILEGES, [], self.cache, self.logger, fresh=True)
+                if access.level:
+                    privileges.remember(self.cache, self.jamf_client.jamf_hostname, self.jamf_username, self.jamf_password, access)
+                else:
+                    privileges.forget(self.cache, self.jamf_client.jamf_hostname, self.jamf_username)
+                return access
+            finally:
+                startup.timer.end(startup_token)
+
+        def revalidated(access):
+            if access.level:
+                self.logger.info("revalidate_access: access confirmed.")
+            else:
+                self.logger.error("revalidate_access: User %r lacks appropriate privileges: %r" % (self.jamf_username, access.missing))
+                tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % access.missing)
+                self.root.destroy()
+
+        def failed(error):
+            self.logger.warn("revalidate_access: Unable to confirm privileges. [%s]" % error)
+
+        self.worker.run('access', check, revalidated, failed)
+
+    def cancel_queries(self, *event):
+        """
+        stop waiting on lookups in progress
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        canceled = 0
+        for key in ['query', 'search']:
+            canceled += self.worker.cancel(key)
+
+        if canceled:
+            self.status_label.configure(style='Normal.TLabel')
+            self.status_string.set("Canceled.")
+
+    def query_jamf_me(self):
+        """
+        Query jamf about this particular machine
+        """
+
+        #
+        # this method finds the UUID for the local machine
+        # query's jamf and parses the ID from the record
+        # and then calls the main query method
+        # it's wasteful the first time it's called.
+        self.logger.info("%s: activated" % logs.caller())
+        if not self.local_jamf_id:
+
+            if platform.system() not in ['Darwin', 'Windows']:
+                self.status_label.configure(style='Warning.TLabel')
+                self.status_string.set("Missing native UUID discovery.")
+                return
+
+            #
+            # system_profiler is slow, run it along with the Jamf call
+            def lookup_local_id():
+                if platform.system() == 'Darwin':
+                    local_uuid_raw = subprocess.check_output(["system_profiler", "SPHardwareDataType"])
+                    local_uuid = re.findall(r'Hardware UUID: (.*)', local_uuid_raw)[0]
+                else:
+                    local_uuid_raw = subprocess.check_output("wmic CsProduct Get UUID")
+                    local_uuid_raw = local_uuid_raw.split("\r\r\n")[1]
+                    local_uuid = local_uuid_raw.split(" ")[0]
+
+                response_json = self.jamf_client.get_json('computers/udid/' + local_uuid)
+                return response_json['computer']['general']['id']
+
+            def found_local_id(local_jamf_id):
+                self.local_jamf_id = local_jamf_id
+                self.id_string.set(self.local_jamf_id)
+                self.query_jamf_id()
+
+            self.status_label.configure(style='Normal.TLabel')
+            self.status_string.set("Looking up this computer.")
+            self.worker.run('query', lookup_local_id, found_local_id, functools.partial(self.report_error, logs.caller()))
+
+        else:
+            self.logger.info("%s: local jamf id %r" % (logs.caller(), self.local_jamf_id))
+            self.id_string.set(self.local_jamf_id)
+            self.query_jamf_id()
+
+    def query_jamf_id(self):
+        """
+        Query jamf about other machine
+        """
+
+        #
+        # requests full record from Jamf for a specific computer
+        #  call display method and pass record
+        self.logger.info("%s: activated" % logs.caller())
+        self.reset_display()
+
+        if not self.id_string.get():
+            self.logger.error("%s: No JAMF ID set" % logs.caller())
+            self.status_label.configure(style='Warning.TLabel')
+            self.status_string.set("No JAMF ID set.")
             return
+        else:
+            self.logger.info("%s: Querying Jamf ID %s" % (logs.caller(), self.id_string.get()))
+            self.status_label.configure(style='Normal.TLabel')
+            self.status_string.set("Querying Jamf ID %s." % self.id_string.get())
 
-        self.logger.info("%s: Queried Jamf ID %s" % (inspect.stack()[0][3], self.id_string.get()))
-        self.display_info(response_json)
+        #
+        # communicate with Jamf server, the record is parsed on the worker thread
+        #  and display_info is called with the result
+        api_call = 'computers/id/' + self.id_string.get()
+        self.worker.run('query', lambda: records.ComputerRecord.from_json(self.jamf_client.get_json(api_call)), self.display_info, functools.partial(self.report_error, logs.caller()))
 
-    def display_info(self, response_json):
+    def display_info(self, record):
         """
         format and display data in fields
         """
 
         #
         # performs the actual presentaion of data to the UI
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         try:
             locale.setlocale(locale.LC_ALL, 'en_US.utf8')
         except:
@@ -1034,55 +1287,43 @@ class Summarize(object):
 
         #
         # set StringVars
-        self.computer_name_string.set(response_json['computer']['general']['name'])
-        self.id_string.set(response_json['computer']['general']['id'])
-        self.fullname_string.set(response_json['computer']['location']['real_name'])
+        self.computer_name_string.set(record.name)
+        self.id_string.set(record.id)
+        self.fullname_string.set(record.real_name)
 
-        if response_json['computer']['general']['last_contact_time']:
+        if record.last_contact_time:
             self.checkin_display.config(font=('', 12, 'bold'))
-            self.checkin_string.set(response_json['computer']['general']['last_contact_time'])
+            self.checkin_string.set(record.last_contact_time)
         else:
             self.checkin_display.config(font=('', 12, 'normal italic'))
             self.checkin_string.set('No value')
 
-        if response_json['computer']['general']['report_date']:
+        if record.report_date:
             self.inventory_display.config(font=('', 12, 'bold'))
-            self.inventory_string.set(response_json['computer']['general']['report_date'])
+            self.inventory_string.set(record.report_date)
         else:
             self.inventory_display.config(font=('', 12, 'normal italic'))
             self.inventory_string.set('No value')
 
         #
-        # parse and display printers
-        raw_printers = response_json['computer']['hardware']['mapped_printers']
-        processed_printers = []
-        for item in raw_printers:
-            processed_printers.append(item['name'])
-
-        printer_display = ""
-        for index, item in enumerate(processed_printers):
-            if index == len(processed_printers):
-                printer_display += item
-            else:
-                printer_display += item + "\n"
+        # each pane is built in a TextBuffer, in display order, and rendered with a single insert
 
-        self.printer_field.insert('0.0', printer_display)
-        self.printer_field.delete(END+'-2c', END)
+        #
+        # parse and display printers
+        printer_display = render.TextBuffer()
+        for item in record.printers:
+            printer_display.add(item + "\n")
+        printer_display.render(self.printer_field)
 
         #
         # parse and display computer groups
-        raw_groups = response_json['computer']['groups_accounts']['computer_group_memberships']
         fmt_groups = []
-        for item in raw_groups:
+        for item in record.groups:
             fmt_groups.append([item.lower(), item])
-        group_display = ""
-        for index, item in enumerate(sorted(fmt_groups)):
-            if index == len(raw_groups):
-                group_display += item[1]
-            else:
-                group_display += item[1] + "\n"
-        self.group_field.insert('0.0', group_display)
-        self.group_field.delete(END+'-2c', END)
+        group_display = render.TextBuffer()
+        for item in sorted(fmt_groups):
+            group_display.add(item[1] + "\n")
+        group_display.render(self.group_field)
 
         #
         # parse and display EA's
@@ -1092,85 +1333,83 @@ class Summarize(object):
         #
         # display pass
         #  handle empty values as "No value"
-        raw_eas = response_json['computer']['extension_attributes']
         fmt_eas = []
-        for item in raw_eas:
-            fmt_eas.append([item['name'].lower(), item['name'], item['value']])
+        for item in record.extension_attributes:
+            fmt_eas.append([item.name.lower(), item.name, item.value])
 
-        for item in sorted(fmt_eas, reverse=True):
-            self.ea_field.tag_configure("BOLD", font='monoco 12 bold')
-            self.ea_field.tag_configure("NORM", font='monoco 12 normal')
-            self.ea_field.tag_configure("ITAL", font='monoco 12 italic')
+        ea_display = render.TextBuffer()
+        for item in sorted(fmt_eas):
+            ea_display.add(item[1], 'BOLD')
 
             if "\n" in item[2]:
-                self.ea_field.insert('1.0', ":" + str(item[2]), ('NORM'))
+                ea_display.add(":" + str(item[2]), 'NORM')
             elif not item[2]:
-                self.ea_field.insert('1.0', "No value\n", ('ITAL'))
-                self.ea_field.insert('1.0', ":", ('NORM'))
+                ea_display.add(":", 'NORM')
+                ea_display.add("No value\n", 'ITAL')
             else:
-                self.ea_field.insert('1.0', ":" + str(item[2]) + "\n", ('NORM'))
-
-            self.ea_field.insert('1.0', item[1], ('BOLD'))
-        self.ea_field.delete(END+'-2c', END)
+                ea_display.add(":" + str(item[2]) + "\n", 'NORM')
+        ea_display.render(self.ea_field)
 
         #
         # parse and display profiles
         # configuration_profiles section only includes ID's, no useable names
         # with list of ID's
         #  consult previously generated dictionary for names
-        raw_profiles = response_json['computer']['configuration_profiles']
-        for item in sorted(raw_profiles, reverse=True):
+        profile_display = render.TextBuffer()
+        for item in sorted(record.profile_ids):
             try:
-                self.jamf_profiles_field.insert('1.0', self.jamf_profiles[item["id"]] + "\n")
+                profile_display.add(self.jamf_profiles[item] + "\n")
             except:
                 pass
-        self.jamf_profiles_field.delete(END+'-2c', END)
+        profile_display.render(self.jamf_profiles_field)
 
         #
         # parse and display installed software
-        raw_packages = response_json['computer']['software']
-        self.package_field.tag_configure("BOLD", font='monoco 12 bold')
-        self.package_field.tag_configure("NORM", font='monoco 12 normal')
+        package_display = render.TextBuffer()
 
-        for item in sorted(raw_packages['installed_by_installer_swu'], cmp=locale.strcoll, reverse=True):
-            self.package_field.insert('1.0', ':' + item + '\n', ('NORM'))
-            self.package_field.insert('1.0', 'Installer', ('BOLD'))
+        for item in sorted(record.casper_packages, cmp=locale.strcoll):
+            package_display.add('Casper', 'BOLD')
+            package_display.add(':' + item + '\n', 'NORM')
 
-        for item in sorted(raw_packages['installed_by_casper'], cmp=locale.strcoll, reverse=True):
-            self.package_field.insert('1.0', ':' + item + '\n', ('NORM'))
-            self.package_field.insert('1.0', 'Casper', ('BOLD'))
-        self.package_field.delete(END+'-2c', END)
+        for item in sorted(record.installer_packages, cmp=locale.strcoll):
+            package_display.add('Installer', 'BOLD')
+            package_display.add(':' + item + '\n', 'NORM')
+        package_display.render(self.package_field)
 
         #
         # parse and display policies
         #
         # parsing pass
-        #  parse previously generate list of policies
+        #  consult the scope index built when the policies were loaded
         #   if the policy applies to all computers add it's name to new list
         #   if the current jamf ID appears in the list of specific computer the policy applies to, add the name to the list
         #   if one of the groups the computer belongs to appears in the list of groups the policy applies to, add it to the list
+        #   unless the computer or one of its groups is excluded from the policy
+        #   if the policy could not be loaded its scope is unknown, list it separately
         #
-        # sort and display the list.
-        valid_policies = []
-        for item in self.jamf_policies:
-            for subitem in raw_groups:
-                if subitem in item[4]:
-                    if item[0] not in valid_policies:
-                        valid_policies.append(item[0])
+        # sort and display the list, unknown policies follow the valid ones.
+        valid_policies = self.scope_index.names(self.scope_index.applicable(record.id, record.groups))
+        unknown_policies = []
+        for item in self.scope_index.names(self.scope_index.unknown):
+            unknown_policies.append([item.lower(), item])
 
         fmt_policies = []
         for item in valid_policies:
             fmt_policies.append([item.lower(), item])
 
-        for item in sorted(fmt_policies, reverse=True):
-            self.jamf_policies_field.insert('1.0', item[1] + "\n")
-        self.jamf_policies_field.delete(END+'-2c', END)
+        policy_display = render.TextBuffer()
+        for item in sorted(fmt_policies):
+            policy_display.add(item[1] + "\n")
+
+        for item in sorted(unknown_policies):
+            policy_display.add(item[1] + " (unknown)\n", 'ITAL')
+        policy_display.render(self.jamf_policies_field)
 
     def reset_display(self):
         """
         erase field contents
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         self.computer_name_string.set("")
         self.fullname_string.set("")
         self.checkin_string.set("")
@@ -1184,7 +1423,7 @@ class Summarize(object):
         self.jamf_policies_field.delete('0.0', END)
 
 
-def login(logger):
+def login(logger, stall_seconds=watchdog.STALL_SECONDS):
     """
     if the user has proper privleges, consider them an authorized user and proceed
     """
@@ -1192,7 +1431,7 @@ def login(logger):
         """
         Read specified config file or create default data structure
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
         config_path = ''
 
         executable_name = os.path.basename(sys.argv[0])
@@ -1255,7 +1494,7 @@ def login(logger):
         """
         Create data structures from config file
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
         config_options = {}
         config_options["login"] = {}
 
@@ -1283,7 +1522,7 @@ def login(logger):
         """
         Convert data structures back into config file and write out changes.
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
 
         hostnames.remove("https://new_server:8443")
 
@@ -1299,150 +1538,35 @@ def login(logger):
             except Exception as exception_message:
                 logger.error("Error writing configuration file [%s]. %s" % (config_path, exception_message))
 
+    @profiling.profiler.profiled('login')
     def try_login():
         """
         jamf api call for login test
         """
 
-        def call_jss(logger, api_call):
-            """
-            consolidate API calls to single function
-            pass in logger and api call.
-            """
-            logger.info("%s: activated" % inspect.stack()[0][3])
-
-            try:
-                url = jamf_hostname.get() + '/JSSResource/' + api_call
-
-                logger.info("%s called with %s" % (inspect.stack()[0][3], api_call))
-
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(jamf_username.get() + ':' + jamf_password.get()))
-
-                response = urllib2.urlopen(request)
+        startup.timer.wait_end()
+        logger.info("%s: activated" % logs.caller())
 
-                logger.info("Code returned: %s %s" % (response.code, api_call))
+        jss = client.JamfClient(jamf_hostname.get(), jamf_username.get(), jamf_password.get(), logger)
+        login_cache = cache.Cache(cache.default_path('cargo_ship'), logger)
 
-                if response.code != 200:
-                    logger.error("login: Invalid response from Jamf (" + api_call + ")")
-                    tkMessageBox.showerror("Jamf login", "Invalid response from Jamf")
-                    root.destroy()  # clean up after yourself!
-                    sys.exit()
-
-                response_json = json.loads(response.read())
-
-                return response_json
-
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 401:
-                    logger.error("%s: Invalid username or password. (%r) (%s)" % (inspect.stack()[0][3], jamf_username.get(), api_call))
-                    tkMessageBox.showerror("Jamf login", "Invalid username or password.")
-                else:
-                    logger.error("%s: Error communicating with JSS. %s %s" % (inspect.stack()[0][3], jamf_hostname.get(), api_call))
-                    tkMessageBox.showerror("Jamf login", "HTTP error from:\n%s" % jamf_hostname.get())
-            except urllib2.URLError:
-                logger.error("%s: Error contacting JSS: %s %s" % (inspect.stack()[0][3], jamf_hostname.get(), api_call))
-                tkMessageBox.showerror("Jamf login", "Unable to contact:\n%s" % jamf_hostname.get())
-            except Exception as exception_message:
-                logger.error("%s: Generic error. (%r) %s" % (inspect.stack()[0][3], exception_message, api_call))
-                tkMessageBox.showerror("Jamf login", "Generic error from %s." % jamf_hostname.get())
-
-            #
-            # handle bad condition exits here...
-            logger.error("%s: Exiting, Error calling %s" % (inspect.stack()[0][3], api_call))
-            sys.exit()
-
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        global access_remembered
 
         try:
-            # Attempt to verify LDAP users.
-            #   1. Pull JSS acounts for users and groups
-            #   2. Pull LDAP servers
-            #   3. Build list of valid groups, those with appropriate rights
-            #   4. Check each LDAP server for valid groups the user is a member of, login if found
-            #   5. Fall back to jss user login, check account for appropriate rights
-
-            jss_accounts = call_jss(logger, 'accounts')
-
-            raw_ldap = call_jss(logger, 'ldapservers')
-            ldap_servers = raw_ldap['ldap_servers']
-            logger.info("JSS LDAP servers: %r" % ldap_servers)
+            with startup.timer.phase('privileges'):
+                access, access_remembered = privileges.authorize(jss, jamf_username.get(), jamf_password.get(), REQUIRED_PRIVILEGES, [], login_cache, auth_ttl, logger)
+            startup.timer.note(access_remembered=access_remembered)
 
             #
-            # store list of user and group privileges
-            user_list = jss_accounts['accounts']['users']
-            group_list = jss_accounts['accounts']['groups']
-
-            #
-            # find groups on jss that have required_privileges
-            valid_groups = []
-            for item in group_list:
-                raw_privs = call_jss(logger, 'accounts/groupid/' + str(item['id']))
-                this_group_privs = raw_privs['group']['privileges']['jss_objects']
-
-                count_privileges = len(required_privileges)
-
-                for this_privilege in required_privileges:
-                    if this_privilege in this_group_privs:
-                        count_privileges -= 1
-
-                if count_privileges == 0:
-                    logger.info("%s is valid." % item['name'])
-                    valid_groups.append([item['id'], item['name']])
-
-            #
-            # find servers with valid groups the user is a member of
-            valid_servers = []
-            for server in ldap_servers:
-                for group in valid_groups:
-                    raw_group_membership = call_jss(logger, 'ldapservers/id/' + str(server['id']) + '/group/' + urllib.quote(str(group[1])) + '/user/' + jamf_username.get())
-
-                    if raw_group_membership['ldap_users']:
-                        valid_servers.append(server['name'])
-
-            #
-            # if we found a valid server, proceed to app
-            if valid_servers:
-                logger.info('valid server found, login successful.')
+            # if all require privileges accounted for, proceed
+            # else alert and fail
+            if access.level:
+                logger.info("login: valid %s login. (%r)" % (access.source, jamf_username.get()))
                 root.destroy()  # clean up after yourself!
                 return
-
-            #
-            # check users account privileges for required rights
             else:
-                raw_privileges = call_jss(logger, 'accounts/username/' + jamf_username.get())
-                user_privileges = raw_privileges['account']['privileges']['jss_objects']
-
-                #
-                # stop number of require privileges
-                count_privileges = len(required_privileges)
-
-                #
-                # for every required privilege
-                #  check if it's in user privileges
-                #   decrement if yes
-                # maintain list of missing require privileges
-                missing_privileges = []
-
-                for item in required_privileges:
-                    if item in user_privileges:
-                        count_privileges -= 1
-                    else:
-                        missing_privileges.append(item)
-
-                #
-                # if all require privileges accounted for, proceed
-                # else alert and fail
-                if count_privileges == 0:
-                    logger.info("login: valid login. (%r)" % jamf_username.get())
-                    root.destroy()  # clean up after yourself!
-                    return
-                else:
-                    logger.error("login: User %r lacks appropriate privileges: %r" % (jamf_username.get(), missing_privileges))
-                    tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % missing_privileges)
+                logger.error("login: User %r lacks appropriate privileges: %r" % (jamf_username.get(), access.missing))
+                tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % access.missing)
 
         #
         # handle various communication errors
@@ -1451,31 +1575,52 @@ def login(logger):
             logger.info("Code returned: %s" % error.code)
 
             if error.code == 401:
-                logger.error("%s: Invalid username or password. (%r)" % (inspect.stack()[0][3], jamf_username.get()))
+                logger.error("%s: Invalid username or password. (%r)" % (logs.caller(), jamf_username.get()))
                 tkMessageBox.showerror("Jamf login", "Invalid username or password.")
             else:
-                logger.error("%s: Error communicating with JSS. %s" % (inspect.stack()[0][3], jamf_hostname.get()))
+                logger.error("%s: Error communicating with JSS. %s" % (logs.caller(), jamf_hostname.get()))
                 tkMessageBox.showerror("Jamf login", "HTTP error from:\n%s" % jamf_hostname.get())
         except urllib2.URLError:
-            logger.error("%s: Error contacting JSS: %s" % (inspect.stack()[0][3], jamf_hostname.get()))
+            logger.error("%s: Error contacting JSS: %s" % (logs.caller(), jamf_hostname.get()))
             tkMessageBox.showerror("Jamf login", "Unable to contact:\n%s" % jamf_hostname.get())
         except Exception as exception_message:
-            logger.error("%s: Generic error. (%r)" % (inspect.stack()[0][3], exception_message))
+            logger.error("%s: Generic error. (%r)" % (logs.caller(), exception_message))
             tkMessageBox.showerror("Jamf login", "Generic error from %s." % jamf_hostname.get())
 
         sys.exit()
 
-    #
-    # This is really important. This list contains the required rights for the fields we need to access.
-    required_privileges = ['Read Accounts', 'Read Buildings', 'Read Computers', 'Update Computers', 'Read Departments', 'Read User', 'Update User']
+    global access_remembered
+    access_remembered = False
 
     # read or create prefs
-    preference_file, preference_path = read_create_prefs(logger)
-    hostnames = injest_prefs(logger, preference_file).split(',')
+    with startup.timer.phase('prefs'):
+        preference_file, preference_path = read_create_prefs(logger)
+        hostnames = injest_prefs(logger, preference_file).split(',')
+
+    #
+    # seconds a successful login is remembered, auth_cache_minutes = 0 checks privileges every time
+    auth_ttl = privileges.AUTH_CACHE_TTL
+    if preference_file.has_option('login', 'auth_cache_minutes'):
+        try:
+            auth_ttl = preference_file.getint('login', 'auth_cache_minutes') * 60
+        except ValueError:
+            logger.warn("Invalid auth_cache_minutes in configuration file, using %i." % (auth_ttl / 60))
+
+    #
+    # profile = true profiles the login, startup and each action, as --profile does
+    #  it is read before the login window is up, so try_login is profiled
+    if preference_file.has_option('login', 'profile'):
+        try:
+            if preference_file.getboolean('login', 'profile'):
+                profiling.profiler.start(profiling.default_directory('cargo_ship'), logger)
+        except ValueError:
+            logger.warn("Invalid profile in configuration file, not profiling.")
 
     if 'new_server' not in hostnames[0]:
         hostnames.append("https://new_server:8443")
 
+    login_ui = startup.timer.begin('login_ui')
+
     root = Tk()
     jamf_username = StringVar()
     jamf_password = StringVar()
@@ -1515,34 +1660,68 @@ def login(logger):
     root.bind('<Return>', lambda event: try_login())
 
     uname_entry.focus()
-    root.mainloop()
+    root.update_idletasks()
+    startup.timer.end(login_ui)
+    startup.timer.wait_begin()
+    with watchdog.watching(root, logger, stall_seconds):
+        root.mainloop()
 
     if preference_path:
         modify_prefs(logger, preference_file, preference_path, hostnames, jamf_hostname.get())
     else:
         logger.error("No path to preferences, no save attempt.")
 
-    return (jamf_hostname.get(), jamf_username.get(), jamf_password.get())
+    return (jamf_hostname.get(), jamf_username.get(), jamf_password.get(), access_remembered)
 
 
 def main():
 
-    global local_jamf_hostname
-    global local_jamf_password
-    global local_jamf_username
-    global local_logger
+    parser = argparse.ArgumentParser(description="View Jamf computer records.")
+    parser.add_argument('--report', metavar='PATH', help="write the policies, profiles and packages expected on each computer to PATH (- for standard output) without opening the window")
+    parser.add_argument('--format', choices=['jsonl', 'csv'], help="report format (default: csv if PATH ends in .csv, otherwise jsonl)")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument('--ids', help="comma separated Jamf ids to report on, or a file of them")
+    selection.add_argument('--group', help="report on the members of a computer group")
+    selection.add_argument('--all', action='store_true', help="report on every computer")
+    parser.add_argument('--host', help="Jamf server for --report, e.g. https://jamf.example.edu:8443")
+    parser.add_argument('--username', help="Jamf account for --report (default: current user)")
+    parser.add_argument('--concurrency', type=int, default=fetch.DEFAULT_CONCURRENCY, help="most computer records requested at once")
+    parser.add_argument('--profile', metavar='DIR', nargs='?', const='', help="write cProfile stats for startup and each action to DIR (default: a timestamped directory next to the cache)")
+    parser.add_argument('--stall-seconds', type=float, default=watchdog.STALL_SECONDS, help="log the main thread's stack when the window stops responding for this long, 0 turns this off (default: %(default)s)")
+    #
+    # macOS may add a -psn_ argument when launched from the Finder
+    args, _ = parser.parse_known_args()
 
-    logger = loggers.file_logger(name='cargoship')
+    #
+    # file writes happen on a background thread
+    logger = logs.background(loggers.file_logger(name='cargoship'))
+    metrics.dump_at_exit(logger)
     logger.info("Running Cargo Ship")
     logger.info("Level: Method/function: Message")
 
-    jamf_hostname, jamf_username, jamf_password = login(logger)
+    if args.report:
+        if not args.host:
+            parser.error("--report needs --host")
+        if not (args.ids or args.group or args.all):
+            parser.error("--report needs --ids, --group or --all")
+        sys.exit(report_computers(logger, args))
+
+    #
+    # phases up to the first paint of the main window are written to a startup report
+    startup.timer.start('cargo_ship')
+
+    if args.profile is not None:
+        profiling.profiler.start(args.profile or profiling.default_directory('cargo_ship'), logger)
+
+    jamf_hostname, jamf_username, jamf_password, access_remembered = login(logger, args.stall_seconds)
     if not jamf_username:
         sys.exit(0)
 
     main_window = Tk()
-    my_app = Summarize(main_window, logger, jamf_hostname, jamf_username, jamf_password)
-    main_window.mainloop()
+    with profiling.profiler.action('startup'):
+        my_app = Summarize(main_window, logger, jamf_hostname, jamf_username, jamf_password, revalidate=access_remembered)
+    with watchdog.watching(main_window, logger, args.stall_seconds):
+        main_window.mainloop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,3 @@
+"""
+Code shared by Tugboat and Cargo Ship.
+"""
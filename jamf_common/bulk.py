@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Apply a batch of Jamf updates, recording each result so the batch can be resumed.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Updates are sent by a pool of threads, the number in flight governed
+#     by an AdaptiveWindow as in fetch_all, so throughput is whatever the
+#     JSS accepts. Transient failures are retried with backoff. PUTs of
+#     the same fields are idempotent, so a retry can't do harm.
+#
+#     Each finished row is appended to the results file and flushed at
+#     once. Running the same input again skips rows the results file
+#     already records as updated, so an interrupted batch picks up where
+#     it stopped and failed rows are tried again.
+#
+#     Rows are identified by their line number and key (an id, serial
+#     number or name), so edits to other rows between runs don't matter.
+#
+################################################################################
+
+import codecs
+import collections
+import csv
+import os
+import Queue
+import re
+import threading
+import urllib2
+
+import fetch
+import throttle
+
+RESULT_COLUMNS = ['row', 'key', 'status', 'code', 'message']
+
+#
+# statuses skipped when a batch is resumed
+DONE_STATUSES = ['updated']
+
+#
+# line is the line number in the input file, error is set for rows that can't be sent
+Update = collections.namedtuple('Update', ['line', 'key', 'method', 'api_call', 'data', 'error'])
+
+
+def read_csv(csv_path):
+    """
+    return (header, [(line number, {column: value})]) from a UTF-8 CSV file
+    column names are lowercased, values are unicode
+    """
+    with open(csv_path, 'rb') as csv_file:
+        reader = csv.reader(csv_file)
+        rows = [[value.decode('utf-8').strip() for value in row] for row in reader]
+
+    if not rows:
+        return [], []
+
+    #
+    # spreadsheets often save a byte order mark
+    header = [column.lower().lstrip(codecs.BOM_UTF8.decode('utf-8')) for column in rows[0]]
+    records = []
+    for line, row in enumerate(rows[1:], 2):
+        if any(row):
+            records.append((line, dict(zip(header, row))))
+    return header, records
+
+
+def error_message(error):
+    """
+    the reason Jamf gave for an error, or the error itself
+    """
+    if isinstance(error, urllib2.HTTPError):
+        try:
+            found = re.findall(r"Error: (.*?)<", error.read())
+        except Exception:
+            found = []
+        return found[0] if found else "HTTP %i %s" % (error.code, error.msg)
+    return str(error)
+
+
+class Results(object):
+    """
+    CSV of finished rows, appended to as they finish
+    """
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        self.done = set()
+
+        if os.path.exists(path):
+            with open(path, 'rb') as results_file:
+                for row in csv.DictReader(results_file):
+                    if row.get('status') in DONE_STATUSES:
+                        self.done.add((row['row'], row['key'].decode('utf-8')))
+
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self.results_file = open(path, 'ab')
+        self.writer = csv.writer(self.results_file)
+        if new_file:
+            self.writer.writerow(RESULT_COLUMNS)
+            self.results_file.flush()
+
+    def is_done(self, line, key):
+        return (str(line), key) in self.done
+
+    def record(self, line, key, status, code='', message=''):
+        with self.lock:
+            self.writer.writerow([str(line), key.encode('utf-8'), status, str(code), message.encode('utf-8') if isinstance(message, unicode) else message])
+            self.results_file.flush()
+            if status in DONE_STATUSES:
+                self.done.add((str(line), key))
+
+    def close(self):
+        self.results_file.close()
+
+
+def apply_all(jamf_client, updates, results, concurrency=fetch.DEFAULT_CONCURRENCY, logger=None, retries=fetch.DEFAULT_RETRIES, progress=None):
+    """
+    send each Update not already done, recording it in results
+    progress(finished, total, update, status, message) is called as each row finishes
+    returns {status: count}
+    """
+    pending = Queue.Queue()
+    skipped = 0
+    for update in updates:
+        if results.is_done(update.line, update.key):
+            skipped += 1
+        else:
+            pending.put(update)
+
+    total = pending.qsize()
+    counts = collections.Counter()
+    counts['skipped'] = skipped
+    finished = [0]
+    finished_lock = threading.Lock()
+
+    stop = threading.Event()
+    window = throttle.AdaptiveWindow(concurrency, logger=logger)
+
+    def send(update):
+        try:
+            response = fetch.call_with_retries(window, stop, retries, lambda: jamf_client.request(update.method, update.api_call, update.data), logger, update.api_call)
+        except Exception as exception_message:
+            return 'failed', getattr(exception_message, 'code', ''), error_message(exception_message)
+        return 'updated', response.code, ''
+
+    def worker():
+        while not stop.is_set():
+            try:
+                update = pending.get_nowait()
+            except Queue.Empty:
+                return
+
+            if update.error:
+                status, code, message = 'invalid', '', update.error
+            else:
+                status, code, message = send(update)
+            results.record(update.line, update.key, status, code, message)
+
+            with finished_lock:
+                counts[status] += 1
+                finished[0] += 1
+                if logger:
+                    logger.info("apply_all: row %i %s %s %s" % (update.line, update.key, status, message))
+                if progress:
+                    progress(finished[0], total, update, status, message)
+
+    worker_count = max(1, min(concurrency, total))
+    jamf_client.pool.resize(worker_count)
+
+    threads = [threading.Thread(target=worker) for _ in range(worker_count)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    #
+    # join with a timeout, so Control-C reaches the main thread
+    try:
+        while [thread for thread in threads if thread.is_alive()]:
+            for thread in threads:
+                thread.join(0.2)
+    except KeyboardInterrupt:
+        stop.set()
+        raise
+
+    if logger:
+        logger.info("apply_all: %r, final window %i." % (dict(counts), int(window.window)))
+    return dict(counts)
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+On-disk cache of Jamf data, kept per Jamf host.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Values are stored as JSON in a single SQLite table keyed on
+#     (host, key), along with the time they were stored. Callers decide
+#     what age is acceptable, so stale data can still be shown while a
+#     fresh copy is fetched.
+#
+#     A connection is opened per operation, which keeps the cache safe to
+#     use from background threads.
+#
+#     If you change the shape of a cached value, change its key (for
+#     example 'policies.v2') so old entries are ignored.
+#
+################################################################################
+
+import json
+import os
+import platform
+import sqlite3
+import time
+
+
+def default_path(name):
+    """
+    platform-appropriate cache file for an application
+    """
+    filename = 'edu.scl.utah.' + name + '.sqlite'
+    if platform.system() == 'Darwin':
+        directory = os.path.join(os.path.expanduser('~'), 'Library', 'Caches')
+    elif platform.system() == 'Windows':
+        directory = os.environ.get('LOCALAPPDATA', os.environ.get('APPDATA', ''))
+    else:
+        directory = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(directory, filename)
+
+
+class Cache(object):
+    """
+    Timestamped JSON values scoped to a Jamf host
+    """
+    def __init__(self, path, logger=None):
+        self.path = path
+        self.logger = logger
+        self.enabled = True
+
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+            connection = self.connect()
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS cache (host TEXT, key TEXT, stored REAL, value TEXT, PRIMARY KEY (host, key))")
+            connection.close()
+        except Exception as exception_message:
+            #
+            # a missing cache only costs speed, carry on without it
+            self.enabled = False
+            if self.logger:
+                self.logger.error("Cache: Unable to open %s. [%s]" % (path, exception_message))
+
+    def connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def get(self, host, key, ttl=None):
+        """
+        return (value, age in seconds), or (None, None) if missing or older than ttl
+        """
+        if not self.enabled:
+            return None, None
+        try:
+            connection = self.connect()
+            row = connection.execute("SELECT stored, value FROM cache WHERE host = ? AND key = ?", (host, key)).fetchone()
+            connection.close()
+        except Exception as exception_message:
+            if self.logger:
+                self.logger.error("Cache: Error reading %s %s. [%s]" % (host, key, exception_message))
+            return None, None
+
+        if row is None:
+            return None, None
+
+        age = time.time() - row[0]
+        if ttl is not None and age > ttl:
+            return None, None
+
+        return json.loads(row[1]), age
+
+    def set(self, host, key, value):
+        if not self.enabled:
+            return
+        try:
+            connection = self.connect()
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO cache (host, key, stored, value) VALUES (?, ?, ?, ?)", (host, key, time.time(), json.dumps(value)))
+            connection.close()
+        except Exception as exception_message:
+            if self.logger:
+                self.logger.error("Cache: Error writing %s %s. [%s]" % (host, key, exception_message))
+
+    def delete(self, host, key=None):
+        """
+        remove one key, or everything stored for the host
+        """
+        if not self.enabled:
+            return
+        try:
+            connection = self.connect()
+            with connection:
+                if key is None:
+                    connection.execute("DELETE FROM cache WHERE host = ?", (host,))
+                else:
+                    connection.execute("DELETE FROM cache WHERE host = ? AND key = ?", (host, key))
+            connection.close()
+        except Exception as exception_message:
+            if self.logger:
+                self.logger.error("Cache: Error deleting %s %s. [%s]" % (host, key, exception_message))
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+Keep-alive client for the Jamf Classic API, shared by Tugboat and Cargo Ship.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Every request used to build a fresh urllib2.Request, which meant a new
+#     TCP and TLS handshake per call. Connections are now kept in a pool per
+#     Jamf host and reused, both apps (and the login windows) share the pool.
+#
+#     Errors are raised as urllib2.HTTPError and urllib2.URLError so the
+#     existing error handling at each call site continues to work.
+#
+#     Responses can be recorded to, or replayed from, fixture files, see
+#     fixtures.py.
+#
+#     Basic auth makes the JSS verify the password on every call. Instead,
+#     the credentials are exchanged once for a Jamf Pro API bearer token
+#     (POST /api/v1/auth/token), renewed with keep-alive shortly before it
+#     expires, and sent with every Classic API call. Clients for the same
+#     host and user share one TokenSession, so the login window's token
+#     carries over to the app. If the server has no token endpoint, or it
+#     fails, calls fall back to Basic auth and the token is tried again
+#     later. Token calls are never recorded to fixtures.
+#
+#     Every call, token calls included, is timed into metrics.calls by
+#     endpoint, along with its status and size. get_json also times the
+#     JSON parse.
+#
+################################################################################
+
+import base64
+import calendar
+import email.utils
+import httplib
+import json
+import os
+import socket
+import StringIO
+import threading
+import time
+import urllib2
+import urlparse
+
+import fixtures
+import metrics
+
+#
+# seconds to wait on a socket before giving up, urllib2 had no limit
+DEFAULT_TIMEOUT = 60
+
+#
+# idle connections retained per host, fan-out callers may raise this
+DEFAULT_POOL_SIZE = 8
+
+#
+# Jamf Pro API token endpoints, relative to the host
+TOKEN_PATH = '/api/v1/auth/token'
+KEEP_ALIVE_PATH = '/api/v1/auth/keep-alive'
+
+#
+# seconds before expiry a token is renewed
+TOKEN_REFRESH_MARGIN = 5 * 60
+
+#
+# seconds of Basic auth after the token endpoint fails, before it is tried again
+TOKEN_RETRY_INTERVAL = 5 * 60
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+_sessions = {}
+_sessions_lock = threading.Lock()
+
+
+class JamfResponse(object):
+    """
+    Completed response, readable like the urllib2 response it replaces
+    """
+    def __init__(self, url, code, msg, headers, body):
+        self.url = url
+        self.code = code
+        self.msg = msg
+        self.headers = headers
+        self.body = body
+
+    def read(self):
+        return self.body
+
+    def info(self):
+        return self.headers
+
+    def getcode(self):
+        return self.code
+
+
+class ConnectionPool(object):
+    """
+    Idle keep-alive connections to a single Jamf host
+    """
+    def __init__(self, scheme, netloc, timeout=DEFAULT_TIMEOUT, max_idle=DEFAULT_POOL_SIZE):
+        self.scheme = scheme
+        self.netloc = netloc
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle = []
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+
+    def new_connection(self):
+        if self.scheme == 'https':
+            return httplib.HTTPSConnection(self.netloc, timeout=self.timeout)
+        return httplib.HTTPConnection(self.netloc, timeout=self.timeout)
+
+    def acquire(self):
+        """
+        return (connection, reused)
+        """
+        with self.lock:
+            #
+            # a forked child must not share sockets with its parent
+            if self.pid != os.getpid():
+                self.idle = []
+                self.pid = os.getpid()
+            if self.idle:
+                return self.idle.pop(), True
+        return self.new_connection(), False
+
+    def release(self, connection):
+        with self.lock:
+            if self.pid == os.getpid() and len(self.idle) < self.max_idle:
+                self.idle.append(connection)
+                return
+        connection.close()
+
+    def resize(self, max_idle):
+        with self.lock:
+            self.max_idle = max(self.max_idle, max_idle)
+
+    def close(self):
+        with self.lock:
+            idle, self.idle = self.idle, []
+        for connection in idle:
+            connection.close()
+
+
+def host_pool(jamf_hostname, timeout=DEFAULT_TIMEOUT):
+    """
+    return the shared pool for a host, creating it on first use
+    """
+    parsed = urlparse.urlsplit(jamf_hostname)
+    key = (parsed.scheme, parsed.netloc)
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(parsed.scheme, parsed.netloc, timeout)
+        return _pools[key]
+
+
+def exchange(pool, method, path, data, headers, logger=None):
+    """
+    return (response, body) for one request on a pooled connection
+    """
+    for attempt in range(2):
+        connection, reused = pool.acquire()
+        try:
+            connection.request(method, path, data, headers)
+            raw_response = connection.getresponse()
+            body = raw_response.read()
+        except (httplib.HTTPException, socket.error) as exception_message:
+            connection.close()
+            #
+            # the server may have dropped an idle connection, retry once on a fresh one
+            if reused and attempt == 0:
+                continue
+            if logger:
+                logger.error("request: Error contacting JSS. %s %s [%s]" % (method, path, exception_message))
+            raise urllib2.URLError(exception_message)
+
+        if raw_response.will_close:
+            connection.close()
+        else:
+            pool.release(connection)
+        return raw_response, body
+
+
+def parse_expires(value):
+    """
+    seconds since the epoch from a token's expires, ISO 8601 UTC or epoch milliseconds
+    """
+    if isinstance(value, (int, long, float)):
+        return value / 1000.0
+    return calendar.timegm(time.strptime(value[:19], '%Y-%m-%dT%H:%M:%S'))
+
+
+class TokenSession(object):
+    """
+    Bearer token for one user on one Jamf host
+    """
+    def __init__(self, jamf_hostname, basic, pool, logger=None):
+        self.base_path = urlparse.urlsplit(jamf_hostname).path
+        self.basic = basic
+        self.pool = pool
+        self.logger = logger
+        self.token = None
+        self.expires = 0
+        self.retry_after = 0
+        self.lock = threading.Lock()
+
+    def authorization(self):
+        """
+        the Authorization header for the next call
+        """
+        token = self.token
+        now = time.time()
+        usable = token is not None and now < self.expires
+        if usable and (now < self.expires - TOKEN_REFRESH_MARGIN or now < self.retry_after):
+            return 'Bearer ' + token
+        if not usable and now < self.retry_after:
+            return self.basic
+
+        #
+        # one thread renews, the others wait for it rather than piling on
+        with self.lock:
+            if self.token is token and time.time() >= self.retry_after:
+                self.renew()
+            if self.token is not None and time.time() < self.expires:
+                return 'Bearer ' + self.token
+            return self.basic
+
+    def rejected(self, authorization):
+        """
+        the server refused a token, e.g. it was invalidated
+        """
+        with self.lock:
+            if self.token is not None and authorization == 'Bearer ' + self.token:
+                self.token = None
+
+    def post(self, path, authorization):
+        start_time = time.time()
+        try:
+            raw_response, body = exchange(self.pool, 'POST', self.base_path + path, '', {'Accept': 'application/json', 'Authorization': authorization}, self.logger)
+        except urllib2.URLError:
+            metrics.calls.record('POST', path, 'error', time.time() - start_time)
+            raise
+        metrics.calls.record('POST', path, raw_response.status, time.time() - start_time, 0, len(body))
+        return raw_response, body
+
+    def renew(self):
+        """
+        extend the current token, or exchange the credentials for a new one
+        """
+        try:
+            raw_response = None
+            if self.token is not None and time.time() < self.expires:
+                raw_response, body = self.post(KEEP_ALIVE_PATH, 'Bearer ' + self.token)
+            if raw_response is None or raw_response.status != 200:
+                raw_response, body = self.post(TOKEN_PATH, self.basic)
+
+            if raw_response.status == 200:
+                response_json = json.loads(body)
+                #
+                # expires is in server time, measure the lifetime against the server's Date
+                issued = raw_response.getheader('Date')
+                issued = email.utils.mktime_tz(email.utils.parsedate_tz(issued)) if issued else time.time()
+                self.expires = time.time() + parse_expires(response_json['expires']) - issued
+                self.token = response_json['token']
+                if self.logger:
+                    self.logger.info("TokenSession: Token valid for %i seconds." % (self.expires - time.time()))
+                return
+            failure = "HTTP %i" % raw_response.status
+        except (urllib2.URLError, ValueError, KeyError, TypeError) as exception_message:
+            failure = exception_message
+
+        self.retry_after = time.time() + TOKEN_RETRY_INTERVAL
+        if self.logger:
+            self.logger.warn("TokenSession: No bearer token, using Basic authentication. [%s]" % failure)
+
+
+def host_session(jamf_hostname, jamf_username, jamf_password, pool, logger=None):
+    """
+    return the shared TokenSession for a host and user
+    """
+    basic = 'Basic ' + base64.b64encode(jamf_username + ':' + jamf_password)
+    key = (jamf_hostname, basic)
+    with _sessions_lock:
+        if key not in _sessions:
+            _sessions[key] = TokenSession(jamf_hostname, basic, pool, logger)
+        return _sessions[key]
+
+
+def close_all():
+    """
+    close every idle connection in every pool
+    """
+    with _pools_lock:
+        pools = _pools.values()
+    for pool in pools:
+        pool.close()
+
+
+class JamfClient(object):
+    """
+    Issue Classic API calls for one user against one Jamf host
+    """
+    def __init__(self, jamf_hostname, jamf_username, jamf_password, logger=None, timeout=DEFAULT_TIMEOUT):
+        self.jamf_hostname = jamf_hostname.rstrip('/')
+        self.jamf_username = jamf_username
+        self.logger = logger
+        self.base_path = urlparse.urlsplit(self.jamf_hostname).path + '/JSSResource/'
+        self.pool = host_pool(self.jamf_hostname, timeout)
+
+        self.session = host_session(self.jamf_hostname, jamf_username, jamf_password, self.pool, logger)
+
+    def url(self, api_call):
+        return self.jamf_hostname + '/JSSResource/' + api_call
+
+    def request(self, method, api_call, data=None, content_type='text/xml'):
+        """
+        perform a single request on a pooled connection
+        """
+        headers = {'Accept': 'application/json'}
+        if data is not None:
+            headers['Content-Type'] = content_type
+
+        start_time = time.time()
+        player = fixtures.player()
+        try:
+            if player is not None:
+                status, reason, response_headers, body = player.play(method, api_call, self.jamf_username)
+            else:
+                headers['Authorization'] = self.session.authorization()
+                status, reason, response_headers, body = self.send(method, api_call, data, headers)
+
+                #
+                # a token can be invalidated before it expires, get another and try once more
+                if status == 401 and headers['Authorization'].startswith('Bearer '):
+                    self.session.rejected(headers['Authorization'])
+                    headers['Authorization'] = self.session.authorization()
+                    status, reason, response_headers, body = self.send(method, api_call, data, headers)
+        except urllib2.URLError:
+            metrics.calls.record(method, api_call, 'error', time.time() - start_time, len(data or ''))
+            raise
+        metrics.calls.record(method, api_call, status, time.time() - start_time, len(data or ''), len(body))
+
+        if not 200 <= status < 300:
+            raise urllib2.HTTPError(self.url(api_call), status, reason, response_headers, StringIO.StringIO(body))
+
+        return JamfResponse(self.url(api_call), status, reason, response_headers, body)
+
+    def send(self, method, api_call, data, headers):
+        """
+        return (status, reason, headers, body) from the server
+        """
+        start_time = time.time()
+        raw_response, body = exchange(self.pool, method, self.base_path + api_call, data, headers, self.logger)
+
+        recorder = fixtures.recorder()
+        if recorder is not None:
+            recorder.record(method, api_call, self.jamf_username, raw_response.status, raw_response.reason, raw_response.msg, body, time.time() - start_time)
+
+        return raw_response.status, raw_response.reason, raw_response.msg, body
+
+    def get(self, api_call):
+        return self.request('GET', api_call)
+
+    def get_json(self, api_call):
+        body = self.get(api_call).read()
+        start_time = time.time()
+        response_json = json.loads(body)
+        metrics.calls.record_parse('GET', api_call, time.time() - start_time)
+        return response_json
+
+    def put(self, api_call, data, content_type='text/xml'):
+        return self.request('PUT', api_call, data, content_type)
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Concurrent fan-out of Classic API calls from a single process.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Bulk loads are bound by server latency, not CPU. Rather than forking a
+#     process per core, many lightweight threads share one keep-alive pool
+#     and block on sockets, which releases the GIL while they wait.
+#
+#     The apps run on the system python 2.7, so asyncio is not available.
+#
+#     The number of requests actually in flight is governed by an
+#     AdaptiveWindow (see throttle.py), concurrency is only its ceiling.
+#
+#     Transient failures (5xx, 429, connection errors) are retried with
+#     exponential backoff and full jitter, honoring Retry-After. Callers that
+#     can live without some records pass partial=True and receive a FetchError
+#     in place of each record that still failed. The retry loop is
+#     call_with_retries, which bulk.py's PUTs go through as well.
+#
+#     Callers looking for any one match pass stop_when, the first result it
+#     accepts stops the calls not yet started. Those are left as None.
+#
+#     fetch_all holds every result until the last one arrives. For whole
+#     fleet passes stream_all yields results as they finish instead, and
+#     runs transform on the fetching thread so only the part of a record
+#     the caller needs is kept. At most `buffered` results wait for the
+#     consumer, fetching pauses when it falls behind, so memory stays flat
+#     however many calls there are.
+#
+################################################################################
+
+import Queue
+import random
+import threading
+import time
+import urllib2
+
+import throttle
+
+#
+# default number of requests in flight at once
+DEFAULT_CONCURRENCY = 32
+
+#
+# retries of a single call after a transient failure
+DEFAULT_RETRIES = 4
+
+#
+# backoff before retry n is a random delay up to min(BACKOFF_CAP, BACKOFF_BASE * 2**n) seconds
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 30.0
+
+
+class FetchError(Exception):
+    """
+    Stands in for a record that could not be fetched
+    """
+    def __init__(self, api_call, cause):
+        Exception.__init__(self, "%s [%s]" % (api_call, cause))
+        self.api_call = api_call
+        self.cause = cause
+
+
+def is_transient(error):
+    """
+    True if the call may succeed when tried again
+    """
+    if isinstance(error, urllib2.HTTPError):
+        return error.code >= 500 or error.code == 429
+    return isinstance(error, urllib2.URLError)
+
+
+def backoff(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+def call_with_retries(window, stop, retries, func, logger=None, api_call=''):
+    """
+    call func() through the window, retrying transient failures with backoff.
+    returns its result, its last error is raised once retries run out or stop is set.
+    """
+    attempt = 0
+    while True:
+        window.acquire()
+        start_time = time.time()
+        try:
+            result = func()
+        except Exception as exception_message:
+            transient = is_transient(exception_message)
+            pushed_back = isinstance(exception_message, urllib2.HTTPError) and exception_message.code in throttle.BACKPRESSURE_CODES
+            pause = throttle.retry_after(exception_message) if pushed_back else None
+            window.release(congested=transient, pause=pause, backpressure=pushed_back)
+
+            if not transient or attempt >= retries or stop.is_set():
+                if logger and attempt:
+                    logger.warn("call_with_retries: Giving up on %s after %i attempts." % (api_call, attempt + 1))
+                raise exception_message
+
+            delay = max(backoff(attempt), pause or 0)
+            attempt += 1
+            if logger:
+                logger.warn("call_with_retries: Retrying %s in %.1fs. [%s]" % (api_call, delay, exception_message))
+            time.sleep(delay)
+            continue
+
+        window.release(time.time() - start_time)
+        return result
+
+
+def fetch_one(jamf_client, api_call, window, stop, retries=DEFAULT_RETRIES, logger=None):
+    """
+    GET an api call through the window, retrying transient failures.
+    returns parsed JSON, or a FetchError once retries run out or stop is set.
+    """
+    try:
+        return call_with_retries(window, stop, retries, lambda: jamf_client.get_json(api_call), logger, api_call)
+    except Exception as exception_message:
+        if logger:
+            logger.error("fetch_one: Error fetching %s. [%s]" % (api_call, exception_message))
+        return FetchError(api_call, exception_message)
+
+
+def fetch_all(jamf_client, api_calls, concurrency=DEFAULT_CONCURRENCY, logger=None, retries=DEFAULT_RETRIES, partial=False, stop_when=None, initial=throttle.INITIAL_WINDOW):
+    """
+    GET each api call concurrently, return parsed JSON in the same order.
+    unless partial is set, the first call to exhaust its retries stops the
+    remaining calls and its error is raised to the caller.
+    if stop_when(result) is true for any result, the remaining calls are skipped.
+    initial is the number in flight before the window adapts.
+    """
+    results = [None] * len(api_calls)
+    errors = []
+    pending = Queue.Queue()
+    for index, api_call in enumerate(api_calls):
+        pending.put((index, api_call))
+
+    stop = threading.Event()
+    window = throttle.AdaptiveWindow(concurrency, initial, logger=logger)
+
+    def worker():
+        while not stop.is_set():
+            try:
+                index, api_call = pending.get_nowait()
+            except Queue.Empty:
+                return
+
+            results[index] = fetch_one(jamf_client, api_call, window, stop, retries, logger)
+            if isinstance(results[index], FetchError):
+                errors.append(results[index])
+                if not partial:
+                    stop.set()
+            elif stop_when is not None and stop_when(results[index]):
+                stop.set()
+
+    worker_count = max(1, min(concurrency, len(api_calls)))
+    jamf_client.pool.resize(worker_count)
+
+    threads = [threading.Thread(target=worker) for _ in range(worker_count)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if logger:
+        logger.info("fetch_all: %i calls, %i failed, final window %i." % (len(api_calls), len(errors), int(window.window)))
+
+    if errors and not partial:
+        raise errors[0].cause
+
+    return results
+
+
+def stream_all(jamf_client, api_calls, concurrency=DEFAULT_CONCURRENCY, logger=None, retries=DEFAULT_RETRIES, transform=None, buffered=None):
+    """
+    GET each api call concurrently, yielding (index, result) as each finishes.
+    transform(result) is applied on the fetching thread, calls that fail or
+    whose transform raises yield a FetchError. api_calls may be any iterable,
+    it is read as calls are started. at most buffered results are held.
+    """
+    calls = enumerate(api_calls)
+    calls_lock = threading.Lock()
+    finished = Queue.Queue(maxsize=buffered or 2 * concurrency)
+    done = object()
+
+    stop = threading.Event()
+    window = throttle.AdaptiveWindow(concurrency, logger=logger)
+
+    def hand_over(item):
+        #
+        # wait for room, unless the consumer has gone away
+        while not stop.is_set():
+            try:
+                finished.put(item, timeout=0.2)
+                return
+            except Queue.Full:
+                pass
+
+    def worker():
+        try:
+            while not stop.is_set():
+                with calls_lock:
+                    try:
+                        index, api_call = next(calls)
+                    except StopIteration:
+                        return
+
+                result = fetch_one(jamf_client, api_call, window, stop, retries, logger)
+                if transform is not None and not isinstance(result, FetchError):
+                    try:
+                        result = transform(result)
+                    except Exception as exception_message:
+                        if logger:
+                            logger.error("stream_all: Error processing %s. [%r]" % (api_call, exception_message))
+                        result = FetchError(api_call, exception_message)
+                hand_over((index, result))
+        finally:
+            hand_over(done)
+
+    worker_count = concurrency
+    if hasattr(api_calls, '__len__'):
+        worker_count = max(1, min(concurrency, len(api_calls)))
+    jamf_client.pool.resize(worker_count)
+
+    threads = [threading.Thread(target=worker) for _ in range(worker_count)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+
+    count = 0
+    failed = 0
+    running = worker_count
+    try:
+        while running:
+            #
+            # wait with a timeout, so Control-C reaches the main thread
+            try:
+                item = finished.get(timeout=0.2)
+            except Queue.Empty:
+                continue
+            if item is done:
+                running -= 1
+                continue
+            count += 1
+            if isinstance(item[1], FetchError):
+                failed += 1
+            yield item
+    finally:
+        stop.set()
+        if logger:
+            logger.info("stream_all: %i calls, %i failed, final window %i." % (count, failed, int(window.window)))
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Record Jamf responses to fixture files and replay them without a network.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Enabled from the environment, so either app can be run unchanged:
+#
+#       JAMF_RECORD_FIXTURES=/path/to/dir   save every response
+#       JAMF_REPLAY_FIXTURES=/path/to/dir   answer from saved responses
+#       JAMF_REPLAY_SPEED=0                 replay without the recorded delays
+#                                           (1.0, the default, is real time)
+#
+#     Each method and api call gets one JSON file holding every response
+#     seen, in order, along with how long it took. Replay returns them in
+#     the same order and repeats the last one once they run out.
+#
+#     Fixtures never contain the host, the password or the Authorization
+#     header. The username is replaced by a placeholder in api calls and
+#     JSON bodies, so fixtures can be shared and replayed as any user.
+#
+################################################################################
+
+import hashlib
+import httplib
+import json
+import os
+import StringIO
+import threading
+import time
+import urllib
+import urllib2
+
+RECORD_ENV = 'JAMF_RECORD_FIXTURES'
+REPLAY_ENV = 'JAMF_REPLAY_FIXTURES'
+SPEED_ENV = 'JAMF_REPLAY_SPEED'
+
+USERNAME_PLACEHOLDER = '{{username}}'
+
+#
+# response headers that could identify a session
+SCRUBBED_HEADERS = ['set-cookie', 'www-authenticate']
+
+_active = {}
+_active_lock = threading.Lock()
+
+
+def fixture_path(directory, method, api_call):
+    """
+    one file per method and api call, named so it can be found by eye
+    """
+    readable = (method + '_' + api_call).replace('/', '_')
+    readable = ''.join(character if character.isalnum() or character in '_-.' else '-' for character in readable)[:80]
+    digest = hashlib.sha1(method + ' ' + api_call).hexdigest()[:12]
+    return os.path.join(directory, readable + '_' + digest + '.json')
+
+
+def replace_segments(api_call, old, new):
+    """
+    replace whole path segments, so a username can't match part of another word
+    """
+    if not old:
+        return api_call
+    segments = api_call.split('/')
+    for index, segment in enumerate(segments):
+        if segment == old or segment == urllib.quote(old):
+            segments[index] = new
+    return '/'.join(segments)
+
+
+def replace_values(value, old, new):
+    """
+    replace JSON string values equal to old
+    """
+    if isinstance(value, dict):
+        return dict((key, replace_values(item, old, new)) for key, item in value.items())
+    if isinstance(value, list):
+        return [replace_values(item, old, new) for item in value]
+    if isinstance(value, basestring) and value == old:
+        return new
+    return value
+
+
+def replace_body(body, old, new):
+    if not old:
+        return body
+    try:
+        parsed = json.loads(body)
+    except ValueError:
+        return body
+    return json.dumps(replace_values(parsed, old, new))
+
+
+class Recorder(object):
+    """
+    Save responses as they are received
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def record(self, method, api_call, username, status, reason, headers, body, elapsed):
+        api_call = replace_segments(api_call, username, USERNAME_PLACEHOLDER)
+        response = {
+            'status': status,
+            'reason': reason,
+            'headers': [[key, value] for key, value in headers.items() if key.lower() not in SCRUBBED_HEADERS],
+            'body': replace_body(body, username, USERNAME_PLACEHOLDER),
+            'elapsed': elapsed,
+        }
+
+        path = fixture_path(self.directory, method, api_call)
+        with self.lock:
+            if os.path.exists(path):
+                with open(path) as fixture_file:
+                    fixture = json.load(fixture_file)
+            else:
+                fixture = {'method': method, 'api_call': api_call, 'responses': []}
+            fixture['responses'].append(response)
+            with open(path, 'w') as fixture_file:
+                json.dump(fixture, fixture_file, indent=1, sort_keys=True)
+
+
+class Player(object):
+    """
+    Answer requests from recorded responses
+    """
+    def __init__(self, directory, speed=1.0):
+        self.directory = directory
+        self.speed = speed
+        self.lock = threading.Lock()
+        self.fixtures = {}
+        self.played = {}
+
+    def load(self, path):
+        with self.lock:
+            if path not in self.fixtures:
+                if os.path.exists(path):
+                    with open(path) as fixture_file:
+                        self.fixtures[path] = json.load(fixture_file)['responses']
+                else:
+                    self.fixtures[path] = []
+                self.played[path] = 0
+            responses = self.fixtures[path]
+            if not responses:
+                return None
+            response = responses[min(self.played[path], len(responses) - 1)]
+            self.played[path] += 1
+            return response
+
+    def play(self, method, api_call, username):
+        """
+        return (status, reason, headers, body) as recorded, after the recorded delay
+        """
+        path = fixture_path(self.directory, method, replace_segments(api_call, username, USERNAME_PLACEHOLDER))
+        response = self.load(path)
+        if response is None:
+            raise urllib2.URLError("No fixture recorded for %s %s" % (method, api_call))
+
+        if self.speed:
+            time.sleep(response['elapsed'] * self.speed)
+
+        header_text = ''.join('%s: %s\r\n' % (key, value) for key, value in response['headers'])
+        headers = httplib.HTTPMessage(StringIO.StringIO(header_text + '\r\n'))
+        body = replace_body(response['body'], USERNAME_PLACEHOLDER, username).encode('utf-8')
+        return response['status'], response['reason'], headers, body
+
+
+def recorder():
+    """
+    the Recorder configured by the environment, or None
+    """
+    return _from_environment(RECORD_ENV)
+
+
+def player():
+    """
+    the Player configured by the environment, or None
+    """
+    return _from_environment(REPLAY_ENV)
+
+
+def _from_environment(variable):
+    directory = os.environ.get(variable)
+    if not directory:
+        return None
+    with _active_lock:
+        if (variable, directory) not in _active:
+            if variable == REPLAY_ENV:
+                _active[(variable, directory)] = Player(directory, float(os.environ.get(SPEED_ENV, 1.0)))
+            else:
+                _active[(variable, directory)] = Recorder(directory)
+        return _active[(variable, directory)]
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Cheap caller names, key/value fields and background file writes for app logging.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     inspect.stack() builds a record for every frame on the stack and
+#     reads each one's source line from disk, milliseconds per call.
+#     caller() reads the one frame it needs:
+#
+#       self.logger.info("%s: activated" % logs.caller())
+#
+#     background() wraps a configured logger, such as the one from
+#     management_tools, in a Logger. Its handlers are moved behind a
+#     queue and run on a listener thread, so a log call on the UI thread
+#     or in a fetch worker only formats the message and queues it. The
+#     queue is drained when the process exits.
+#
+#     Logger takes key/value fields after the message. They are appended
+#     as key=value and kept on the record as record.fields:
+#
+#       logger.info("fetch_policies: complete", policies=3000, seconds=4.2)
+#
+#     Logger builds each record itself, with the caller read from its
+#     frame, rather than through logging's findCaller.
+#
+#     Python 2.7's logging has no QueueHandler or QueueListener, these
+#     follow the ones added in Python 3.2.
+#
+################################################################################
+
+import atexit
+import json
+import logging
+import Queue
+import sys
+import threading
+
+
+def caller(depth=0):
+    """
+    name of the function calling caller, or of the one depth frames above it
+    """
+    return sys._getframe(depth + 1).f_code.co_name
+
+
+def format_fields(fields):
+    """
+    ' key=value ...' in key order, values with spaces or quotes are quoted
+    """
+    formatted = []
+    for key in sorted(fields):
+        value = fields[key]
+        if isinstance(value, float):
+            value = '%.3f' % value
+        elif isinstance(value, basestring):
+            if not value or [character for character in value if character in ' ="\n']:
+                value = json.dumps(value)
+        else:
+            value = str(value)
+        formatted.append('%s=%s' % (key, value))
+    return ' ' + ' '.join(formatted)
+
+
+class QueueHandler(logging.Handler):
+    """
+    Put records on a queue for a QueueListener
+    """
+    def __init__(self, queue):
+        logging.Handler.__init__(self)
+        self.queue = queue
+
+    def prepare(self, record):
+        #
+        # the listener formats later, on another thread,
+        #  so resolve anything that refers to the caller's state now
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def emit(self, record):
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except Exception:
+            self.handleError(record)
+
+
+class QueueListener(object):
+    """
+    Hand queued records to handlers on a background thread
+    """
+    def __init__(self, queue, handlers):
+        self.queue = queue
+        self.handlers = handlers
+        self.stopped = object()
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='log listener')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def run(self):
+        while True:
+            record = self.queue.get()
+            if record is self.stopped:
+                return
+            for handler in self.handlers:
+                if record.levelno >= handler.level:
+                    handler.handle(record)
+
+    def stop(self):
+        """
+        write everything queued so far and end the thread
+        """
+        if self.thread is not None:
+            self.queue.put(self.stopped)
+            self.thread.join()
+            self.thread = None
+            for handler in self.handlers:
+                handler.flush()
+
+
+class Logger(object):
+    """
+    The logging.Logger methods the apps use, with key/value fields
+    """
+    def __init__(self, logger):
+        self.logger = logger
+        self.name = logger.name
+
+    def _log(self, level, message, args, fields):
+        if not self.logger.isEnabledFor(level):
+            return
+        exc_info = fields.pop('exc_info', None)
+        if exc_info and not isinstance(exc_info, tuple):
+            exc_info = sys.exc_info()
+        if fields:
+            message = (message % args if args else message) + format_fields(fields)
+            args = ()
+
+        #
+        # the frame that called one of the methods below
+        frame = sys._getframe(2)
+        record = self.logger.makeRecord(self.name, level, frame.f_code.co_filename, frame.f_lineno, message, args, exc_info, frame.f_code.co_name, {'fields': fields})
+        self.logger.handle(record)
+
+    def log(self, level, message, *args, **fields):
+        self._log(level, message, args, fields)
+
+    def debug(self, message, *args, **fields):
+        self._log(logging.DEBUG, message, args, fields)
+
+    def info(self, message, *args, **fields):
+        self._log(logging.INFO, message, args, fields)
+
+    def warning(self, message, *args, **fields):
+        self._log(logging.WARNING, message, args, fields)
+
+    warn = warning
+
+    def error(self, message, *args, **fields):
+        self._log(logging.ERROR, message, args, fields)
+
+    def critical(self, message, *args, **fields):
+        self._log(logging.CRITICAL, message, args, fields)
+
+    def exception(self, message, *args, **fields):
+        fields['exc_info'] = True
+        self._log(logging.ERROR, message, args, fields)
+
+    def isEnabledFor(self, level):
+        return self.logger.isEnabledFor(level)
+
+
+def background(logger):
+    """
+    Logger for a configured logging.Logger, its handlers moved to a listener thread
+    """
+    handlers = list(logger.handlers)
+    if handlers:
+        queue = Queue.Queue()
+        for handler in handlers:
+            logger.removeHandler(handler)
+        logger.addHandler(QueueHandler(queue))
+
+        listener = QueueListener(queue, handlers)
+        listener.start()
+        atexit.register(listener.stop)
+
+    return Logger(logger)
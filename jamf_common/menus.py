@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+Index the popup menus defined by computer extension attributes.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     The computerextensionattributes listing only has ids and names, the
+#     input type and choices are in each definition. Definitions are
+#     fetched one at a time, when a field bound to the EA is first used,
+#     and add_definition keeps the popup menus.
+#
+#     A ChoiceIndex answers "what are the choices for this EA" by id or by
+#     name, so a UI field can be bound to an EA by whichever it knows:
+#
+#       combobox['values'] = ea_menus.choices('Purpose')
+#
+#     Choices start with 'None', like the department and building menus.
+#
+################################################################################
+
+POPUP_TYPE = 'Pop-up Menu'
+
+
+class ChoiceIndex(object):
+    """
+    Popup choices of computer extension attributes, by id and by name
+    """
+    def __init__(self, entries=()):
+        self.by_id = {}
+        self.by_name = {}
+        for ea_id, name, choices in entries:
+            self.add(ea_id, name, choices)
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def __contains__(self, key):
+        return self.choices(key) is not None
+
+    def add(self, ea_id, name, choices):
+        menu = ['None'] + list(choices)
+        self.by_id[int(ea_id)] = (name, menu)
+        self.by_name[name] = menu
+
+    def add_definition(self, definition):
+        """
+        index a computer_extension_attribute record, False if it isn't a popup
+        """
+        input_type = definition.get('input_type', {})
+        if input_type.get('type') != POPUP_TYPE:
+            return False
+        self.add(definition['id'], definition['name'], input_type.get('popup_choices', []))
+        return True
+
+    def choices(self, key):
+        """
+        menu for an EA id or name, or None
+        """
+        if isinstance(key, basestring) and key in self.by_name:
+            return self.by_name[key]
+        try:
+            return self.by_id[int(key)][1]
+        except (KeyError, ValueError):
+            return None
+
+    def entries(self):
+        """
+        [id, name, choices] for each EA, the form the index is cached in
+        """
+        return [[ea_id, name, menu[1:]] for ea_id, (name, menu) in sorted(self.by_id.items())]
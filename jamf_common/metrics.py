@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+"""
+Per-endpoint timing of Jamf API calls.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     JamfClient records every request in the process-wide `calls`, keyed
+#     by method and endpoint template, with lookup values replaced:
+#
+#       computers/id/1234                   computers/id/{id}
+#       computers/serialnumber/C02M0000001  computers/serialnumber/{serialnumber}
+#       ldapservers/id/1/group/Staff/user/u0123456
+#                                           ldapservers/id/{id}/group/{group}/user/{user}
+#
+#     Subsets are kept, policies/id/{id}/subset/general&scope is a
+#     different payload from the whole policy.
+#
+#     Each endpoint keeps a count, bytes each way, status codes, and
+#     histograms of request and JSON parse time. Times are binned in
+#     steps of about 19%, so memory doesn't grow with the number of calls
+#     and percentiles are within a bin of the real value. Parse time is
+#     kept apart from request time, so a slow lookup can be put down to
+#     the JSS and the network or to our own parsing.
+#
+#     calls.summary() is the one line the apps show under the status bar.
+#     calls.report() is a table of every endpoint, the apps log it at exit
+#     and when the summary is double-clicked. With JAMF_METRICS_FILE set,
+#     the same numbers are also written there as JSON at exit.
+#
+################################################################################
+
+import atexit
+import collections
+import json
+import math
+import os
+import threading
+
+METRICS_ENV = 'JAMF_METRICS_FILE'
+
+#
+# path segments followed by a lookup value, and the placeholder it becomes
+LOOKUP_KEYS = {
+    'id': '{id}',
+    'udid': '{udid}',
+    'name': '{name}',
+    'serialnumber': '{serialnumber}',
+    'macaddress': '{macaddress}',
+    'match': '{match}',
+    'username': '{username}',
+    'groupid': '{id}',
+    'group': '{group}',
+    'user': '{user}',
+}
+
+#
+# histogram bins are BIN_RATIO apart, starting at BIN_FLOOR seconds
+BIN_RATIO = 2 ** 0.25
+BIN_FLOOR = 0.0001
+
+
+def template(api_call):
+    """
+    api call with lookup values replaced by placeholders
+    """
+    api_call = api_call.split('?')[0]
+    segments = api_call.split('/')
+    placeholder = None
+    for index, segment in enumerate(segments):
+        if placeholder:
+            segments[index] = placeholder
+            placeholder = None
+        elif segment == 'subset':
+            break
+        elif segment in LOOKUP_KEYS:
+            placeholder = LOOKUP_KEYS[segment]
+        elif segment.isdigit():
+            segments[index] = '{id}'
+    return '/'.join(segments)
+
+
+class Histogram(object):
+    """
+    Counts of durations in geometric bins
+    """
+    def __init__(self):
+        self.bins = collections.Counter()
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+
+    def add(self, seconds):
+        self.bins[int(math.floor(math.log(max(seconds, BIN_FLOOR) / BIN_FLOOR, BIN_RATIO)))] += 1
+        self.count += 1
+        self.total += seconds
+        self.maximum = max(self.maximum, seconds)
+
+    def merge(self, other):
+        self.bins.update(other.bins)
+        self.count += other.count
+        self.total += other.total
+        self.maximum = max(self.maximum, other.maximum)
+
+    def percentile(self, fraction):
+        """
+        upper edge of the bin holding the fraction'th duration, in seconds
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if seen >= rank:
+                return min(self.maximum, BIN_FLOOR * BIN_RATIO ** (index + 1))
+        return self.maximum
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+
+class Endpoint(object):
+    """
+    Everything recorded for one method and template
+    """
+    def __init__(self):
+        self.latency = Histogram()
+        self.parsing = Histogram()
+        self.statuses = collections.Counter()
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+
+class CallMetrics(object):
+    """
+    Endpoints keyed by (method, template), safe to record from any thread
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def endpoint(self, method, api_call):
+        key = (method, template(api_call))
+        if key not in self.endpoints:
+            self.endpoints[key] = Endpoint()
+        return self.endpoints[key]
+
+    def record(self, method, api_call, status, seconds, bytes_sent=0, bytes_received=0):
+        """
+        status is the HTTP status, or 'error' when there was no response
+        """
+        with self.lock:
+            endpoint = self.endpoint(method, api_call)
+            endpoint.latency.add(seconds)
+            endpoint.statuses[status] += 1
+            endpoint.bytes_sent += bytes_sent
+            endpoint.bytes_received += bytes_received
+
+    def record_parse(self, method, api_call, seconds):
+        with self.lock:
+            self.endpoint(method, api_call).parsing.add(seconds)
+
+    def overall(self):
+        """
+        Histogram of every request
+        """
+        combined = Histogram()
+        with self.lock:
+            for endpoint in self.endpoints.values():
+                combined.merge(endpoint.latency)
+        return combined
+
+    def summary(self):
+        """
+        'N calls, p50 X ms, p95 Y ms'
+        """
+        combined = self.overall()
+        if not combined.count:
+            return "No Jamf calls yet."
+        return "%i calls, p50 %i ms, p95 %i ms" % (combined.count, combined.percentile(0.5) * 1000, combined.percentile(0.95) * 1000)
+
+    def snapshot(self):
+        """
+        the recorded numbers as JSON-ready dicts, busiest endpoint first
+        """
+        endpoints = []
+        with self.lock:
+            for (method, api_template), endpoint in self.endpoints.items():
+                endpoints.append({
+                    'method': method,
+                    'endpoint': api_template,
+                    'calls': endpoint.latency.count,
+                    'statuses': dict((str(status), count) for status, count in endpoint.statuses.items()),
+                    'bytes_sent': endpoint.bytes_sent,
+                    'bytes_received': endpoint.bytes_received,
+                    'seconds': endpoint.latency.total,
+                    'p50': endpoint.latency.percentile(0.5),
+                    'p95': endpoint.latency.percentile(0.95),
+                    'max': endpoint.latency.maximum,
+                    'parse_seconds': endpoint.parsing.total,
+                    'parse_p95': endpoint.parsing.percentile(0.95),
+                })
+        return sorted(endpoints, key=lambda item: item['seconds'], reverse=True)
+
+    def report(self):
+        """
+        table of every endpoint, for the log
+        """
+        lines = ["%-6s %-60s %6s %8s %8s %8s %9s %10s  %s" % ('method', 'endpoint', 'calls', 'p50 ms', 'p95 ms', 'max ms', 'parse ms', 'KB in', 'statuses')]
+        for item in self.snapshot():
+            statuses = ' '.join('%s:%i' % (status, count) for status, count in sorted(item['statuses'].items()))
+            lines.append("%-6s %-60s %6i %8i %8i %8i %9i %10.1f  %s" % (item['method'], item['endpoint'], item['calls'], item['p50'] * 1000, item['p95'] * 1000, item['max'] * 1000, item['parse_seconds'] * 1000, item['bytes_received'] / 1024.0, statuses))
+        lines.append(self.summary())
+        return '\n'.join(lines)
+
+    def reset(self):
+        with self.lock:
+            self.endpoints = {}
+
+
+calls = CallMetrics()
+
+
+def log_report(logger):
+    logger.info("Jamf API calls:\n%s" % calls.report())
+
+
+def dump_at_exit(logger=None):
+    """
+    log the report when the process exits, and write JSON to JAMF_METRICS_FILE if set
+    """
+    def dump():
+        if logger:
+            log_report(logger)
+        path = os.environ.get(METRICS_ENV)
+        if path:
+            try:
+                with open(path, 'w') as metrics_file:
+                    json.dump({'summary': calls.summary(), 'endpoints': calls.snapshot()}, metrics_file, indent=1, sort_keys=True)
+            except (IOError, OSError) as error:
+                if logger:
+                    logger.error("Metrics: Unable to write %s. [%s]" % (path, error))
+    atexit.register(dump)
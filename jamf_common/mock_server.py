@@ -0,0 +1,631 @@
+# -*- coding: utf-8 -*-
+"""
+Local stand-in for the Jamf Classic API, for offline and performance testing.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Serves a synthetic fleet from the /JSSResource endpoints Tugboat and
+#     Cargo Ship use, with the same JSON shapes the apps parse:
+#
+#       computers, computers/id/, computers/udid/, computers/match/,
+#       computers/serialnumber/, computers/name/
+#       computergroups, computergroups/id/, computergroups/name/
+#       policies, policies/id/ (and /subset/)
+#       osxconfigurationprofiles, departments, buildings
+#       accounts, accounts/groupid/, accounts/username/
+#       ldapservers, ldapservers/id/../group/../user/..
+#       users/name/, computerextensionattributes (and /id/, /name/)
+#
+#     PUT computers/id/ (or serialnumber/, name/) accepts the XML Tugboat
+#     submits and updates the record in memory. Unknown departments and
+#     buildings are refused with a 409, as Jamf does.
+#
+#     The Jamf Pro API token endpoints, POST /api/v1/auth/token and
+#     /api/v1/auth/keep-alive, issue bearer tokens that every endpoint
+#     accepts in place of Basic auth. credential_cost adds a delay to each
+#     Basic auth check, standing in for the JSS verifying a password.
+#
+#     The fleet is generated from a seed, so runs are repeatable. Latency,
+#     random errors and a concurrency limit (503 with Retry-After) can be
+#     set to exercise the fan-out and retry code.
+#
+#     From the repository root:
+#
+#       python -m jamf_common.mock_server --computers 5000 --policies 3000
+#
+#     then log in to http://localhost:8080 as admin / jamf1234.
+#
+#     --check runs regression checks of the fetch code against a private
+#     server and exits non-zero if one fails. check_backpressure fetches
+#     from a server with a concurrency limit, fetch_all has to be no slower
+#     than the same calls made one after another.
+#
+################################################################################
+
+from __future__ import print_function
+import argparse
+import base64
+import BaseHTTPServer
+import fnmatch
+import json
+import random
+import re
+import SocketServer
+import sys
+import threading
+import time
+import urllib
+import urlparse
+import uuid
+import xml.etree.cElementTree as ET
+
+DEFAULT_PORT = 8080
+DEFAULT_USERNAME = 'admin'
+DEFAULT_PASSWORD = 'jamf1234'
+
+AUTH_PATH = '/api/v1/auth/'
+
+#
+# seconds a bearer token is valid, Jamf's default is 30 minutes
+DEFAULT_TOKEN_LIFETIME = 30 * 60
+
+#
+# privileges the apps check for at login
+PRIVILEGES = ['Read Accounts', 'Read Buildings', 'Read Computers', 'Read Departments', 'Read User', 'Read LDAP Servers', 'Update Computers', 'Update User']
+
+LOCATION_FIELDS = ['username', 'real_name', 'email_address', 'phone', 'position', 'department', 'building', 'room']
+GENERAL_FIELDS = ['name', 'asset_tag', 'barcode_1']
+
+
+class Fleet(object):
+    """
+    Synthetic Jamf data, generated from a seed
+    """
+    def __init__(self, computers=500, policies=300, groups=40, profiles=50, eas=10, username=DEFAULT_USERNAME, password=DEFAULT_PASSWORD, seed=0):
+        rng = random.Random(seed)
+        self.username = username
+        self.password = password
+        self.lock = threading.Lock()
+
+        self.departments = [{'id': index + 1, 'name': name} for index, name in enumerate(['Biology', 'Chemistry', 'History', 'Library', 'Mathematics', 'Physics'])]
+        self.buildings = [{'id': index + 1, 'name': name} for index, name in enumerate(['Annex', 'Main Library', 'Science Hall', 'Union'])]
+        self.groups = [{'id': index + 1, 'name': 'Group %03i' % (index + 1)} for index in range(groups)]
+        self.profiles = [{'id': index + 1, 'name': 'Profile %03i' % (index + 1)} for index in range(profiles)]
+
+        self.eas = {}
+        for index in range(eas):
+            ea_id = index + 1
+            self.eas[ea_id] = {
+                'id': ea_id,
+                'name': 'Attribute %02i' % ea_id,
+                'input_type': {'type': 'Pop-up Menu', 'popup_choices': ['Choice %i' % choice for choice in range(1, 5)]},
+            }
+            #
+            # not every attribute is a popup
+            if index % 3 == 2:
+                self.eas[ea_id]['input_type'] = {'type': 'Text Field'}
+
+        self.users = {}
+        self.computers = {}
+        self.udids = {}
+        self.serials = {}
+        for index in range(computers):
+            computer_id = index + 1
+            owner = 'user%04i' % rng.randint(1, max(1, computers / 2))
+            self.users.setdefault(owner, {'id': len(self.users) + 1, 'name': owner, 'full_name': owner.title(), 'email': owner + '@example.edu'})
+            computer_udid = str(uuid.UUID(int=rng.getrandbits(128))).upper()
+            self.udids[computer_udid] = computer_id
+            serial_number = 'C02M%07i' % computer_id
+            self.serials[serial_number] = computer_id
+
+            self.computers[computer_id] = {
+                'general': {
+                    'id': computer_id,
+                    'name': 'labmac-%i' % computer_id,
+                    'udid': computer_udid,
+                    'serial_number': serial_number,
+                    'asset_tag': '%06i' % rng.randint(0, 999999),
+                    'barcode_1': '',
+                    'platform': 'Mac',
+                    'remote_management': {'managed': rng.random() < 0.9},
+                    'last_contact_time': '2018-01-%02i 08:%02i:00' % (rng.randint(1, 28), rng.randint(0, 59)),
+                    'report_date': '2018-01-%02i 09:%02i:00' % (rng.randint(1, 28), rng.randint(0, 59)),
+                },
+                'location': {
+                    'username': owner,
+                    'real_name': owner.title(),
+                    'email_address': owner + '@example.edu',
+                    'phone': '',
+                    'position': '',
+                    'department': rng.choice(self.departments)['name'],
+                    'building': rng.choice(self.buildings)['name'],
+                    'room': str(rng.randint(100, 499)),
+                },
+                'hardware': {'mapped_printers': [{'name': 'printer-%i' % rng.randint(1, 20)} for _ in range(rng.randint(0, 3))]},
+                'groups_accounts': {'computer_group_memberships': [group['name'] for group in rng.sample(self.groups, min(len(self.groups), rng.randint(0, 8)))]},
+                'extension_attributes': [{'id': ea['id'], 'name': ea['name'], 'value': rng.choice(ea['input_type'].get('popup_choices', ['Text']) + [''])} for ea in self.eas.values()],
+                'configuration_profiles': [{'id': profile['id']} for profile in rng.sample(self.profiles, min(len(self.profiles), rng.randint(0, 6)))],
+                'software': {
+                    'installed_by_casper': ['Package %03i.pkg' % rng.randint(1, 300) for _ in range(rng.randint(0, 20))],
+                    'installed_by_installer_swu': ['Update %03i' % rng.randint(1, 300) for _ in range(rng.randint(0, 20))],
+                },
+            }
+
+        self.policies = {}
+        for index in range(policies):
+            policy_id = index + 1
+            self.policies[policy_id] = {
+                'general': {'id': policy_id, 'name': 'Policy %04i' % policy_id},
+                'scope': {
+                    'all_computers': rng.random() < 0.05,
+                    'computers': [self.computer_summary(computer_id) for computer_id in rng.sample(self.computers, min(len(self.computers), rng.randint(0, 3)))],
+                    'computer_groups': rng.sample(self.groups, min(len(self.groups), rng.randint(0, 3))),
+                    'exclusions': {
+                        'computers': [self.computer_summary(computer_id) for computer_id in rng.sample(self.computers, min(len(self.computers), rng.randint(0, 1)))],
+                        'computer_groups': rng.sample(self.groups, min(len(self.groups), rng.randint(0, 1))),
+                    },
+                },
+            }
+
+        self.ldap_servers = [{'id': 1, 'name': 'ldap.example.edu'}]
+        self.account_groups = {
+            1: {'id': 1, 'name': 'Jamf Admins', 'privileges': {'jss_objects': list(PRIVILEGES)}, 'members': [username]},
+            2: {'id': 2, 'name': 'Help Desk', 'privileges': {'jss_objects': [item for item in PRIVILEGES if item.startswith('Read')]}, 'members': []},
+        }
+
+    def computer_summary(self, computer_id):
+        return {'id': computer_id, 'name': self.computers[computer_id]['general']['name']}
+
+    def find_computer(self, key, value):
+        """
+        id of the computer with a serial number or name, or None
+        """
+        if key == 'serialnumber':
+            return self.serials.get(value.upper())
+        for computer_id, record in self.computers.items():
+            if record['general']['name'] == value:
+                return computer_id
+        return None
+
+    def update_computer(self, computer_id, xml_string):
+        """
+        apply the fields of a submitted computer record
+        raises ValueError for a department or building Jamf doesn't know
+        """
+        top = ET.fromstring(xml_string)
+        for field, known in [('department', self.departments), ('building', self.buildings)]:
+            value = top.findtext('location/' + field)
+            if value and value not in [item['name'] for item in known]:
+                raise ValueError("Problem with %s" % field)
+
+        with self.lock:
+            record = self.computers[computer_id]
+            for section, fields in [('general', GENERAL_FIELDS), ('location', LOCATION_FIELDS)]:
+                element = top.find(section)
+                if element is None:
+                    continue
+                for field in fields:
+                    value = element.find(field)
+                    if value is not None:
+                        record[section][field] = value.text or ''
+
+
+class MockHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    """
+    Answer Classic API requests from the server's fleet
+    """
+    protocol_version = 'HTTP/1.1'
+
+    #
+    # send each response in one segment, small unbuffered writes stall on delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+    def do_GET(self):
+        self.handle_call('GET')
+
+    def do_PUT(self):
+        self.handle_call('PUT')
+
+    def do_POST(self):
+        self.handle_call('POST')
+
+    def handle_call(self, method):
+        length = int(self.headers.getheader('Content-Length') or 0)
+        body = self.rfile.read(length) if length else ''
+
+        if not self.server.enter():
+            self.respond(503, {'error': 'Too many requests.'}, {'Retry-After': '1'})
+            return
+        try:
+            if self.server.latency or self.server.jitter:
+                time.sleep(max(0, self.server.latency + random.uniform(-self.server.jitter, self.server.jitter)))
+
+            path = urlparse.urlsplit(self.path).path
+            if not self.authorized(path):
+                self.respond(401, {'error': 'The request requires user authentication.'}, {'WWW-Authenticate': 'Basic realm="Restful JSS Access -- Please supply your credentials"'})
+                return
+
+            if self.server.error_rate and random.random() < self.server.error_rate:
+                self.respond(500, {'error': 'Injected server error.'})
+                return
+
+            if path.startswith(AUTH_PATH):
+                status, payload = self.server.route_auth(method, path[len(AUTH_PATH):], self.headers.getheader('Authorization'))
+                self.respond(status, payload)
+                return
+
+            if not path.startswith('/JSSResource/'):
+                self.respond(404, {'error': 'Not Found'})
+                return
+            api_call = path[len('/JSSResource/'):]
+
+            try:
+                status, payload = self.server.route(method, api_call, body)
+            except Exception as exception_message:
+                status, payload = 500, {'error': str(exception_message)}
+            self.respond(status, payload)
+        finally:
+            self.server.leave()
+
+    def authorized(self, path):
+        authorization = self.headers.getheader('Authorization') or ''
+        #
+        # a token can't be used to get a token, keep-alive needs one
+        if authorization.startswith('Bearer '):
+            return path != AUTH_PATH + 'token' and self.server.token_valid(authorization[len('Bearer '):])
+        if path == AUTH_PATH + 'keep-alive':
+            return False
+
+        if self.server.credential_cost:
+            time.sleep(self.server.credential_cost)
+        expected = 'Basic ' + base64.b64encode(self.server.fleet.username + ':' + self.server.fleet.password)
+        return authorization == expected
+
+    def respond(self, status, payload, headers=None):
+        if status >= 400:
+            #
+            # Jamf reports errors as HTML, the apps scrape "Error: ...<" from 409s
+            body = '<html><body><p>Error: %s</p></body></html>' % payload.get('error', '')
+            content_type = 'text/html'
+        elif isinstance(payload, basestring):
+            body = payload
+            content_type = 'text/xml'
+        else:
+            body = json.dumps(payload)
+            content_type = 'application/json'
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class MockServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    """
+    Threaded HTTP server holding the fleet and the fault settings
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, fleet, latency=0.0, jitter=0.0, error_rate=0.0, max_concurrent=0, verbose=False, tokens=True, token_lifetime=DEFAULT_TOKEN_LIFETIME, credential_cost=0.0):
+        BaseHTTPServer.HTTPServer.__init__(self, address, MockHandler)
+        self.fleet = fleet
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.max_concurrent = max_concurrent
+        self.verbose = verbose
+        self.tokens = tokens
+        self.token_lifetime = token_lifetime
+        self.credential_cost = credential_cost
+        self.in_flight = 0
+        self.in_flight_lock = threading.Lock()
+        self.issued = {}
+        self.issued_lock = threading.Lock()
+        self.routes = [
+            ('GET', r'computers$', self.get_computers),
+            ('GET', r'computers/id/(\d+)(/subset/.*)?$', self.get_computer),
+            ('PUT', r'computers/id/(\d+)$', self.put_computer),
+            ('GET', r'computers/udid/([^/]+)(/subset/.*)?$', self.get_computer_udid),
+            ('GET', r'computers/(serialnumber|name)/([^/]+)(/subset/.*)?$', self.get_computer_by),
+            ('PUT', r'computers/(serialnumber|name)/([^/]+)$', self.put_computer_by),
+            ('GET', r'computers/match/(.+)$', self.match_computers),
+            ('GET', r'computergroups$', self.get_groups),
+            ('GET', r'computergroups/(id|name)/([^/]+)$', self.get_group),
+            ('GET', r'policies$', self.get_policies),
+            ('GET', r'policies/id/(\d+)(/subset/.*)?$', self.get_policy),
+            ('GET', r'osxconfigurationprofiles$', self.get_profiles),
+            ('GET', r'departments$', self.get_departments),
+            ('GET', r'buildings$', self.get_buildings),
+            ('GET', r'accounts$', self.get_accounts),
+            ('GET', r'accounts/groupid/(\d+)$', self.get_account_group),
+            ('GET', r'accounts/username/(.+)$', self.get_account_user),
+            ('GET', r'ldapservers$', self.get_ldap_servers),
+            ('GET', r'ldapservers/id/(\d+)/group/(.+)/user/(.+)$', self.get_ldap_membership),
+            ('GET', r'users/name/(.+)$', self.get_user),
+            ('GET', r'computerextensionattributes$', self.get_eas),
+            ('GET', r'computerextensionattributes/id/(\d+)$', self.get_ea),
+            ('GET', r'computerextensionattributes/name/(.+)$', self.get_ea_by_name),
+        ]
+
+    def enter(self):
+        with self.in_flight_lock:
+            if self.max_concurrent and self.in_flight >= self.max_concurrent:
+                return False
+            self.in_flight += 1
+            return True
+
+    def leave(self):
+        with self.in_flight_lock:
+            self.in_flight -= 1
+
+    def token_valid(self, token):
+        with self.issued_lock:
+            return self.issued.get(token, 0) > time.time()
+
+    def route_auth(self, method, action, authorization):
+        """
+        token endpoints, the caller is already authorized
+        """
+        if not self.tokens or method != 'POST' or action not in ('token', 'keep-alive'):
+            return 404, {'error': 'Not Found'}
+
+        expires = time.time() + self.token_lifetime
+        token = uuid.uuid4().hex
+        with self.issued_lock:
+            if action == 'keep-alive':
+                self.issued.pop(authorization[len('Bearer '):], None)
+            self.issued[token] = expires
+        return 200, {'token': token, 'expires': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(expires)) + '.000Z'}
+
+    def route(self, method, api_call, body):
+        for route_method, pattern, handler in self.routes:
+            match = re.match(pattern, api_call)
+            if match and route_method == method:
+                arguments = [urllib.unquote(group) for group in match.groups() if group is not None and not group.startswith('/subset/')]
+                if method == 'PUT':
+                    arguments.append(body)
+                return handler(*arguments)
+        return 404, {'error': 'The server has not found anything matching the request URI'}
+
+    def get_computers(self):
+        return 200, {'computers': [self.fleet.computer_summary(computer_id) for computer_id in sorted(self.fleet.computers)]}
+
+    def get_computer(self, computer_id):
+        if int(computer_id) not in self.fleet.computers:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        with self.fleet.lock:
+            return 200, {'computer': self.fleet.computers[int(computer_id)]}
+
+    def put_computer(self, computer_id, body):
+        if int(computer_id) not in self.fleet.computers:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        try:
+            self.fleet.update_computer(int(computer_id), body)
+        except ET.ParseError as exception_message:
+            return 409, {'error': 'Problem with XML %s' % exception_message}
+        except ValueError as exception_message:
+            return 409, {'error': str(exception_message)}
+        return 201, '<?xml version="1.0" encoding="UTF-8"?><computer><id>%s</id></computer>' % computer_id
+
+    def get_computer_udid(self, computer_udid):
+        if computer_udid.upper() not in self.fleet.udids:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return self.get_computer(self.fleet.udids[computer_udid.upper()])
+
+    def get_computer_by(self, key, value):
+        computer_id = self.fleet.find_computer(key, value)
+        if computer_id is None:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return self.get_computer(computer_id)
+
+    def put_computer_by(self, key, value, body):
+        computer_id = self.fleet.find_computer(key, value)
+        if computer_id is None:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return self.put_computer(computer_id, body)
+
+    def match_computers(self, pattern):
+        pattern = pattern.lower()
+        matches = []
+        for computer_id in sorted(self.fleet.computers):
+            record = self.fleet.computers[computer_id]
+            fields = [record['general']['name'], record['general']['asset_tag'], record['location']['username'], record['location']['real_name']]
+            if [field for field in fields if fnmatch.fnmatchcase(field.lower(), pattern)]:
+                summary = self.fleet.computer_summary(computer_id)
+                summary['udid'] = record['general']['udid']
+                summary['username'] = record['location']['username']
+                matches.append(summary)
+        return 200, {'computers': matches}
+
+    def get_groups(self):
+        return 200, {'computer_groups': [dict(group, is_smart=True) for group in self.fleet.groups]}
+
+    def get_group(self, key, value):
+        found = [group for group in self.fleet.groups if str(group[key]) == value]
+        if not found:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        group = found[0]
+        with self.fleet.lock:
+            members = [self.fleet.computer_summary(computer_id) for computer_id, record in sorted(self.fleet.computers.items())
+                       if group['name'] in record['groups_accounts']['computer_group_memberships']]
+        return 200, {'computer_group': dict(group, is_smart=True, computers=members)}
+
+    def get_policies(self):
+        return 200, {'policies': [policy['general'] for _, policy in sorted(self.fleet.policies.items())]}
+
+    def get_policy(self, policy_id):
+        if int(policy_id) not in self.fleet.policies:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return 200, {'policy': self.fleet.policies[int(policy_id)]}
+
+    def get_profiles(self):
+        return 200, {'os_x_configuration_profiles': self.fleet.profiles}
+
+    def get_departments(self):
+        return 200, {'departments': self.fleet.departments}
+
+    def get_buildings(self):
+        return 200, {'buildings': self.fleet.buildings}
+
+    def get_accounts(self):
+        return 200, {'accounts': {
+            'users': [{'id': 1, 'name': self.fleet.username}],
+            'groups': [{'id': group['id'], 'name': group['name']} for _, group in sorted(self.fleet.account_groups.items())],
+        }}
+
+    def get_account_group(self, group_id):
+        if int(group_id) not in self.fleet.account_groups:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        group = self.fleet.account_groups[int(group_id)]
+        return 200, {'group': {'id': group['id'], 'name': group['name'], 'privileges': group['privileges']}}
+
+    def get_account_user(self, username):
+        if username != self.fleet.username:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return 200, {'account': {'id': 1, 'name': username, 'privileges': {'jss_objects': list(PRIVILEGES)}}}
+
+    def get_ldap_servers(self):
+        return 200, {'ldap_servers': self.fleet.ldap_servers}
+
+    def get_ldap_membership(self, server_id, group_name, username):
+        group_name, username = group_name.decode('utf-8'), username.decode('utf-8')
+        members = []
+        for group in self.fleet.account_groups.values():
+            if group['name'] == group_name and username in group['members']:
+                members.append({'username': username})
+        return 200, {'ldap_users': members}
+
+    def get_user(self, username):
+        if username not in self.fleet.users:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return 200, {'user': self.fleet.users[username]}
+
+    def get_eas(self):
+        return 200, {'computer_extension_attributes': [{'id': ea['id'], 'name': ea['name']} for _, ea in sorted(self.fleet.eas.items())]}
+
+    def get_ea(self, ea_id):
+        if int(ea_id) not in self.fleet.eas:
+            return 404, {'error': 'The server has not found anything matching the request URI'}
+        return 200, {'computer_extension_attribute': self.fleet.eas[int(ea_id)]}
+
+    def get_ea_by_name(self, name):
+        for ea in self.fleet.eas.values():
+            if ea['name'] == name.decode('utf-8'):
+                return 200, {'computer_extension_attribute': ea}
+        return 404, {'error': 'The server has not found anything matching the request URI'}
+
+
+def start(fleet=None, host='127.0.0.1', port=0, **settings):
+    """
+    serve on a background thread, returns the server and its base url
+    port 0 picks a free port
+    """
+    server = MockServer((host, port), fleet or Fleet(), **settings)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server, 'http://%s:%i' % server.server_address
+
+
+def check_backpressure(computers=200, latency=0.01, max_concurrent=3, concurrency=10):
+    """
+    fetch computers serially and through fetch_all from a server that turns
+    away requests past max_concurrent, returns (serial seconds, fetch_all seconds)
+    """
+    from jamf_common import client, fetch
+
+    fleet = Fleet(computers=computers, policies=1)
+    server, url = start(fleet, latency=latency, max_concurrent=max_concurrent)
+    try:
+        jamf_client = client.JamfClient(url, fleet.username, fleet.password)
+        api_calls = ['computers/id/%i' % computer_id for computer_id in sorted(fleet.computers)]
+
+        start_time = time.time()
+        for api_call in api_calls:
+            jamf_client.get_json(api_call)
+        serial = time.time() - start_time
+
+        start_time = time.time()
+        fetch.fetch_all(jamf_client, api_calls, concurrency)
+        concurrent = time.time() - start_time
+    finally:
+        server.shutdown()
+        server.server_close()
+    return serial, concurrent
+
+
+def check():
+    """
+    run the regression checks, returns the number that failed
+    """
+    failed = 0
+    serial, concurrent = check_backpressure()
+    passed = concurrent <= serial
+    print("%s check_backpressure: serial %.2fs, fetch_all %.2fs" % ('ok  ' if passed else 'FAIL', serial, concurrent))
+    if not passed:
+        failed += 1
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a synthetic Jamf Classic API.")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--computers', type=int, default=500)
+    parser.add_argument('--policies', type=int, default=300)
+    parser.add_argument('--groups', type=int, default=40)
+    parser.add_argument('--profiles', type=int, default=50)
+    parser.add_argument('--eas', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--username', default=DEFAULT_USERNAME)
+    parser.add_argument('--password', default=DEFAULT_PASSWORD)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds added to every request")
+    parser.add_argument('--jitter', type=float, default=0.0, help="random +/- seconds added to the latency")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of requests answered with a 500")
+    parser.add_argument('--max-concurrent', type=int, default=0, help="requests beyond this get a 503 with Retry-After")
+    parser.add_argument('--no-tokens', dest='tokens', action='store_false', help="answer the token endpoints with 404, as older servers do")
+    parser.add_argument('--token-lifetime', type=int, default=DEFAULT_TOKEN_LIFETIME, help="seconds a bearer token is valid")
+    parser.add_argument('--credential-cost', type=float, default=0.0, help="seconds added to every Basic auth check")
+    parser.add_argument('--verbose', action='store_true', help="log every request")
+    parser.add_argument('--check', action='store_true', help="run the fetch regression checks against a private server and exit")
+    args = parser.parse_args()
+
+    if args.check:
+        sys.exit(1 if check() else 0)
+
+    fleet = Fleet(args.computers, args.policies, args.groups, args.profiles, args.eas, args.username, args.password, args.seed)
+    server = MockServer((args.host, args.port), fleet, args.latency, args.jitter, args.error_rate, args.max_concurrent, args.verbose, args.tokens, args.token_lifetime, args.credential_cost)
+
+    print("Serving %i computers and %i policies on http://%s:%i as %s / %s" % (len(fleet.computers), len(fleet.policies), args.host, args.port, args.username, args.password))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
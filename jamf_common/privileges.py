@@ -0,0 +1,329 @@
+# -*- coding: utf-8 -*-
+"""
+Decide what access a Jamf account has, with as few round trips as possible.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Access is granted in this order, the first match wins:
+#
+#       user account with read and update privileges     full
+#       member of an LDAP group with both                 full
+#       user account with read privileges                 read-only
+#       member of an LDAP group with read privileges      read-only
+#
+#     Each step's calls are issued together through fetch_all, all of them
+#     in flight from the start rather than waiting on the window's slow
+#     start, and the cascade stops at the first step that grants access. Membership calls
+#     stop as soon as one server reports the user in a group.
+#
+#     Group privileges change rarely and are the same for every user, so
+#     they are cached per host. Only groups missing from the cache are
+#     fetched, a warm login is accounts, ldapservers and the user's own
+#     account, all at once.
+#
+#     authorize goes one step further. The access level it grants is
+#     remembered per host and user for AUTH_CACHE_TTL, signed with a key
+#     derived from the password and bound to a hash of the privileges it
+#     was decided on: the accounts listing, the user's own privileges, and
+#     for a level granted through LDAP, the privileges of the groups. A
+#     later login fetches accounts, which also proves the password, and
+#     the user's account together, reads group privileges from their
+#     cache, and ignores the entry if its signature doesn't match the
+#     password entered or any of those privileges have changed. Apps
+#     revalidate a remembered level with check_access once their window
+#     is up.
+#
+################################################################################
+
+import collections
+import hashlib
+import hmac
+import json
+import os
+import time
+import urllib
+
+import fetch
+
+#
+# seconds a host's group privileges are trusted
+GROUP_CACHE_TTL = 12 * 60 * 60
+GROUP_CACHE_KEY = 'group_privileges'
+
+#
+# seconds a granted access level is remembered, 0 disables
+AUTH_CACHE_TTL = 8 * 60 * 60
+AUTH_CACHE_KEY = 'authorization.'
+
+#
+# PBKDF2 rounds for the key that signs a remembered access level
+AUTH_KEY_ROUNDS = 20000
+
+#
+# level is 'full', 'read-only' or None, source is 'user' or 'ldap'
+# snapshot is a hash of the privileges the level was decided on, see snapshot_hash
+Access = collections.namedtuple('Access', ['level', 'source', 'missing', 'snapshot'])
+
+
+def missing_from(privileges, required):
+    return [item for item in required if item not in privileges]
+
+
+def fetch_together(jamf_client, api_calls, logger=None, **kwargs):
+    """
+    fetch_all with every call in flight from the start, up to fetch's usual ceiling
+    """
+    size = min(len(api_calls), fetch.DEFAULT_CONCURRENCY)
+    return fetch.fetch_all(jamf_client, api_calls, size, logger, initial=size, **kwargs)
+
+
+def quoted(value):
+    """
+    value as a single segment of an api call, names may have spaces, slashes or non-ASCII
+    """
+    return urllib.quote(value.encode('utf-8'), safe='')
+
+
+def snapshot_hash(jss_accounts, user_privileges, privileges):
+    """
+    hash of the accounts listing, the user's own privileges (None for LDAP users)
+    and the {group id: privileges} of the groups, empty unless access came through LDAP
+    """
+    return hashlib.sha256(json.dumps([jss_accounts['accounts'], user_privileges, privileges], sort_keys=True)).hexdigest()
+
+
+def user_privileges_from(raw_user):
+    """
+    privileges from an accounts/username/... response, None if the user has no account
+    """
+    if isinstance(raw_user, fetch.FetchError):
+        return None
+    return raw_user['account']['privileges']['jss_objects']
+
+
+def group_privileges(jamf_client, groups, cache=None, logger=None, fresh=False):
+    """
+    {group id: privileges} for each group, from the cache where possible
+    fresh ignores cached privileges, the cache is still updated
+    """
+    host = jamf_client.jamf_hostname
+    cached = {}
+    if cache is not None and not fresh:
+        cached = cache.get(host, GROUP_CACHE_KEY, ttl=GROUP_CACHE_TTL)[0] or {}
+
+    privileges = {}
+    to_fetch = []
+    for group in groups:
+        if str(group['id']) in cached:
+            privileges[group['id']] = cached[str(group['id'])]
+        else:
+            to_fetch.append(group['id'])
+
+    if logger:
+        logger.info("group_privileges: %i cached, %i to fetch." % (len(privileges), len(to_fetch)))
+
+    if to_fetch:
+        results = fetch_together(jamf_client, ['accounts/groupid/' + str(group_id) for group_id in to_fetch], logger)
+        for group_id, raw_privs in zip(to_fetch, results):
+            privileges[group_id] = raw_privs['group']['privileges']['jss_objects']
+
+        if cache is not None:
+            cache.set(host, GROUP_CACHE_KEY, dict((str(group_id), value) for group_id, value in privileges.items()))
+
+    return privileges
+
+
+def ldap_member(jamf_client, username, servers, groups, logger=None):
+    """
+    True if any server reports the user in any of the groups
+    """
+    pairs = [(server, group) for server in servers for group in groups]
+    if not pairs:
+        return False
+
+    api_calls = ['ldapservers/id/' + str(server['id']) + '/group/' + quoted(group['name']) + '/user/' + quoted(username) for server, group in pairs]
+    results = fetch_together(jamf_client, api_calls, logger, stop_when=lambda result: result['ldap_users'])
+
+    for (server, group), result in zip(pairs, results):
+        if result is not None and result['ldap_users']:
+            if logger:
+                logger.info("ldap_member: %s is a member of %s on server %s" % (username, group['name'], server['name']))
+            return True
+    return False
+
+
+def check_access(jamf_client, username, read_privileges, update_privileges, cache=None, logger=None, fresh=False):
+    """
+    return the Access of username. communication errors are raised.
+    """
+    jss_accounts, raw_ldap, raw_user = fetch_together(jamf_client, ['accounts', 'ldapservers', 'accounts/username/' + quoted(username)], logger, partial=True)
+    for result in (jss_accounts, raw_ldap):
+        if isinstance(result, fetch.FetchError):
+            raise result.cause
+
+    ldap_servers = raw_ldap['ldap_servers']
+    if logger:
+        logger.info("JSS LDAP servers: %r" % ldap_servers)
+
+    #
+    # the user's own account, LDAP users don't have one
+    missing_read = list(read_privileges)
+    missing_update = list(update_privileges)
+    user_privileges = user_privileges_from(raw_user)
+    if user_privileges is None:
+        if logger:
+            logger.warn("check_access: Error checking user account info. (%r)" % raw_user.cause)
+    else:
+        missing_read = missing_from(user_privileges, read_privileges)
+        missing_update = missing_from(user_privileges, update_privileges)
+        if (missing_read or missing_update) and logger:
+            logger.warn("check_access: %s is missing privileges for full access: %r" % (username, missing_read + missing_update))
+
+    if not missing_read and not missing_update:
+        return Access('full', 'user', [], snapshot_hash(jss_accounts, user_privileges, {}))
+
+    #
+    # find groups on jss that have required privileges, LDAP users are
+    # granted access through these
+    group_list = jss_accounts['accounts']['groups']
+    privileges = group_privileges(jamf_client, group_list, cache, logger, fresh) if ldap_servers else {}
+
+    valid_full_groups = []
+    valid_read_groups = []
+    for group in group_list:
+        if group['id'] not in privileges:
+            continue
+        missing_group_read = missing_from(privileges[group['id']], read_privileges)
+        missing_group_update = missing_from(privileges[group['id']], update_privileges)
+
+        if not missing_group_read and not missing_group_update:
+            valid_full_groups.append(group)
+        elif not missing_group_read:
+            valid_read_groups.append(group)
+            if logger:
+                logger.warn("check_access: Group %r lacks appropriate update privileges: %r" % (group['name'], missing_group_update))
+        elif logger:
+            logger.info("check_access: Group %r lacks appropriate privileges: %r" % (group['name'], missing_group_read + missing_group_update))
+
+    if ldap_member(jamf_client, username, ldap_servers, valid_full_groups, logger):
+        return Access('full', 'ldap', [], snapshot_hash(jss_accounts, user_privileges, privileges))
+
+    if not missing_read:
+        return Access('read-only', 'user', missing_update, snapshot_hash(jss_accounts, user_privileges, {}))
+
+    if ldap_member(jamf_client, username, ldap_servers, valid_read_groups, logger):
+        return Access('read-only', 'ldap', [], snapshot_hash(jss_accounts, user_privileges, privileges))
+
+    #
+    # group privileges may have been granted since they were cached,
+    # confirm a denial against the server before reporting it
+    if ldap_servers and cache is not None and not fresh:
+        if logger:
+            logger.info("check_access: Access denied with cached group privileges, checking again.")
+        return check_access(jamf_client, username, read_privileges, update_privileges, cache, logger, fresh=True)
+
+    return Access(None, None, missing_read + missing_update, snapshot_hash(jss_accounts, user_privileges, privileges))
+
+
+def signature(password, entry):
+    """
+    HMAC of a remembered access level, keyed by the credentials
+    """
+    key = hashlib.pbkdf2_hmac('sha256', (entry['username'] + ':' + password).encode('utf-8'), entry['salt'].encode('utf-8'), AUTH_KEY_ROUNDS)
+    message = '\n'.join([entry['host'], entry['username'], entry['level'], entry['source'], entry['snapshot'], str(entry['stored'])])
+    return hmac.new(key, message.encode('utf-8'), hashlib.sha256).hexdigest()
+
+
+def remember(cache, host, username, password, access):
+    """
+    store a granted access level for recall
+    """
+    entry = {
+        'host': host,
+        'username': username,
+        'level': access.level,
+        'source': access.source,
+        'snapshot': access.snapshot,
+        'stored': int(time.time()),
+        'salt': os.urandom(16).encode('hex'),
+    }
+    entry['signature'] = signature(password, entry)
+    cache.set(host, AUTH_CACHE_KEY + username, entry)
+
+
+def forget(cache, host, username):
+    cache.delete(host, AUTH_CACHE_KEY + username)
+
+
+def recall(jamf_client, username, password, cache, ttl=AUTH_CACHE_TTL, logger=None):
+    """
+    return the remembered Access of username, or None if there isn't a valid one.
+    fetches accounts and the user's account, communication errors are raised.
+    """
+    host = jamf_client.jamf_hostname
+    entry = cache.get(host, AUTH_CACHE_KEY + username, ttl=ttl)[0]
+    if not entry:
+        return None
+
+    try:
+        valid = hmac.compare_digest(str(entry['signature']), str(signature(password, entry)))
+    except (KeyError, TypeError, UnicodeError) as exception_message:
+        valid = False
+        if logger:
+            logger.warn("recall: Unreadable authorization for %s. [%s]" % (username, exception_message))
+    if not valid or time.time() - entry['stored'] > ttl:
+        if logger:
+            logger.info("recall: Remembered authorization for %s doesn't match, checking privileges." % username)
+        return None
+
+    jss_accounts, raw_user = fetch_together(jamf_client, ['accounts', 'accounts/username/' + quoted(username)], logger, partial=True)
+    if isinstance(jss_accounts, fetch.FetchError):
+        raise jss_accounts.cause
+
+    #
+    # group privileges only decided access granted through LDAP, they come from their cache
+    privileges = {}
+    if entry['source'] == 'ldap':
+        privileges = group_privileges(jamf_client, jss_accounts['accounts']['groups'], cache, logger)
+
+    if snapshot_hash(jss_accounts, user_privileges_from(raw_user), privileges) != entry['snapshot']:
+        if logger:
+            logger.info("recall: Privileges changed on %s, checking privileges." % host)
+        return None
+
+    if logger:
+        logger.info("recall: Using %s access remembered for %s." % (entry['level'], username))
+    return Access(entry['level'], entry['source'], [], entry['snapshot'])
+
+
+def authorize(jamf_client, username, password, read_privileges, update_privileges, cache=None, ttl=AUTH_CACHE_TTL, logger=None):
+    """
+    return (Access, True if it was remembered from an earlier login)
+    """
+    if cache is not None and ttl:
+        access = recall(jamf_client, username, password, cache, ttl, logger)
+        if access is not None:
+            return access, True
+
+    access = check_access(jamf_client, username, read_privileges, update_privileges, cache, logger)
+    if cache is not None and ttl:
+        if access.level:
+            remember(cache, jamf_client.jamf_hostname, username, password, access)
+        else:
+            forget(cache, jamf_client.jamf_hostname, username)
+    return access, False
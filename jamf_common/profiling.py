@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+Opt-in cProfile stats and object counts for each user action.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Profiling is off unless the app is started with --profile, or its
+#     preferences have profile = true in the login section. Once started,
+#     every action is profiled into a directory for the session:
+#
+#       with profiling.profiler.action('startup'):
+#           ...
+#
+#       @profiling.profiler.profiled('login')
+#       def try_login():
+#
+#     Worker profiles each job under its key, the call on the background
+#     thread as 'query' and the callback that displays it as
+#     'query.display', so a search, lookup or submit is covered on both
+#     threads without the apps marking each one.
+#
+#     Each action writes two files, numbered in the order they finished:
+#
+#       0007-query.pstats   cProfile stats, for pstats or snakeviz
+#       0007-query.txt      elapsed time, the top functions by cumulative
+#                           time, and the object types that grew
+#
+#     Python 2.7 has no tracemalloc, so allocations are approximated by
+#     counting the objects the garbage collector tracks, by type, before
+#     and after the action. Strings and numbers aren't tracked, nor are
+#     dicts and tuples holding only those. The counts are process-wide, and
+#     counting walks every object, which is slow on a large heap and one
+#     reason this is opt-in.
+#
+#     cProfile profiles one thread. An action started while another is
+#     being profiled on the same thread is part of the outer one.
+#
+################################################################################
+
+import collections
+import contextlib
+import cProfile
+import functools
+import gc
+import os
+import pstats
+import threading
+import time
+
+import cache
+
+#
+# functions listed in each action's summary, and object types
+TOP_FUNCTIONS = 40
+TOP_TYPES = 20
+
+
+def default_directory(name):
+    """
+    timestamped directory next to the application's cache
+    """
+    base = os.path.splitext(cache.default_path(name))[0] + '.profiles'
+    return os.path.join(base, time.strftime('%Y%m%d-%H%M%S'))
+
+
+def object_counts():
+    """
+    number of objects tracked by the garbage collector, by type name
+    """
+    return collections.Counter(type(item).__name__ for item in gc.get_objects())
+
+
+class Profiler(object):
+    """
+    Profiles of named actions, written to a directory once started
+    """
+    def __init__(self):
+        self.directory = None
+        self.logger = None
+        self.lock = threading.Lock()
+        self.sequence = 0
+        self.local = threading.local()
+
+    def start(self, directory, logger=None):
+        """
+        begin profiling actions into directory, the app runs unprofiled if it can't be made
+        """
+        if self.directory is not None:
+            return
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        except (IOError, OSError) as error:
+            if logger:
+                logger.error("Profiler: Unable to create %s, not profiling. [%s]" % (directory, error))
+            return
+        self.directory = directory
+        self.logger = logger
+        if logger:
+            logger.info("Profiler: Writing profiles to %s." % directory)
+
+    def enabled(self):
+        return self.directory is not None
+
+    @contextlib.contextmanager
+    def action(self, name):
+        if self.directory is None or getattr(self.local, 'active', False):
+            yield
+            return
+
+        self.local.active = True
+        before = object_counts()
+        profile = cProfile.Profile()
+        started = time.time()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            elapsed = time.time() - started
+            self.local.active = False
+            self.save(name, profile, elapsed, before)
+
+    def profiled(self, name):
+        """
+        decorator, each call of the function is the action name
+        """
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.action(name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def save(self, name, profile, elapsed, before):
+        """
+        write the stats and summary of one action
+        """
+        with self.lock:
+            self.sequence += 1
+            base = os.path.join(self.directory, '%04i-%s' % (self.sequence, name))
+
+        grown = object_counts()
+        grown.subtract(before)
+        grown = [(type_name, count) for type_name, count in grown.most_common(TOP_TYPES) if count > 0]
+
+        try:
+            profile.dump_stats(base + '.pstats')
+            with open(base + '.txt', 'w') as summary:
+                summary.write("%s: %.3f seconds on %s\n\n" % (name, elapsed, threading.current_thread().name))
+                stats = pstats.Stats(profile, stream=summary)
+                stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+                summary.write("objects tracked by gc, growth by type:\n")
+                for type_name, count in grown:
+                    summary.write("%10i  %s\n" % (count, type_name))
+        except (IOError, OSError) as error:
+            if self.logger:
+                self.logger.error("Profiler: Unable to write %s. [%s]" % (base, error))
+
+
+profiler = Profiler()
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+A compact computer record, parsed once from the Jamf API.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     A full computer record is a deep tree of dicts, most of which neither
+#     app reads. ComputerRecord keeps the fields they do read as slots, so
+#     the response can be dropped as soon as it is parsed:
+#
+#       record = ComputerRecord.from_json(jamf_client.get_json(api_call))
+#       record.name, record.department, record.groups ...
+#
+#     General and location fields are read at once. The list sections
+#     (groups, profiles, packages, printers, extension attributes) are
+#     parsed the first time they are read, and only the lists themselves
+#     are kept until then. Callers that know which sections they need
+#     pass them to from_json and the rest are never kept.
+#
+#     Values repeated across a fleet, group, building, department and
+#     package names and the like, are shared through one table, so a
+#     thousand records naming 'Marriott Library' hold one copy of it.
+#     intern() only takes byte strings, json gives unicode.
+#
+################################################################################
+
+import collections
+
+#
+# extension attributes keep their name and value, name is shared
+ExtensionAttribute = collections.namedtuple('ExtensionAttribute', ['id', 'name', 'value'])
+
+_shared = {}
+
+
+def shared(value):
+    """
+    the one copy of a repeated value
+    """
+    if not isinstance(value, basestring):
+        return value
+    return _shared.setdefault(value, value)
+
+
+def parse_names(raw):
+    return tuple(shared(item) for item in raw)
+
+
+def parse_ids(raw):
+    return tuple(item['id'] for item in raw)
+
+
+def parse_printers(raw):
+    return tuple(shared(item['name']) for item in raw)
+
+
+def parse_extension_attributes(raw):
+    return tuple(ExtensionAttribute(item.get('id'), shared(item['name']), item['value']) for item in raw)
+
+
+#
+# lazy section: (path in the computer record, parser)
+LAZY_SECTIONS = collections.OrderedDict([
+    ('groups', (('groups_accounts', 'computer_group_memberships'), parse_names)),
+    ('profile_ids', (('configuration_profiles',), parse_ids)),
+    ('casper_packages', (('software', 'installed_by_casper'), parse_names)),
+    ('installer_packages', (('software', 'installed_by_installer_swu'), parse_names)),
+    ('printers', (('hardware', 'mapped_printers'), parse_printers)),
+    ('extension_attributes', (('extension_attributes',), parse_extension_attributes)),
+])
+
+#
+# (section, element, shared), read when the record is parsed
+SCALAR_FIELDS = [
+    ('general', 'id', False),
+    ('general', 'name', False),
+    ('general', 'serial_number', False),
+    ('general', 'udid', False),
+    ('general', 'asset_tag', False),
+    ('general', 'barcode_1', False),
+    ('general', 'platform', True),
+    ('general', 'last_contact_time', False),
+    ('general', 'report_date', False),
+    ('location', 'username', False),
+    ('location', 'real_name', False),
+    ('location', 'email_address', False),
+    ('location', 'phone', False),
+    ('location', 'building', True),
+    ('location', 'room', False),
+    ('location', 'position', True),
+    ('location', 'department', True),
+]
+
+#
+# built outside the class, list comprehensions in a class body leak their names into it
+RECORD_SLOTS = [element for _, element, _ in SCALAR_FIELDS] + ['managed', '_pending'] + ['_' + section for section in LAZY_SECTIONS]
+
+
+class LazySection(object):
+    """
+    Parse a list section the first time it is read
+    """
+    def __init__(self, name):
+        self.name = name
+        self.slot = '_' + name
+
+    def __get__(self, record, owner):
+        if record is None:
+            return self
+        value = getattr(record, self.slot)
+        if value is None:
+            raw = record._pending.pop(self.name, None) if record._pending else None
+            if not record._pending:
+                record._pending = None
+            value = LAZY_SECTIONS[self.name][1](raw) if raw is not None else ()
+            setattr(record, self.slot, value)
+        return value
+
+
+class ComputerRecord(object):
+    """
+    The parts of a Jamf computer record the apps read
+    """
+    __slots__ = RECORD_SLOTS
+
+    def __init__(self, **fields):
+        for _, element, _ in SCALAR_FIELDS:
+            setattr(self, element, fields.get(element))
+        self.managed = fields.get('managed')
+        self._pending = None
+        for name in LAZY_SECTIONS:
+            setattr(self, '_' + name, None)
+
+    @classmethod
+    def from_json(cls, response_json, sections=None):
+        """
+        record from a computers/... response
+        sections names the lazy sections to keep, None keeps all of them
+        """
+        raw = response_json['computer']
+        record = cls()
+
+        for section, element, is_shared in SCALAR_FIELDS:
+            value = raw.get(section, {}).get(element)
+            setattr(record, element, shared(value) if is_shared else value)
+        record.managed = raw.get('general', {}).get('remote_management', {}).get('managed')
+
+        pending = {}
+        for name, (path, _) in LAZY_SECTIONS.items():
+            if sections is not None and name not in sections:
+                continue
+            value = raw
+            for key in path:
+                value = value.get(key) if isinstance(value, dict) else None
+            if value is not None:
+                pending[name] = value
+        record._pending = pending or None
+
+        return record
+
+    def __repr__(self):
+        return "<ComputerRecord %r %r>" % (self.id, self.name)
+
+
+for _name in LAZY_SECTIONS:
+    setattr(ComputerRecord, _name, LazySection(_name))
+del _name
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Build Tk Text widget content in memory and apply it in one insert.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Every Text.insert is a round trip into Tcl and a re-layout of the
+#     widget, inserting at '1.0' also shifts everything already there.
+#     A TextBuffer collects (text, tags) segments in display order, render
+#     hands all of them to a single insert call, which Tk accepts as
+#
+#       insert index chars tagList ?chars tagList ...?
+#
+#     Tags should be configured once, when the widget is built.
+#
+################################################################################
+
+
+class TextBuffer(object):
+    """
+    Segments of text and their tags, in display order
+    """
+    def __init__(self):
+        self.segments = []
+
+    def add(self, text, *tags):
+        self.segments.append((text, tags))
+
+    def render(self, widget):
+        """
+        replace the contents of a Text widget
+        """
+        widget.delete('1.0', 'end')
+        if not self.segments:
+            return
+
+        #
+        # panes don't end in a blank line
+        text, tags = self.segments[-1]
+        if text.endswith('\n'):
+            self.segments[-1] = (text[:-1], tags)
+
+        arguments = []
+        for text, tags in self.segments:
+            arguments.append(text)
+            arguments.append(tags)
+        widget.insert('1.0', *arguments)
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Index of policy scope, for finding the policies that apply to a computer.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Policy entries are built by Cargo Ship:
+#
+#       Policy(name, id, all_computers, computer ids, group names,
+#              excluded computer ids, excluded group names, error)
+#
+#     The scope fields are kept together, error is last and None unless
+#     the policy could not be loaded.
+#
+#     A policy applies to a computer if it is scoped to all computers, to the
+#     computer itself or to one of its groups, and neither the computer nor
+#     any of its groups is excluded. Exclusions win over targets.
+#
+#     The index is built once per policy load, so reflecting a computer is
+#     a few dictionary lookups and set unions rather than a scan of every
+#     policy against every group.
+#
+################################################################################
+
+import collections
+
+Policy = collections.namedtuple('Policy', ['name', 'id', 'all_computers', 'computers', 'groups', 'excluded_computers', 'excluded_groups', 'error'])
+
+
+class ScopeIndex(object):
+    """
+    Policy ids keyed by the targets they are scoped to
+    """
+    def __init__(self, policies):
+        self.policies = {}
+        self.all_computers = set()
+        self.by_computer = {}
+        self.by_group = {}
+        self.excluded_by_computer = {}
+        self.excluded_by_group = {}
+        self.unknown = set()
+
+        for entry in policies:
+            policy_id = entry.id
+            self.policies[policy_id] = entry
+
+            #
+            # scope of a policy that failed to load is unknown
+            if entry.error:
+                self.unknown.add(policy_id)
+                continue
+
+            if entry.all_computers:
+                self.all_computers.add(policy_id)
+            for computer_id in entry.computers:
+                self.by_computer.setdefault(computer_id, set()).add(policy_id)
+            for group_name in entry.groups:
+                self.by_group.setdefault(group_name, set()).add(policy_id)
+            for computer_id in entry.excluded_computers:
+                self.excluded_by_computer.setdefault(computer_id, set()).add(policy_id)
+            for group_name in entry.excluded_groups:
+                self.excluded_by_group.setdefault(group_name, set()).add(policy_id)
+
+    def for_groups(self, group_names):
+        """
+        ids of policies scoped to any of the groups
+        """
+        policy_ids = set()
+        for group_name in group_names:
+            policy_ids.update(self.by_group.get(group_name, ()))
+        return policy_ids
+
+    def applicable(self, computer_id, group_names):
+        """
+        ids of policies that apply to a computer in the groups
+        """
+        policy_ids = self.all_computers | self.by_computer.get(computer_id, set()) | self.for_groups(group_names)
+
+        excluded_ids = set(self.excluded_by_computer.get(computer_id, ()))
+        for group_name in group_names:
+            excluded_ids.update(self.excluded_by_group.get(group_name, ()))
+
+        return policy_ids - excluded_ids
+
+    def names(self, policy_ids):
+        """
+        distinct names of the policies
+        """
+        return set(self.policies[policy_id].name for policy_id in policy_ids)
@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+Time the named phases of an app's startup and write them as a report.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     The apps mark their startup with named phases:
+#
+#       with startup.timer.phase('policy_fanout'):
+#           ...
+#
+#     Each phase records when it started, relative to when this module was
+#     imported, and its wall and CPU time. CPU time is the whole process
+#     (os.times), so phases running alongside each other share it.
+#
+#     Phases that finish on a worker thread are begun on the main thread,
+#     so they are known to be outstanding before the window is painted:
+#
+#       token = startup.timer.begin('menus')
+#       ... worker thread ... startup.timer.end(token)
+#
+#     painted() marks the first paint. The report is written once the
+#     window has been painted and every phase begun before then has
+#     finished, one JSON object per launch appended to
+#     edu.scl.utah.<app>.startup.jsonl next to the app's cache, or to
+#     JAMF_STARTUP_REPORT if set. Later phases, such as a refresh the
+#     user asks for, are not part of startup and are ignored. If the app
+#     quits first, the report is written at exit and marked incomplete.
+#
+#     The time the login window waits for the tech to type is not
+#     startup. wait_begin() is called once the login window is painted
+#     and wait_end() when the login is submitted. The wait is reported as
+#     login_wait and left out of first_paint and wall, so they can be
+#     compared across launches. Phase start offsets still include it.
+#
+#     Nothing is recorded until start() is called, so the headless modes
+#     don't write reports.
+#
+################################################################################
+
+import atexit
+import contextlib
+import json
+import os
+import platform
+import threading
+import time
+
+import cache
+
+REPORT_ENV = 'JAMF_STARTUP_REPORT'
+
+
+def cpu_time():
+    user, system = os.times()[:2]
+    return user + system
+
+
+def default_path(name):
+    """
+    report file next to the application's cache
+    """
+    return os.path.splitext(cache.default_path(name))[0] + '.startup.jsonl'
+
+
+class StartupTimer(object):
+    """
+    Phases of one launch, and when the window was first painted
+    """
+    def __init__(self):
+        self.imported = time.time()
+        self.imported_cpu = cpu_time()
+        self.lock = threading.Lock()
+        self.app = None
+        self.path = None
+        self.phases = []
+        self.outstanding = set()
+        self.notes = {}
+        self.painted_at = None
+        self.waited = 0.0
+        self.waiting_since = None
+        self.written = False
+
+    def start(self, app, path=None):
+        """
+        begin recording phases, the report is written to path
+        """
+        self.app = app
+        self.path = os.environ.get(REPORT_ENV) or path or default_path(app)
+        atexit.register(self.write, False)
+
+    def recording(self):
+        return self.app is not None and not self.written
+
+    def begin(self, name):
+        """
+        token for a phase that starts now, pass it to end
+        """
+        if not self.recording():
+            return None
+        token = (name, time.time(), cpu_time())
+        with self.lock:
+            self.outstanding.add(token)
+        return token
+
+    def end(self, token):
+        if token is None:
+            return
+        name, started, started_cpu = token
+        entry = {
+            'name': name,
+            'start': round(started - self.imported, 4),
+            'wall': round(time.time() - started, 4),
+            'cpu': round(cpu_time() - started_cpu, 4),
+            'thread': threading.current_thread().name,
+        }
+        with self.lock:
+            self.outstanding.discard(token)
+            self.phases.append(entry)
+            done = self.painted_at is not None and not self.outstanding
+        if done:
+            self.write()
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        token = self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(token)
+
+    def wait_begin(self):
+        """
+        the app is waiting on the user, until wait_end
+        """
+        if self.recording():
+            self.waiting_since = time.time()
+
+    def wait_end(self):
+        if self.waiting_since is not None:
+            self.waited += time.time() - self.waiting_since
+            self.waiting_since = None
+
+    def note(self, **values):
+        """
+        counts and flags that explain the timings, e.g. policies=3000
+        """
+        with self.lock:
+            self.notes.update(values)
+
+    def painted(self):
+        """
+        the main window is up, write the report once outstanding phases finish
+        """
+        if not self.recording():
+            return
+        with self.lock:
+            self.painted_at = time.time()
+            done = not self.outstanding
+        if done:
+            self.write()
+
+    def report(self, complete=True):
+        """
+        first_paint and wall are seconds since import, less login_wait
+        """
+        now = time.time()
+        with self.lock:
+            waited = self.waited
+            if self.waiting_since is not None:
+                waited += now - self.waiting_since
+            return {
+                'app': self.app,
+                'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.imported)),
+                'complete': complete,
+                'first_paint': round(self.painted_at - self.imported - waited, 4) if self.painted_at else None,
+                'login_wait': round(waited, 4),
+                'wall': round(now - self.imported - waited, 4),
+                'cpu': round(cpu_time() - self.imported_cpu, 4),
+                'phases': sorted(self.phases, key=lambda entry: entry['start']),
+                'notes': dict(self.notes),
+                'platform': platform.system(),
+                'python': platform.python_version(),
+            }
+
+    def write(self, complete=True):
+        """
+        append the report, once per launch
+        """
+        with self.lock:
+            if self.app is None or self.written:
+                return
+            self.written = True
+        entry = self.report(complete)
+        try:
+            directory = os.path.dirname(self.path)
+            if directory and not os.path.isdir(directory):
+                os.makedirs(directory)
+            with open(self.path, 'a') as report_file:
+                report_file.write(json.dumps(entry, sort_keys=True) + '\n')
+        except (IOError, OSError):
+            pass
+
+
+timer = StartupTimer()
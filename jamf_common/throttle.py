@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+"""
+Adaptive limit on concurrent requests to a Jamf server.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     The window works like TCP congestion control (AIMD):
+#
+#       slow start      the window grows by one per success until the first
+#                       sign of congestion, doubling every round trip.
+#       additive        afterwards it grows by 1/window per success, about
+#                       one request per round trip.
+#       multiplicative  5xx, 429 or connection errors halve the window, as
+#                       does smoothed latency drifting well above the fastest
+#                       latency seen. At most one cut per round trip.
+#
+#     A 429 or 503 is the server saying where its limit is. The window
+#     is cut and the number that was in flight, less the one turned away,
+#     becomes a ceiling the window doesn't grow past for CEILING_HOLD
+#     seconds, like TCP's ssthresh. From then on the window grows by one
+#     per round trip rather than per success, so probing the limit again
+#     costs one rejected request rather than a burst of them.
+#
+#     The rejected request waits out its Retry-After before it is tried
+#     again. Every new request only waits with it when the window is
+#     already at its minimum, otherwise the smaller window is the answer
+#     and the other requests carry on.
+#
+################################################################################
+
+import threading
+import time
+
+#
+# statuses that mean the server is asking us to slow down
+BACKPRESSURE_CODES = (429, 503)
+
+#
+# smoothed latency above this multiple of the best latency counts as congestion
+LATENCY_FACTOR = 3.0
+
+#
+# longest Retry-After we will honor, in seconds
+MAX_RETRY_AFTER = 120
+
+#
+# requests allowed in flight before the first response, slow start grows it from there
+INITIAL_WINDOW = 4
+
+#
+# seconds the window stays at or below the point the server pushed back
+CEILING_HOLD = 30.0
+
+
+def retry_after(error):
+    """
+    seconds requested by a Retry-After header, or None
+    """
+    try:
+        value = error.info().getheader('Retry-After')
+        return min(float(value), MAX_RETRY_AFTER)
+    except Exception:
+        return None
+
+
+class AdaptiveWindow(object):
+    """
+    AIMD controlled number of requests allowed in flight
+    """
+    def __init__(self, maximum, initial=INITIAL_WINDOW, minimum=1, logger=None):
+        self.maximum = max(minimum, maximum)
+        self.minimum = minimum
+        self.window = float(max(minimum, min(initial, self.maximum)))
+        self.logger = logger
+
+        self.slow_start = True
+        self.paced = False
+        self.ceiling = None
+        self.ceiling_until = 0.0
+        self.last_increase = 0.0
+        self.in_flight = 0
+        self.best_latency = None
+        self.smoothed_latency = None
+        self.last_decrease = 0.0
+        self.paused_until = 0.0
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        """
+        block until there is room in the window
+        """
+        with self.condition:
+            while True:
+                pause = self.paused_until - time.time()
+                if pause > 0:
+                    self.condition.wait(pause)
+                elif self.in_flight >= int(self.window):
+                    self.condition.wait()
+                else:
+                    self.in_flight += 1
+                    return
+
+    def release(self, latency=None, congested=False, pause=None, backpressure=False):
+        """
+        record the outcome of a request and adjust the window
+        backpressure is a 429 or 503, pause its Retry-After
+        """
+        with self.condition:
+            in_flight = self.in_flight
+            self.in_flight -= 1
+
+            if backpressure:
+                at_minimum = int(self.window) <= self.minimum
+                if self.decrease():
+                    self.ceiling = max(self.minimum, in_flight - 1)
+                    self.ceiling_until = time.time() + CEILING_HOLD
+                    self.paced = True
+                    self.log("Server pushed back, holding the window at %i or less." % self.ceiling)
+                if pause and at_minimum:
+                    if self.paused_until < time.time():
+                        self.log("Server requested %.1fs pause." % pause)
+                    self.paused_until = max(self.paused_until, time.time() + pause)
+                self.condition.notify_all()
+                return
+
+            if latency is not None and not congested:
+                #
+                # let the baseline creep upward so one lucky fast response can't pin it
+                if self.best_latency is None or latency < self.best_latency:
+                    self.best_latency = latency
+                else:
+                    self.best_latency *= 1.001
+                if self.smoothed_latency is None:
+                    self.smoothed_latency = latency
+                else:
+                    self.smoothed_latency = 0.8 * self.smoothed_latency + 0.2 * latency
+                if self.smoothed_latency > LATENCY_FACTOR * self.best_latency:
+                    congested = True
+
+            if congested:
+                self.decrease()
+            else:
+                self.increase()
+
+            self.condition.notify_all()
+
+    def increase(self):
+        now = time.time()
+        if self.ceiling is not None and now >= self.ceiling_until:
+            self.ceiling = None
+
+        previous = int(self.window)
+        if self.paced:
+            #
+            # one step per round trip
+            if now - self.last_increase < (self.smoothed_latency or 0):
+                return
+            self.last_increase = now
+            self.window += 1
+        elif self.slow_start:
+            self.window += 1
+        else:
+            self.window += 1.0 / self.window
+        self.window = min(self.window, self.maximum if self.ceiling is None else self.ceiling)
+        if int(self.window) != previous and (int(self.window) % 8 == 0 or int(self.window) == self.maximum):
+            self.log("Window grew to %i." % int(self.window))
+
+    def decrease(self):
+        """
+        halve the window, returns False if it was already cut this round trip
+        """
+        #
+        # requests already in flight report the same congestion, cut once per round trip
+        now = time.time()
+        if now - self.last_decrease < (self.smoothed_latency or 0):
+            return False
+        self.last_decrease = now
+        self.slow_start = False
+        previous = int(self.window)
+        self.window = max(self.minimum, self.window / 2)
+        if int(self.window) != previous:
+            self.log("Window cut to %i." % int(self.window))
+        return True
+
+    def log(self, message):
+        if self.logger:
+            self.logger.info("AdaptiveWindow: %s (in flight %i)" % (message, self.in_flight))
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+Log the main thread's stack when the Tk event loop stops responding.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     The event loop is watched while it runs:
+#
+#       with watchdog.watching(root, logger, stall_seconds):
+#           root.mainloop()
+#
+#     root.after() sets a heartbeat every HEARTBEAT_INTERVAL milliseconds.
+#     A daemon thread checks it, and when the loop hasn't run the
+#     heartbeat for more than stall_seconds, reads the main thread's frame
+#     from sys._current_frames() and logs its stack. That is where the UI
+#     is stuck, a blocking call or heavy parsing on the Tk thread.
+#
+#     When the heartbeat comes back one more line is logged, with the
+#     length of the whole stall and the function it was caught in, the
+#     innermost one outside the standard library, so a stall waiting on
+#     a socket is put down to the app function making the call:
+#
+#       Watchdog: UI stall ended. function=build_policies seconds=4.210
+#
+#     Grouping these lines by function ranks the blocking paths.
+#
+################################################################################
+
+import contextlib
+import os
+import sys
+import threading
+import time
+import traceback
+
+#
+# milliseconds between heartbeats, and the default stall worth logging in seconds
+HEARTBEAT_INTERVAL = 100
+STALL_SECONDS = 1.0
+
+STANDARD_LIBRARY = os.path.dirname(os.__file__)
+
+
+def blocking_function(frame):
+    """
+    name of the innermost function on frame's stack outside the standard library
+    """
+    innermost = frame
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.startswith(STANDARD_LIBRARY) or 'site-packages' in filename:
+            return frame.f_code.co_name
+        frame = frame.f_back
+    return innermost.f_code.co_name
+
+
+class Watchdog(object):
+    """
+    Heartbeat on the Tk thread, watched from a background thread
+    """
+    def __init__(self, root, logger, stall_seconds=STALL_SECONDS):
+        self.root = root
+        self.logger = logger
+        self.stall_seconds = stall_seconds
+        self.last_beat = None
+        self.pending = None
+        self.main_thread = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def start(self):
+        """
+        begin the heartbeat, call from the Tk thread
+        """
+        self.main_thread = threading.current_thread().ident
+        self.last_beat = time.time()
+        self.pending = self.root.after(HEARTBEAT_INTERVAL, self.beat)
+
+        self.thread = threading.Thread(target=self.watch, name='watchdog')
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        self.stopped.set()
+        try:
+            self.root.after_cancel(self.pending)
+        except Exception:
+            #
+            # the window may already be destroyed
+            pass
+
+    def beat(self):
+        self.last_beat = time.time()
+        self.pending = self.root.after(HEARTBEAT_INTERVAL, self.beat)
+
+    def watch(self):
+        #
+        # the heartbeat is expected every HEARTBEAT_INTERVAL, anything past that is a stall
+        check_interval = min(max(self.stall_seconds / 4, 0.05), 0.5)
+        late = HEARTBEAT_INTERVAL / 1000.0
+        stalled_in = None
+        stalled_at = None
+
+        while not self.stopped.wait(check_interval):
+            last_beat = self.last_beat
+            stalled = time.time() - last_beat - late
+
+            if stalled_in is None:
+                if stalled > self.stall_seconds:
+                    stalled_in = self.report(stalled)
+                    stalled_at = last_beat
+            elif last_beat != stalled_at:
+                self.logger.warn("Watchdog: UI stall ended.", function=stalled_in, seconds=last_beat - stalled_at - late)
+                stalled_in = None
+
+    def report(self, stalled):
+        """
+        log the main thread's stack, returns the function it is in
+        """
+        frame = sys._current_frames().get(self.main_thread)
+        if frame is None:
+            return '?'
+        function = blocking_function(frame)
+        stack = ''.join(traceback.format_stack(frame))
+        self.logger.warn("Watchdog: UI stalled for %.1f seconds in %s, main thread stack:\n%s" % (stalled, function, stack.rstrip()))
+        return function
+
+
+@contextlib.contextmanager
+def watching(root, logger, stall_seconds=STALL_SECONDS):
+    """
+    watch root's event loop inside the block, stall_seconds of 0 doesn't
+    """
+    if not stall_seconds:
+        yield
+        return
+
+    watchdog = Watchdog(root, logger, stall_seconds)
+    watchdog.start()
+    try:
+        yield
+    finally:
+        watchdog.stop()
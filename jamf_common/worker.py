@@ -0,0 +1,189 @@
+# -*- coding: utf-8 -*-
+"""
+Run Jamf calls off the Tk main thread.
+"""
+
+# Copyright (c) 2018 University of Utah Student Computing Labs. ################
+# All Rights Reserved.
+#
+# Permission to use, copy, modify, and distribute this software and
+# its documentation for any purpose and without fee is hereby granted,
+# provided that the above copyright notice appears in all copies and
+# that both that copyright notice and this permission notice appear
+# in supporting documentation, and that the name of The University
+# of Utah not be used in advertising or publicity pertaining to
+# distribution of the software without specific, written prior
+# permission. This software is supplied as is without expressed or
+# implied warranties of any kind.
+################################################################################
+
+# notes: #######################################################################
+#
+#     Tk is not thread safe. Blocking work runs on a daemon thread and its
+#     result (or exception) is put on a queue, which the main thread drains
+#     with root.after(). Callbacks therefore always run on the main thread
+#     and may update widgets freely.
+#
+#     Each job has a key, such as 'query' or 'search'. Starting a job cancels
+#     any unfinished job with the same key, so only the latest lookup is
+#     displayed.
+#
+#     A socket read can't be interrupted from another thread. Canceling a
+#     job discards its result when it arrives, the call itself still runs to
+#     completion (or to the client timeout).
+#
+#     When profiling is on, each call is profiled under its key and the
+#     callback that handles its result under key.display.
+#
+################################################################################
+
+import Queue
+import threading
+
+import profiling
+
+#
+# milliseconds between checks for finished jobs
+POLL_INTERVAL = 50
+
+
+class Job(object):
+    """
+    A single call handed to the worker
+    """
+    def __init__(self, key, function, on_success, on_error):
+        self.key = key
+        self.function = function
+        self.on_success = on_success
+        self.on_error = on_error
+        self.cancelled = False
+
+
+class Worker(object):
+    """
+    Background threads whose results are delivered on the Tk main thread
+    """
+    def __init__(self, root, logger=None):
+        self.root = root
+        self.logger = logger
+        self.results = Queue.Queue()
+        self.active = {}
+        self.running = 0
+        self.polling = False
+        self.indicator = None
+        self.showing_busy = False
+
+    def set_indicator(self, indicator):
+        """
+        indeterminate ttk.Progressbar shown while jobs are active
+        """
+        self.indicator = indicator
+        self.showing_busy = not self.active
+        self.update_indicator()
+
+    def busy(self):
+        return bool(self.active)
+
+    def run(self, key, function, on_success, on_error=None):
+        """
+        call function on a background thread, then on_success(result) or
+        on_error(exception) on the main thread
+        """
+        previous = self.active.pop(key, None)
+        if previous is not None:
+            previous.cancelled = True
+
+        job = Job(key, function, on_success, on_error)
+        self.active[key] = job
+        self.running += 1
+
+        thread = threading.Thread(target=self.work, args=(job,))
+        thread.daemon = True
+        thread.start()
+
+        self.update_indicator()
+        if not self.polling:
+            self.polling = True
+            self.root.after(POLL_INTERVAL, self.poll)
+        return job
+
+    def work(self, job):
+        try:
+            with profiling.profiler.action(job.key):
+                result = job.function()
+        except Exception as exception_message:
+            self.results.put((job, None, exception_message))
+            return
+        self.results.put((job, result, None))
+
+    def cancel(self, key=None):
+        """
+        discard the results of the job with key, or of every active job
+        returns the number of jobs canceled
+        """
+        if key is None:
+            jobs = self.active.values()
+        elif key in self.active:
+            jobs = [self.active[key]]
+        else:
+            jobs = []
+
+        for job in jobs:
+            job.cancelled = True
+            del self.active[job.key]
+            if self.logger:
+                self.logger.info("Worker: Canceled %s." % job.key)
+
+        self.update_indicator()
+        return len(jobs)
+
+    def poll(self):
+        """
+        deliver finished jobs, runs on the main thread
+        """
+        while True:
+            try:
+                job, result, error = self.results.get_nowait()
+            except Queue.Empty:
+                break
+
+            self.running -= 1
+            if job.cancelled:
+                continue
+            del self.active[job.key]
+
+            try:
+                with profiling.profiler.action(job.key + '.display'):
+                    if error is None:
+                        job.on_success(result)
+                    elif job.on_error:
+                        job.on_error(error)
+                    elif self.logger:
+                        self.logger.error("Worker: Error in %s. [%s]" % (job.key, error))
+            except Exception as exception_message:
+                #
+                # keep delivering the remaining jobs
+                if self.logger:
+                    self.logger.error("Worker: Error handling result of %s. [%s]" % (job.key, exception_message))
+
+        self.update_indicator()
+        if self.running:
+            self.root.after(POLL_INTERVAL, self.poll)
+        else:
+            self.polling = False
+
+    def update_indicator(self):
+        if self.busy() == self.showing_busy:
+            return
+        self.showing_busy = self.busy()
+
+        if self.showing_busy:
+            self.root.configure(cursor='watch')
+            if self.indicator is not None:
+                self.indicator.grid()
+                self.indicator.start(10)
+        else:
+            self.root.configure(cursor='')
+            if self.indicator is not None:
+                self.indicator.stop()
+                self.indicator.grid_remove()
@@ -85,7 +85,7 @@ def dbase(self):
         self.division_string.set(division_name)
         self.position_string.set(department_name)
 
-        if inspect.stack()[1][3] == "__call__":
+        if logs.caller(1) == "__call__":
             self.previous_unid = []
 
         self.supervisor_btn.configure(state="enabled")
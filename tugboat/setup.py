@@ -6,8 +6,14 @@ Usage:
     python setup.py py2app
 """
 
+import os
+import sys
 from setuptools import setup
 
+#
+# the shared jamf_common package lives in the parent directory
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)))
+
 APP = ['tugboat.py']
 APP_NAME = "Tugboat"
 DATA_FILES = []
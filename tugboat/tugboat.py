@@ -1,8 +1,8 @@
 #!/usr/bin/python
+# -*- coding: utf-8 -*-
 """
 A Python Tk application to edit Jamf computer records.
 """
-# -*- coding: utf-8 -*-
 
 # Copyright (c) 2018 University of Utah Student Computing Labs. ################
 # All Rights Reserved.
@@ -53,18 +53,16 @@ A Python Tk application to edit Jamf computer records.
 
 # TTD: #########################################################################
 #
-#     Unify all jss calls in single generic method, something like:
-#           ('call_jss(logger, api_call)')
-#
 #     Add correct windows logging.
 #
 #
 ################################################################################
 
 from __future__ import print_function
-import base64
+import argparse
 import ConfigParser
-import inspect
+import functools
+import getpass
 import json
 import os
 import platform
@@ -82,6 +80,12 @@ import webbrowser
 import xml.etree.cElementTree as ET
 from Tkinter import *
 
+try:
+    from jamf_common import bulk, cache, client, fetch, logs, menus, metrics, privileges, profiling, records, startup, watchdog, worker
+except ImportError:
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    from jamf_common import bulk, cache, client, fetch, logs, menus, metrics, privileges, profiling, records, startup, watchdog, worker
+
 #
 # Need to implement correct windows-appropriate logging.
 if platform.system() == 'Darwin':
@@ -97,12 +101,150 @@ else:
     except:
         import logging
 
+#
+# This is really important. These lists contain the required rights for the fields we need to access.
+READ_PRIVILEGES = ['Read Accounts', 'Read Buildings', 'Read Computers', 'Read Departments', 'Read User', 'Read LDAP Servers']
+UPDATE_PRIVILEGES = ['Update Computers', 'Update User']
+
+#
+# seconds before cached menus are refreshed in the background, they change rarely
+MENU_CACHE_TTL = 24 * 60 * 60
+
+#
+# milliseconds between updates of the Jamf call summary under the status bar
+CALL_SUMMARY_INTERVAL = 2000
+
+#
+# These are the individual fields associated with UI elements, as (section, XML element, StringVar)
+# If you add additional fields to the UI, you will need to add them here to be submitted back to the Jamf database.
+RECORD_FIELDS = [
+    ('general', 'name', 'computer_name_string'),
+    ('general', 'asset_tag', 'assettag_string'),
+    ('general', 'barcode_1', 'barcode_string'),
+    ('location', 'username', 'username_string'),
+    ('location', 'email_address', 'email_string'),
+    ('location', 'real_name', 'fullname_string'),
+    ('location', 'phone', 'phone_string'),
+    ('location', 'building', 'building_string'),
+    ('location', 'room', 'room_string'),
+    ('location', 'position', 'position_string'),
+    ('location', 'department', 'department_string'),
+]
+
+
+def computer_xml(fields):
+    """
+    XML body for a computer PUT from (section, element, value) triples
+    only the sections and elements given are included, Jamf leaves the rest alone
+    """
+    top = ET.Element('computer')
+    sections = {}
+    for section, element, value in fields:
+        if section not in sections:
+            sections[section] = ET.SubElement(top, section)
+        ET.SubElement(sections[section], element).text = value
+    return ET.tostring(top)
+
+
+#
+# CSV columns that can identify a computer in a bulk update, with the api call for each
+BULK_KEYS = [('id', 'computers/id/'), ('serial_number', 'computers/serialnumber/'), ('name', 'computers/name/')]
+
+#
+# (section, element, CSV column) of each field a bulk update can set
+# name finds a computer, so renaming one takes a new_name column
+BULK_FIELDS = [(section, element, 'new_name' if element == 'name' else element) for section, element, _ in RECORD_FIELDS]
+
+
+def bulk_updates(records, departments, buildings):
+    """
+    bulk.Update for each CSV row, rows that can't be sent carry an error
+    blank cells leave the field as it is in Jamf
+    """
+    updates = []
+    for line, row in records:
+        key_column = [column for column, _ in BULK_KEYS if row.get(column)]
+        if not key_column:
+            updates.append(bulk.Update(line, '', 'PUT', '', None, "No id, serial_number or name."))
+            continue
+        key = row[key_column[0]]
+        api_call = dict(BULK_KEYS)[key_column[0]] + urllib.quote(key.encode('utf-8'), safe='')
+
+        changes = [(section, element, row[column]) for section, element, column in BULK_FIELDS if row.get(column)]
+        error = None
+        if not changes:
+            error = "Nothing to update."
+        elif row.get('department') and row['department'] not in departments:
+            error = "Unknown department '%s'." % row['department']
+        elif row.get('building') and row['building'] not in buildings:
+            error = "Unknown building '%s'." % row['building']
+
+        updates.append(bulk.Update(line, key, 'PUT', api_call, computer_xml(changes), error))
+    return updates
+
+
+def bulk_update(logger, args):
+    """
+    apply a CSV of computer updates without the window, printing each row as it finishes
+    """
+    logger.info("%s: activated" % logs.caller())
+
+    header, records = bulk.read_csv(args.bulk)
+    columns = [column for column, _ in BULK_KEYS] + [column for _, _, column in BULK_FIELDS]
+    unknown = [column for column in header if column not in columns]
+    if unknown or not [column for column, _ in BULK_KEYS if column in header]:
+        print("%s needs an id, serial_number or name column, and may also have:\n  %s" % (args.bulk, ", ".join(columns[len(BULK_KEYS):])))
+        if unknown:
+            print("Unknown columns: %s" % ", ".join(unknown))
+        return 2
+
+    jamf_username = args.username or getpass.getuser()
+    jamf_password = getpass.getpass("Jamf password for %s: " % jamf_username)
+    jamf_client = client.JamfClient(args.host, jamf_username, jamf_password, logger)
+
+    try:
+        access, _ = privileges.authorize(jamf_client, jamf_username, jamf_password, READ_PRIVILEGES, UPDATE_PRIVILEGES, cache.Cache(cache.default_path('tugboat'), logger), logger=logger)
+        if access.level != 'full':
+            print("%s lacks the privileges to update computers: %s" % (jamf_username, ", ".join(access.missing)))
+            return 1
+        departments, buildings = fetch.fetch_all(jamf_client, ['departments', 'buildings'], logger=logger)
+    except urllib2.HTTPError, error:
+        if error.code == 401:
+            print("Invalid username or password.")
+        else:
+            print("HTTP error from %s: %s" % (args.host, bulk.error_message(error)))
+        return 1
+    except urllib2.URLError, error:
+        print("Unable to contact %s. [%s]" % (args.host, error))
+        return 1
+
+    updates = bulk_updates(records, [item['name'] for item in departments['departments']], [item['name'] for item in buildings['buildings']])
+
+    results_path = args.results or os.path.splitext(args.bulk)[0] + '.results.csv'
+    results = bulk.Results(results_path)
+
+    def progress(finished, total, update, status, message):
+        line = "[%*i/%i] row %i %s: %s %s" % (len(str(total)), finished, total, update.line, update.key, status, message)
+        print(line.encode('utf-8') if isinstance(line, unicode) else line)
+        sys.stdout.flush()
+
+    try:
+        counts = bulk.apply_all(jamf_client, updates, results, args.concurrency, logger, progress=progress)
+    except KeyboardInterrupt:
+        print("\nInterrupted, run the same command again to resume.")
+        return 130
+    finally:
+        results.close()
+
+    print("%i updated, %i failed, %i invalid, %i already done. Results in %s" % (counts.get('updated', 0), counts.get('failed', 0), counts.get('invalid', 0), counts.get('skipped', 0), results_path))
+    return 1 if counts.get('failed') or counts.get('invalid') else 0
+
 
 class Computer(object):
     """
     Store GUI and data structures describing jamf computer records
     """
-    def __init__(self, root, logger, jamf_hostname, jamf_username, jamf_password, access_level):
+    def __init__(self, root, logger, jamf_hostname, jamf_username, jamf_password, access_level, revalidate=False):
         """
         initialize variables and data structures
         """
@@ -114,9 +256,22 @@ class Computer(object):
         self.access_level = access_level
         self.local_jamf_id = None
 
+        #
+        # (jamf id, {(section, element): value}) as last loaded from or submitted to Jamf
+        self.record_snapshot = None
+
+        self.jamf_client = client.JamfClient(jamf_hostname, jamf_username, jamf_password, logger)
+
+        #
+        # network calls made from the UI run on background threads
+        self.worker = worker.Worker(root, logger)
+
+        self.cache = cache.Cache(cache.default_path('tugboat'), logger)
+
         self.hostname = ""
-        self.divisions = []
-        self.buildings = []
+        self.divisions = ['None']
+        self.buildings = ['None']
+        self.ea_menus = menus.ChoiceIndex()
         self.platform = None
         self.will_offboard = False
         self.jamf_management = ""
@@ -132,6 +287,7 @@ class Computer(object):
         self.assettag_string = StringVar()
         self.barcode_string = StringVar()
         self.status_string = StringVar()
+        self.call_summary_string = StringVar()
         self.id_string = StringVar()
         self.search_string = StringVar()
         self.computer_name_string = StringVar()
@@ -165,10 +321,28 @@ class Computer(object):
         self.status_subtle.configure('Subtle.TLabel', foreground='maroon')
 
         self.hostname = (socket.gethostname()).split(".")[0]
-        self.divisions = self.populate_menu('departments')
-        self.buildings = self.populate_menu('buildings')
 
-        self.build_ui()
+        #
+        # menus change rarely, paint them from the cache and refresh once the window is up
+        with startup.timer.phase('cache_read'):
+            menus_age = self.load_menus()
+        startup.timer.note(cached=menus_age is not None)
+
+        with startup.timer.phase('first_paint'):
+            self.build_ui()
+            self.root.update_idletasks()
+
+        if menus_age is None or menus_age > MENU_CACHE_TTL:
+            self.refresh_menus()
+
+        #
+        # access remembered from an earlier login is confirmed once the window is up
+        if revalidate:
+            self.revalidate_access()
+
+        #
+        # the startup report is written once the menu refresh and revalidation started above finish
+        startup.timer.painted()
 
     def build_ui(self):
         """
@@ -497,6 +671,19 @@ class Computer(object):
         self.status_label = ttk.Label(self.mainframe, textvariable=self.status_string)
         self.status_label.grid(column=1, row=1100, sticky=W, columnspan=4)
 
+        #
+        # Jamf call count and latency, double-click to log every endpoint
+        self.call_summary_label = ttk.Label(self.mainframe, textvariable=self.call_summary_string, foreground='gray')
+        self.call_summary_label.grid(column=1, row=1150, sticky=W, columnspan=4)
+        self.call_summary_label.bind('<Double-Button-1>', self.log_call_report)
+        self.update_call_summary()
+
+        #
+        # shown while Jamf is being queried, escape cancels the lookup
+        self.busy_bar = ttk.Progressbar(self.mainframe, mode='indeterminate', length=60)
+        self.busy_bar.grid(column=3, row=1100, sticky=E)
+        self.root.bind('<Escape>', self.cancel_queries)
+
         ttk.Button(self.mainframe, text="Reset", width=6, command=self.reset_data).grid(column=4, row=1100, sticky=W)
         ttk.Button(self.mainframe, text="Quit", width=6, command=self.root.destroy).grid(column=4, row=1100)
 
@@ -524,66 +711,57 @@ class Computer(object):
         for child in self.mainframe.winfo_children():
             child.grid_configure(padx=3, pady=3)
 
+        self.worker.set_indicator(self.busy_bar)
+
     def open_user_web(self):
         """
         Open currently displayed user record in jamf
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         #
         # in order to open the user in a browser you need the user's Jamf ID
         # in order to get the ID you need to open the user's record on Jamf
-        if self.username_string.get():
-            url = self.jamf_hostname + '/JSSResource/users/name/' + self.username_string.get()
-            url = urllib.quote(url, ':/()')
-
-            request = urllib2.Request(url)
-            request.add_header('Accept', 'application/json')
-            request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-            response = urllib2.urlopen(request)
-            response_json = json.loads(response.read())
+        if not self.username_string.get():
+            self.logger.error("%s: No user set." % logs.caller())
+            self.status_label.configure(style='Warning.TLabel')
+            self.status_string.set("No user set.")
+            return
 
-            if response.code != 200:
-                self.logger.error("%s: Invalid response code." % inspect.stack()[0][3])
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("%i returned." % response.code)
-                return
+        username = self.username_string.get()
 
+        def open_user(response_json):
             jss_user_id = response_json['user']['id']
 
-        else:
-            self.logger.error("%s: No user set." % inspect.stack()[0][3])
-            self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("No user set.")
-            return
+            if jss_user_id:
+                url_formatted = self.jamf_hostname + "/users.html?id=" + str(jss_user_id) + "&o=r"
+                webbrowser.open_new_tab(url_formatted)
+                self.logger.info("%s: Opened user web. (%s)" % (logs.caller(), username))
+                self.status_label.configure(style='Normal.TLabel')
+                self.status_string.set("Opened URL for User.")
 
-        if jss_user_id:
-            url_formatted = self.jamf_hostname + "/users.html?id=" + str(jss_user_id) + "&o=r"
-            webbrowser.open_new_tab(url_formatted)
-            self.logger.info("%s: Opened user web. (%s)" % (inspect.stack()[0][3], self.username_string.get()))
-            self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("Opened URL for User.")
+            else:
+                self.logger.error("%s: No user id available." % logs.caller())
+                self.status_label.configure(style='Warning.TLabel')
+                self.status_string.set("No user available.")
 
-        else:
-            self.logger.error("%s: No user id available." % inspect.stack()[0][3])
-            self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("No user available.")
+        api_call = urllib.quote('users/name/' + username, ':/()')
+        self.worker.run('user', lambda: self.jamf_client.get_json(api_call), open_user, functools.partial(self.report_error, logs.caller()))
 
     def open_id_web(self):
         """
         Open currently displayed computer record in jamf
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         if self.id_string.get():
             url_formatted = self.jamf_hostname + "/computers.html?id=" + self.id_string.get() + "&o=r"
             webbrowser.open_new_tab(url_formatted)
-            self.logger.info("%s: Opened id web. (%s)" % (inspect.stack()[0][3], self.id_string.get()))
+            self.logger.info("%s: Opened id web. (%s)" % (logs.caller(), self.id_string.get()))
             self.status_label.configure(style='Normal.TLabel')
             self.status_string.set("Opened URL for ID.")
 
         else:
-            self.logger.error("%s: No computer id available." % inspect.stack()[0][3])
+            self.logger.error("%s: No computer id available." % logs.caller())
             self.status_label.configure(style='Warning.TLabel')
             self.status_string.set("No ID available.")
 
@@ -591,16 +769,16 @@ class Computer(object):
         """
         Open currently displayed search in jamf
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         if self.search_string.get():
             url_formatted = self.jamf_hostname + "/computers.html?queryType=Computers&query=*" + self.search_string.get() + "*"
             webbrowser.open_new_tab(url_formatted)
-            self.logger.info("%s: Opened search web. (%s)" % (inspect.stack()[0][3], self.search_string.get()))
+            self.logger.info("%s: Opened search web. (%s)" % (logs.caller(), self.search_string.get()))
             self.status_label.configure(style='Normal.TLabel')
             self.status_string.set("Opened URL for search.")
 
         else:
-            self.logger.error("%s: No search string available." % inspect.stack()[0][3])
+            self.logger.error("%s: No search string available." % logs.caller())
             self.status_label.configure(style='Warning.TLabel')
             self.status_string.set("No search string entered.")
 
@@ -608,7 +786,7 @@ class Computer(object):
         """
         Reset user data structures to blank
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         self.username_string.set("")
         self.fullname_string.set("")
@@ -623,12 +801,14 @@ class Computer(object):
         """
         reset all data structures to blank
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
-        if inspect.stack()[1][3] == "__call__":
+        if logs.caller(1) == "__call__":
             self.id_string.set("")
             self.search_string.set("")
 
+        self.record_snapshot = None
+
         self.computer_name_string.set("")
         self.assettag_string.set("")
         self.barcode_string.set("")
@@ -649,7 +829,7 @@ class Computer(object):
         Print current data structures, useful for debugging
         """
 
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         print("Current user information")
         print("\tGeneral")
@@ -678,7 +858,7 @@ class Computer(object):
         log current data structures, useful for debugging
         """
 
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         self.logger.info("Current user information")
         self.logger.info("\tGeneral")
@@ -700,11 +880,29 @@ class Computer(object):
         self.logger.info("\tJamf ID : %s" % self.id_string.get())
         self.logger.info("\tStatus  : %s" % self.status_string.get())
 
+    def current_fields(self):
+        """
+        {(section, element): value} of the record as displayed
+        """
+        return dict(((section, element), getattr(self, attribute).get()) for section, element, attribute in RECORD_FIELDS)
+
+    def changed_fields(self):
+        """
+        (section, element, value) of each field changed since the record was loaded,
+        every field if the displayed record wasn't loaded from Jamf
+        """
+        fields = self.current_fields()
+        if self.record_snapshot is None or self.record_snapshot[0] != self.id_string.get():
+            return [(section, element, fields[(section, element)]) for section, element, _ in RECORD_FIELDS]
+
+        snapshot = self.record_snapshot[1]
+        return [(section, element, fields[(section, element)]) for section, element, _ in RECORD_FIELDS if fields[(section, element)] != snapshot.get((section, element))]
+
     def check_submit(self):
         """
         precheck required fields for valid content
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         #
         # if you plan on adding additional fields, you'll likely want to add them to this
@@ -725,10 +923,10 @@ class Computer(object):
 
         if not bad_fields:
             # We're good.
-            self.logger.warn("%s: No fields reported." % inspect.stack()[0][3])
+            self.logger.warn("%s: No fields reported." % logs.caller())
             return True
         else:
-            self.logger.warn("%s: Bad fields reported: %r" % (inspect.stack()[0][3], bad_fields))
+            self.logger.warn("%s: Bad fields reported: %r" % (logs.caller(), bad_fields))
             if len(bad_fields) >= 5:
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("Many empty fields!")
@@ -743,59 +941,20 @@ class Computer(object):
         """
         submit current data structures to jamf
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         if not self.check_submit():
             return
 
         try:
-            self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("Submitting...")
-
-            jamf_url = self.jamf_hostname + '/JSSResource/computers/id/' + self.id_string.get()
-
             #
-            # These are the individual fields associated with UI elements
-            # If you add additional fields to the UI, you will need to add corresponding
-            # XML elements form them to be submitted back to the Jamf database.
-            top = ET.Element('computer')
-
-            general = ET.SubElement(top, 'general')
-
-            computer_name_xml = ET.SubElement(general, 'name')
-            computer_name_xml.text = self.computer_name_string.get()
-
-            asset_tag_xml = ET.SubElement(general, 'asset_tag')
-            asset_tag_xml.text = self.assettag_string.get()
-
-            barcode_xml = ET.SubElement(general, 'barcode_1')
-            barcode_xml.text = self.barcode_string.get()
-
-            location = ET.SubElement(top, 'location')
-
-            username_xml = ET.SubElement(location, 'username')
-            username_xml.text = self.username_string.get()
-
-            email_xml = ET.SubElement(location, 'email_address')
-            email_xml.text = self.email_string.get()
-
-            realname_xml = ET.SubElement(location, 'real_name')
-            realname_xml.text = self.fullname_string.get()
-
-            phone_xml = ET.SubElement(location, 'phone')
-            phone_xml.text = self.phone_string.get()
-
-            building_xml = ET.SubElement(location, 'building')
-            building_xml.text = self.building_string.get()
-
-            room_xml = ET.SubElement(location, 'room')
-            room_xml.text = self.room_string.get()
-
-            position_xml = ET.SubElement(location, 'position')
-            position_xml.text = self.position_string.get()
-
-            department_xml = ET.SubElement(location, 'department')
-            department_xml.text = self.department_string.get()
+            # only send what changed, Jamf re-validates every field it is given
+            changes = self.changed_fields()
+            if not changes:
+                self.logger.info("%s: nothing changed, not submitting." % logs.caller())
+                self.status_label.configure(style='Normal.TLabel')
+                self.status_string.set("No changes to submit.")
+                return
 
             #
             # these are the fields that enable removing machines
@@ -809,65 +968,151 @@ class Computer(object):
 #                 managed_xml       = ET.SubElement(remote_management, 'managed')
 #                 managed_xml.text  = 'false'
 
+            xml_string = computer_xml(changes)
+            submitted_id = self.id_string.get()
+            submitted_fields = self.current_fields()
+
             self.log_current_state()
-            self.logger.info("%s: submitting \n%s" % (inspect.stack()[0][3], ET.tostring(top)))
+            self.logger.info("%s: submitting \n%s" % (logs.caller(), xml_string))
 
-#             print(ET.tostring(top))
+        except Exception as exception_message:
+            self.logger.error("%s: Error submitting to Jamf. [%s]" % (logs.caller(), exception_message))
+            self.status_label.configure(style='Warning.TLabel')
+            self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
+            return
 
+        def submitted(response):
+            self.logger.info("%s: submitted." % logs.caller())
             #
-            # comminicating with the Jamf database and putting the XML structure
-            opener = urllib2.build_opener(urllib2.HTTPHandler)
-            request = urllib2.Request(jamf_url, data=ET.tostring(top))
-            base64string = base64.b64encode('%s:%s' % (self.jamf_username, self.jamf_password))
-            request.add_header("Authorization", "Basic %s" % base64string)
-            request.add_header('Content-Type', 'text/xml')
-            request.get_method = lambda: 'PUT'
-            response = opener.open(request)
-
-            self.logger.info("%s: submitted." % inspect.stack()[0][3])
+            # Jamf now holds what was sent, later submits are measured against it
+            if self.id_string.get() == submitted_id:
+                self.record_snapshot = (submitted_id, submitted_fields)
+            self.submit_btn.configure(state='normal')
             self.status_label.configure(style='Normal.TLabel')
             self.status_string.set(str(response.code) + " Submitted.")
-            return
 
-        except urllib2.HTTPError, error:
+        def submit_failed(error):
+            self.submit_btn.configure(state='normal')
+            self.report_error('submit', error, action='submitting to')
+
+        #
+        # one submit at a time
+        self.submit_btn.configure(state='disabled')
+        self.status_label.configure(style='Normal.TLabel')
+        self.status_string.set("Submitting...")
+
+        #
+        # comminicating with the Jamf database and putting the XML structure
+        api_call = 'computers/id/' + submitted_id
+        self.worker.run('submit', lambda: self.jamf_client.put(api_call, xml_string), submitted, submit_failed)
+
+    def report_error(self, caller, error, action='querying'):
+        """
+        report an error from a Jamf call in the status bar
+        """
+        #
+        # handle various communication errors
+        if isinstance(error, urllib2.HTTPError):
             if error.code == 400:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Request error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
             elif error.code == 401:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Authorization error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
             elif error.code == 403:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Permissions error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
             elif error.code == 404:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Resource not found."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
             elif error.code == 409:
                 contents = error.read()
                 error_message = re.findall(r"Error: (.*)<", contents)
                 print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Resource conflict. " + error_message[0]))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
             else:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
+                self.logger.error("%s: HTTP code %i: %s" % (caller, error.code, "Generic error."))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-            return
-        except urllib2.URLError, error:
-            self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
+        elif isinstance(error, urllib2.URLError):
+            self.logger.error("%s: Error contacting JSS." % caller)
             self.status_label.configure(style='Warning.TLabel')
             self.status_string.set("Error contacting JSS.")
-            return
-        except Exception as exception_message:
-            self.logger.error("%s: Error submitting to Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
+        else:
+            self.logger.error("%s: Error %s Jamf. [%s]" % (caller, action, error))
             self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
-            return
+            self.status_string.set("Error %s Jamf. [%s]" % (action, error))
+
+    def update_call_summary(self):
+        """
+        show the number and latency of Jamf calls so far
+        """
+        self.call_summary_string.set(metrics.calls.summary())
+        self.root.after(CALL_SUMMARY_INTERVAL, self.update_call_summary)
+
+    def log_call_report(self, *event):
+        """
+        write the timing of every Jamf endpoint to the log
+        """
+        metrics.log_report(self.logger)
+        self.status_label.configure(style='Normal.TLabel')
+        self.status_string.set("Jamf call timings written to the log.")
+
+    def revalidate_access(self):
+        """
+        check privileges in the background, replacing the remembered access level
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        startup_token = startup.timer.begin('privileges')
+
+        def check():
+            try:
+                access = privileges.check_access(self.jamf_client, self.jamf_username, READ_PRIVILEGES, UPDATE_PRIVILEGES, self.cache, self.logger, fresh=True)
+                if access.level:
+                    privileges.remember(self.cache, self.jamf_client.jamf_hostname, self.jamf_username, self.jamf_password, access)
+                else:
+                    privileges.forget(self.cache, self.jamf_client.jamf_hostname, self.jamf_username)
+                return access
+            finally:
+                startup.timer.end(startup_token)
+
+        def revalidated(access):
+            if access.level == self.access_level:
+                self.logger.info("revalidate_access: %s access confirmed." % access.level)
+            elif not access.level:
+                self.logger.error("revalidate_access: User %r lacks appropriate privileges: %r" % (self.jamf_username, access.missing))
+                tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % access.missing)
+                self.root.destroy()
+            else:
+                self.logger.warn("revalidate_access: Access changed from %s to %s." % (self.access_level, access.level))
+                self.status_label.configure(style='Warning.TLabel')
+                self.status_string.set("Privileges changed to " + access.level + ", log in again to apply.")
+
+        def failed(error):
+            self.logger.warn("revalidate_access: Unable to confirm privileges. [%s]" % error)
+
+        self.worker.run('access', check, revalidated, failed)
+
+    def cancel_queries(self, *event):
+        """
+        stop waiting on lookups in progress, a submit is left to finish
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        canceled = 0
+        for key in ['query', 'search', 'user']:
+            canceled += self.worker.cancel(key)
+
+        if canceled:
+            self.status_label.configure(style='Normal.TLabel')
+            self.status_string.set("Canceled.")
 
     def usage(self):
         """
@@ -875,7 +1120,7 @@ class Computer(object):
         """
         #
         # this method uses the pexpect module, if you have issues with the module you'll need to remove this method.
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         try:
             #
@@ -883,7 +1128,7 @@ class Computer(object):
             password = tkSimpleDialog.askstring("Password", "Enter admin password:", show='*', parent=self.root)
 
             if not password:
-                self.logger.error("%s: Canceled Top User." % (inspect.stack()[0][3]))
+                self.logger.error("%s: Canceled Top User." % (logs.caller()))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("Canceled Top User.")
                 return
@@ -917,7 +1162,7 @@ class Computer(object):
                         exit_condition = True
 
             except Exception as exception_message:
-                self.logger.error("%s: Unknown error. [%s]" % (inspect.stack()[0][3], exception_message))
+                self.logger.error("%s: Unknown error. [%s]" % (logs.caller(), exception_message))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
                 return
@@ -1007,18 +1252,18 @@ class Computer(object):
                 # select the top user.
                 self.username_string.set(grid_sorted[0])
                 high_user_percentge = int(grid[grid_sorted[0]] * 100)
-                self.logger.info("%s: %s selected." % (inspect.stack()[0][3], self.username_string.get()))
+                self.logger.info("%s: %s selected." % (logs.caller(), self.username_string.get()))
                 self.status_label.configure(style='Normal.TLabel')
                 self.status_string.set(str(high_user_percentge) + "% user selected.")
                 return
             else:
-                self.logger.error("%s: Error selecting highest usage user, no eligible users." % (inspect.stack()[0][3]))
+                self.logger.error("%s: Error selecting highest usage user, no eligible users." % (logs.caller()))
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("Error selecting highest usage user, no eligible users")
                 return
 
         except ValueError:
-            self.logger.error("%s: Error setting Usage Mode." % (inspect.stack()[0][3]))
+            self.logger.error("%s: Error setting Usage Mode." % (logs.caller()))
             self.status_label.configure(style='Warning.TLabel')
             self.status_string.set("Error setting Usage Mode.")
             return
@@ -1043,7 +1288,7 @@ class Computer(object):
         # self.highlight_button.configure('Highlight.TButton', foreground='red')
         # ttk.Button(self.mainframe, text="Query this system", style='Highlight.TButton', command= lambda: self.query_jamf_me()).grid(column=2, row=20, padx =3, sticky=W)
 
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         if self.platform == "Mac" and self.access_level == 'full':
             self.jamf_management_btn.configure(state="normal")
@@ -1055,46 +1300,46 @@ class Computer(object):
         """
         query jamf for specific computer record
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
         self.reset_data()
 
-        try:
+        self.status_label.configure(style='Normal.TLabel')
+        self.status_string.set("ID Mode selected.")
 
-            self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("ID Mode selected.")
+        #
+        # request specific jamf computer record, it is parsed on the worker thread
+        #  and display_record is called with the result
+        api_call = 'computers/id/' + self.id_string.get()
+        self.worker.run('query', lambda: records.ComputerRecord.from_json(self.jamf_client.get_json(api_call)), self.display_record, functools.partial(self.report_error, logs.caller()))
 
-            #
-            # request specific jamf computer record
-            url = self.jamf_hostname + '/JSSResource/computers/id/' + self.id_string.get()
-            request = urllib2.Request(url)
-            request.add_header('Accept', 'application/json')
-            request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-            response = urllib2.urlopen(request)
-            response_json = json.loads(response.read())
-
-            if response.code != 200:
-                self.logger.error("%s: Error from jss" % inspect.stack()[0][3])
-                self.status_string.set("%i returned." % response.code)
-                return
+    def display_record(self, record):
+        """
+        populate display strings from a records.ComputerRecord
+        """
+        self.logger.info("%s: activated" % logs.caller())
 
+        try:
             #
             # begin populating display strings
-            self.computer_name_string.set(response_json['computer']['general']['name'])
-            self.assettag_string.set(response_json['computer']['general']['asset_tag'])
-            self.barcode_string.set(response_json['computer']['general']['barcode_1'])
-            self.username_string.set(response_json['computer']['location']['username'])
-
-            self.email_string.set(response_json['computer']['location']['email_address'])
-            self.fullname_string.set(response_json['computer']['location']['real_name'])
-            self.phone_string.set(response_json['computer']['location']['phone'])
-            self.room_string.set(response_json['computer']['location']['room'])
-            self.building_string.set(response_json['computer']['location']['building'])
-            self.position_string.set(response_json['computer']['location']['position'])
-            self.department_string.set(response_json['computer']['location']['department'])
-            self.platform = response_json['computer']['general']['platform']
-
-            self.jamf_management = response_json['computer']['general']['remote_management']['managed']
+            self.computer_name_string.set(record.name)
+            self.assettag_string.set(record.asset_tag)
+            self.barcode_string.set(record.barcode_1)
+            self.username_string.set(record.username)
+
+            self.email_string.set(record.email_address)
+            self.fullname_string.set(record.real_name)
+            self.phone_string.set(record.phone)
+            self.room_string.set(record.room)
+            self.building_string.set(record.building)
+            self.position_string.set(record.position)
+            self.department_string.set(record.department)
+            self.platform = record.platform
+
+            #
+            # submit sends only the fields that differ from this
+            self.record_snapshot = (self.id_string.get(), self.current_fields())
+
+            self.jamf_management = record.managed
 
             if self.jamf_management is True:
                 self.jamf_management_btn.configure(text="True")
@@ -1107,60 +1352,23 @@ class Computer(object):
             # if you desire to add EA's you will need to find each by parsing all of the EA's
             #
 
-            # jss_purpose_raw = response_json['computer']['extension_attributes']
-            # for ea in jss_purpose_raw:
-            #     if ea['name'] == 'EA1':
-            #         self.ea1_string.set(ea['value'])
-            #     elif ea['name'] == 'EA2':
-            #         self.ea2_string.set(ea['value'])
-            #     elif ea['name'] == 'EA3':
-            #         self.ea3_string.set(ea['value'])
+            # for ea in record.extension_attributes:
+            #     if ea.name == 'EA1':
+            #         self.ea1_string.set(ea.value)
+            #     elif ea.name == 'EA2':
+            #         self.ea2_string.set(ea.value)
+            #     elif ea.name == 'EA3':
+            #         self.ea3_string.set(ea.value)
             #
             #  etc
             #
 
             self.log_current_state()
 
-        #
-        # handle communication errors
-        except urllib2.HTTPError, error:
-            if error.code == 400:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
-            elif error.code == 401:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
-            elif error.code == 403:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
-            elif error.code == 404:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
-            elif error.code == 409:
-                contents = error.read()
-                error_message = re.findall(r"Error: (.*)<", contents)
-                print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
-            else:
-                self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-            return
-        except urllib2.URLError, error:
-            self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
-            self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("Error contacting JSS.")
-            return
         except Exception as exception_message:
-            self.logger.error("%s: Error submitting to Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
+            self.logger.error("%s: Error reading record from Jamf. [%s]" % (logs.caller(), exception_message))
             self.status_label.configure(style='Warning.TLabel')
-            self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
+            self.status_string.set("Error reading record from Jamf. [%s]" % exception_message)
             return
 
         self.status_label.configure(style='Normal.TLabel')
@@ -1171,7 +1379,7 @@ class Computer(object):
         """
         Query jamf about this particular machine
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         #
         # this method finds the UUID for the local machine
@@ -1180,153 +1388,189 @@ class Computer(object):
         # it's wasteful the first time it's called.
         if not self.local_jamf_id:
 
-            if platform.system() == 'Darwin':
-                local_uuid_raw = subprocess.check_output(["system_profiler", "SPHardwareDataType"])
-                local_uuid = re.findall(r'Hardware UUID: (.*)', local_uuid_raw)[0]
-            elif platform.system() == 'Windows':
-                local_uuid_raw = subprocess.check_output("wmic CsProduct Get UUID")
-                local_uuid_raw = local_uuid_raw.split("\r\r\n")[1]
-                local_uuid = local_uuid_raw.split(" ")[0]
-            else:
+            if platform.system() not in ['Darwin', 'Windows']:
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("Missing native UUID discovery.")
                 return
 
             #
-            # communicate with Jamf server
-            try:
-                url = self.jamf_hostname + '/JSSResource/computers/udid/' + local_uuid
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
+            # system_profiler is slow, run it along with the Jamf call
+            def lookup_local_id():
+                if platform.system() == 'Darwin':
+                    local_uuid_raw = subprocess.check_output(["system_profiler", "SPHardwareDataType"])
+                    local_uuid = re.findall(r'Hardware UUID: (.*)', local_uuid_raw)[0]
+                else:
+                    local_uuid_raw = subprocess.check_output("wmic CsProduct Get UUID")
+                    local_uuid_raw = local_uuid_raw.split("\r\r\n")[1]
+                    local_uuid = local_uuid_raw.split(" ")[0]
 
-                response = urllib2.urlopen(request)
-                response_json = json.loads(response.read())
+                response_json = self.jamf_client.get_json('computers/udid/' + local_uuid)
+                return response_json['computer']['general']['id']
 
-                #
-                # a non-200 response is bad, report and return
-                if response.code != 200:
-                    self.logger.error("%s: Error from jss" % inspect.stack()[0][3])
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("%i returned." % response.code)
-                    return
-
-                self.local_jamf_id = response_json['computer']['general']['id']
+            def found_local_id(local_jamf_id):
+                self.local_jamf_id = local_jamf_id
                 self.id_string.set(self.local_jamf_id)
+                self.query_jamf_id()
 
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 400:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
-                elif error.code == 401:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
-                elif error.code == 403:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
-                elif error.code == 404:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
-                elif error.code == 409:
-                    contents = error.read()
-                    error_message = re.findall(r"Error: (.*)<", contents)
-                    print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
-                else:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-                return
-            except urllib2.URLError, error:
-                self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error contacting JSS.")
-                return
-            except Exception as exception_message:
-                self.logger.error("%s: Error submitting to Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
-                return
+            self.status_label.configure(style='Normal.TLabel')
+            self.status_string.set("Looking up this computer.")
+            self.worker.run('query', lookup_local_id, found_local_id, functools.partial(self.report_error, logs.caller()))
 
         else:
-            self.logger.info("%s: local jamf id %r" % (inspect.stack()[0][3], self.local_jamf_id))
+            self.logger.info("%s: local jamf id %r" % (logs.caller(), self.local_jamf_id))
             self.id_string.set(self.local_jamf_id)
+            self.query_jamf_id()
 
-        self.query_jamf_id()
-
-    def populate_menu(self, menu_choice):
+    def build_menu(self, menu_choice, response_json):
         """
         builds list from static data source in jamf
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
-
         #
         # this method builds lists that can then be used to build combobox or popup menus from
         # departments, buildings, sites
-        url = self.jamf_hostname + '/JSSResource/' + menu_choice
-        request = urllib2.Request(url)
-        request.add_header('Accept', 'application/json')
-        request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-        response = urllib2.urlopen(request)
-        response_json = json.loads(response.read())
-
-        if response.code != 200:
-            self.logger.error("%s: Error from jss" % inspect.stack()[0][3])
-            return
-
         menu_items = ['None']
         for item in response_json[menu_choice]:
             menu_items.append(item.get('name'))
-        self.logger.info("%s: built menu: %r" % (inspect.stack()[0][3], menu_items))
+        self.logger.info("%s: built menu: %r" % (logs.caller(), menu_items))
         return menu_items
 
-    def populate_ea_menu(self, ea_id):
+    def populate_ea_menu(self, ea_id, on_choices):
         """
-        builds list from extension attribute in jamf
+        builds list from extension attribute in jamf, by id or name
+        on_choices(choices) is called once it is built
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
         #
         # this method builds lists that can then be used to build combobox or popup menus from EA's
-        url = self.jamf_hostname + '/JSSResource/computerextensionattributes/id/' + str(ea_id)
-        request = urllib2.Request(url)
-        request.add_header('Accept', 'application/json')
-        request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
+        # an EA is fetched in the background the first time its field is used, then cached
+        if ea_id in self.ea_menus:
+            on_choices(self.ea_menus.choices(ea_id))
+            return
 
-        response = urllib2.urlopen(request)
-        response_json = json.loads(response.read())
+        if isinstance(ea_id, basestring):
+            api_call = 'computerextensionattributes/name/' + urllib.quote(ea_id.encode('utf-8'), safe='')
+        else:
+            api_call = 'computerextensionattributes/id/' + str(ea_id)
 
-        if response.code != 200:
-            self.logger.error("%s: Error from jss" % inspect.stack()[0][3])
-            return
+        def loaded(response_json):
+            if self.ea_menus.add_definition(response_json['computer_extension_attribute']):
+                self.cache.set(self.jamf_hostname, 'menu.ea_definitions', self.ea_menus.entries())
+            choices = self.ea_menus.choices(ea_id) or ['None']
+            self.logger.info("%s: built ea: %r" % (logs.caller(), choices))
+            on_choices(choices)
 
-        choices = response_json['computer_extension_attribute']['input_type']['popup_choices']
-        choices = ['None'] + choices
-        self.logger.info("%s: built ea: %r" % (inspect.stack()[0][3], choices))
-        return choices
+        self.worker.run('ea.' + str(ea_id), lambda: self.jamf_client.get_json(api_call), loaded, functools.partial(self.report_error, logs.caller()))
+
+    def load_menus(self):
+        """
+        Load menus cached for this Jamf server
+        returns the age of the oldest, or None if any is missing
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        #
+        # EA menus are cached as their fields use them, and aren't refreshed at startup.
+        #  once stale they are dropped and fetched again when next used
+        tmp_eas = self.cache.get(self.jamf_hostname, 'menu.ea_definitions', ttl=MENU_CACHE_TTL)[0]
+        if tmp_eas is not None:
+            self.ea_menus = menus.ChoiceIndex(tmp_eas)
+
+        tmp_divisions, divisions_age = self.cache.get(self.jamf_hostname, 'menu.departments')
+        tmp_buildings, buildings_age = self.cache.get(self.jamf_hostname, 'menu.buildings')
+
+        #
+        # either menu may have been cached without the other, paint whichever is there
+        if tmp_divisions is not None:
+            self.divisions = tmp_divisions
+        if tmp_buildings is not None:
+            self.buildings = tmp_buildings
+
+        if tmp_divisions is None or tmp_buildings is None:
+            self.logger.info("%s: nothing cached for %s" % (logs.caller(), self.jamf_hostname))
+            return None
+
+        menus_age = max(divisions_age, buildings_age)
+        self.logger.info("%s: %i departments, %i buildings, %i seconds old" % (logs.caller(), len(self.divisions), len(self.buildings), menus_age))
+        return menus_age
+
+    def refresh_menus(self):
+        """
+        Reload menus from Jamf without blocking the UI
+        """
+        self.logger.info("%s: activated" % logs.caller())
+
+        startup_token = startup.timer.begin('menus')
+
+        def refresh_worker():
+            #
+            # each menu is built and cached when its own call succeeds, one that fails
+            #  (e.g. a 403 for an account without that privilege) keeps its current values
+            try:
+                results = fetch.fetch_all(self.jamf_client, ['departments', 'buildings'], logger=self.logger, partial=True)
+            finally:
+                startup.timer.end(startup_token)
+
+            refreshed = []
+            for menu_choice, result in zip(['departments', 'buildings'], results):
+                if isinstance(result, fetch.FetchError):
+                    self.logger.error("%s: Unable to refresh %s. [%s]" % (logs.caller(), menu_choice, result))
+                    refreshed.append(None)
+                    continue
+                menu_items = self.build_menu(menu_choice, result)
+                self.cache.set(self.jamf_hostname, 'menu.' + menu_choice, menu_items)
+                refreshed.append(menu_items)
+
+            if refreshed == [None, None]:
+                raise results[0]
+            startup.timer.note(departments=len(refreshed[0] or []), buildings=len(refreshed[1] or []))
+            return refreshed
+
+        self.worker.run('menus', refresh_worker, self.menus_refreshed, self.menus_failed)
+
+    def menus_refreshed(self, result):
+        """
+        Swap in refreshed menus, the current selections are kept
+        a menu that couldn't be refreshed is None and keeps its values
+        """
+        tmp_divisions, tmp_buildings = result
+        if tmp_divisions is not None:
+            self.divisions = tmp_divisions
+        if tmp_buildings is not None:
+            self.buildings = tmp_buildings
+
+        missing = [menu_name for menu_name, refreshed, menu_items in [('departments', tmp_divisions, self.divisions), ('buildings', tmp_buildings, self.buildings)] if refreshed is None and menu_items == ['None']]
+        if missing:
+            self.status_label.configure(style='Warning.TLabel')
+            self.status_string.set("Unable to load %s from Jamf." % ' and '.join(missing))
+
+        self.division_combobox['values'] = self.divisions
+        self.building_combobox['values'] = self.buildings
+        self.logger.info("%s: complete" % logs.caller())
+
+    def menus_failed(self, error):
+        """
+        Keep the cached menus, warn if there are none
+        """
+        self.logger.error("%s: Unable to refresh menus. [%s]" % (logs.caller(), error))
+        if self.divisions == ['None']:
+            self.status_label.configure(style='Warning.TLabel')
+            self.status_string.set("Unable to load departments and buildings from Jamf.")
 
     def search_string_jamf(self):
         """
         This method handles searching Jamf with a string
         """
-        self.logger.info("%s: activated" % inspect.stack()[0][3])
+        self.logger.info("%s: activated" % logs.caller())
 
-        def double_click(*event):
+        def double_click(event):
             """
             handle clicks
             """
 
             #
             # when a click occurs, parse out ID from string and call query method
+            listbox = event.widget
             selected = listbox.get(listbox.curselection())
             trim_select = re.search(r'\((.*)\)', selected).group(1)
 
@@ -1342,15 +1586,15 @@ class Computer(object):
                 self.query_jamf_id()
                 self.status_label.configure(style='Normal.TLabel')
                 self.status_string.set("Searched for ID.")
-                self.logger.info("%s: searched for ID: %r" % (inspect.stack()[0][3], self.id_string.get()))
+                self.logger.info("%s: searched for ID: %r" % (logs.caller(), self.id_string.get()))
             else:
-                self.logger.error("%s: No search string" % inspect.stack()[0][3])
+                self.logger.error("%s: No search string" % logs.caller())
                 self.status_label.configure(style='Warning.TLabel')
                 self.status_string.set("No search string entered.")
 
         else:
             self.id_string.set("")
-            self.logger.info("%s: searched for string: %r" % (inspect.stack()[0][3], self.search_string.get()))
+            self.logger.info("%s: searched for string: %r" % (logs.caller(), self.search_string.get()))
 
             #
             # erase previous displayed values
@@ -1358,165 +1602,105 @@ class Computer(object):
 
             #
             # encode special characters included in search string
-            url = self.jamf_hostname + '/JSSResource/computers/match/' + urllib.quote('*' + self.search_string.get() + '*')
-            self.logger.info("%s: searched with url: %r" % (inspect.stack()[0][3], url))
+            api_call = 'computers/match/' + urllib.quote('*' + self.search_string.get() + '*')
+            self.logger.info("%s: searched with url: %r" % (logs.caller(), self.jamf_client.url(api_call)))
 
             #
-            # communicate with Jamf server
-            try:
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(self.jamf_username + ':' + self.jamf_password))
-
-                response = urllib2.urlopen(request)
-                try:
-                    response_json = json.loads(response.read())
-                except Exception as exception_message:
-                    self.logger.error("issue parsing JSON: %r" % exception_message)
-                    return
+            # communicate with Jamf server, show_matches is called with the result
+            def show_matches(response_json):
                 #
-                # a non-200 response is bad, report and return
-                if response.code != 200:
-                    self.logger.error("%s: error from jss" % inspect.stack()[0][3])
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("%i returned." % response.code)
-                    return
+                # begin parsing data returned from Jamf
+                self.status_label.configure(style='Normal.TLabel')
+                self.status_string.set("%i matches returned." % len(response_json['computers']))
+                self.logger.info("%s: %r" % (logs.caller(), self.status_string.get()))
 
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 400:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Request error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Request error."))
-                elif error.code == 401:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Authorization error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Authorization error."))
-                elif error.code == 403:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Permissions error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Permissions error."))
-                elif error.code == 404:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource not found."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource not found."))
-                elif error.code == 409:
-                    contents = error.read()
-                    error_message = re.findall(r"Error: (.*)<", contents)
-                    print("HTTP code %i: %s %s %s" % (error.code, "Resource conflict.", error_message[0], self.id_string.get()))
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Resource conflict. " + error_message[0]))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Resource conflict. " + error_message[0]))
-                else:
-                    self.logger.error("%s: HTTP code %i: %s" % (inspect.stack()[0][3], error.code, "Generic error."))
-                    self.status_label.configure(style='Warning.TLabel')
-                    self.status_string.set("HTTP code %i: %s" % (error.code, "Generic error."))
-                return
-            except urllib2.URLError, error:
-                self.logger.error("%s: Error contacting JSS." % (inspect.stack()[0][3]))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error contacting JSS.")
-                return
-            except Exception as exception_message:
-                self.logger.error("%s: Error submitting to Jamf. [%s]" % (inspect.stack()[0][3], exception_message))
-                self.status_label.configure(style='Warning.TLabel')
-                self.status_string.set("Error submitting to Jamf. [%s]" % exception_message)
-                return
+                search_font = tkFont.Font(font='TkDefaultFont')
+                match_results = []
+                max_length = 0
+                #
+                # parse each returned computer element, retaining Jamf ID and Computer name
+                # properly format value to display
+                # build a version of the computer name used to sort by
+                #  these rules are for our environment and may have no effect in yours.
+                #  if the name is in the format "labmac-1" the integer is expanded to -0001
+                #  if the name is in the format "[lost] labmac-1" the sorting name is stored as
+                #    "labmac-1a" to differentiate it from "labmac-1"
+                # the values are added to a list containing the previously processed values as
+                #   [sorting name, computer name, jamf id]
+                for node in response_json['computers']:
+                    match_id = node['id']
+                    match_name = node['name']
+                    if not match_name:
+                        match_name = "Not named."
+
+                    name_trim = match_name
 
-            #
-            # begin parsing data returned from Jamf
-            self.status_label.configure(style='Normal.TLabel')
-            self.status_string.set("%i matches returned." % len(response_json['computers']))
-            self.logger.info("%s: %r" % (inspect.stack()[0][3], self.status_string.get()))
+                    try:
+                        number_part = re.search(r'(\d+)', name_trim).group(1)
+                        number_free = "".join([i for i in name_trim if not i.isdigit()])
+                        expanded_number = '{:04d}'.format(int(number_part))
+                        expanded_x = number_free + expanded_number
+                        name_trim = expanded_x
+                    except:
+                        pass
 
-            search_font = tkFont.Font(font='TkDefaultFont')
-            match_results = []
-            max_length = 0
-            #
-            # parse each returned computer element, retaining Jamf ID and Computer name
-            # properly format value to display
-            # build a version of the computer name used to sort by
-            #  these rules are for our environment and may have no effect in yours.
-            #  if the name is in the format "labmac-1" the integer is expanded to -0001
-            #  if the name is in the format "[lost] labmac-1" the sorting name is stored as
-            #    "labmac-1a" to differentiate it from "labmac-1"
-            # the values are added to a list containing the previously processed values as
-            #   [sorting name, computer name, jamf id]
-            for node in response_json['computers']:
-                match_id = node['id']
-                match_name = node['name']
-                if not match_name:
-                    match_name = "Not named."
-
-                name_trim = match_name
+                    if "[" in name_trim:
+                        name_trim = re.search(r']([ -]*)(.*)', name_trim).group(2)
+                        name_trim = str(name_trim) + "a"
 
-                try:
-                    number_part = re.search(r'(\d+)', name_trim).group(1)
-                    number_free = "".join([i for i in name_trim if not i.isdigit()])
-                    expanded_number = '{:04d}'.format(int(number_part))
-                    expanded_x = number_free + expanded_number
-                    name_trim = expanded_x
-                except:
-                    pass
-
-                if "[" in name_trim:
-                    name_trim = re.search(r']([ -]*)(.*)', name_trim).group(2)
-                    name_trim = str(name_trim) + "a"
-
-                match_results.append([name_trim, match_name, match_id])
-                (string_width, string_height) = (search_font.measure(match_name + " (" + str(match_id) + ")"), search_font.metrics("linespace"))
-                if max_length < string_width:
-                    max_length = string_width
+                    match_results.append([name_trim, match_name, match_id])
+                    (string_width, string_height) = (search_font.measure(match_name + " (" + str(match_id) + ")"), search_font.metrics("linespace"))
+                    if max_length < string_width:
+                        max_length = string_width
 
-            #
-            # if there were returned results, build and display search results window
-            #
-            #
-            # position results window next to the main window, even if it has moved
-            #  from the original location
-            # while sorting the list based on the synthetic string,
-            #  display the computer name and ID
-            # bind clicks to function
-            if match_results:
+                #
+                # if there were returned results, build and display search results window
+                #
+                #
+                # position results window next to the main window, even if it has moved
+                #  from the original location
+                # while sorting the list based on the synthetic string,
+                #  display the computer name and ID
+                # bind clicks to function
+                if match_results:
 
-                search_window = Toplevel()
+                    search_window = Toplevel()
 
-                split_geom = self.root.winfo_geometry().split("+")
-                r_h = int(split_geom[0].split("x")[0])
-                r_pos_x = int(split_geom[1])
-                r_pos_y = int(split_geom[2])
-                string_width = int(max_length + 22)
+                    split_geom = self.root.winfo_geometry().split("+")
+                    r_h = int(split_geom[0].split("x")[0])
+                    r_pos_x = int(split_geom[1])
+                    r_pos_y = int(split_geom[2])
+                    string_width = int(max_length + 22)
 
-                search_window_geo = "%ix%i+%i+%i" % (string_width, 400, (r_h + r_pos_x + 10), (r_pos_y))
-                search_window.geometry(search_window_geo)
+                    search_window_geo = "%ix%i+%i+%i" % (string_width, 400, (r_h + r_pos_x + 10), (r_pos_y))
+                    search_window.geometry(search_window_geo)
 
-                search_window.title("Search results")
+                    search_window.title("Search results")
 
-                list_frame = ttk.Frame(search_window, width=string_width, height=400, padding=(4, 0, 0, 0))
+                    list_frame = ttk.Frame(search_window, width=string_width, height=400, padding=(4, 0, 0, 0))
 
-                scrollbar = Scrollbar(list_frame)
-                scrollbar.pack(side=RIGHT, fill=Y)
+                    scrollbar = Scrollbar(list_frame)
+                    scrollbar.pack(side=RIGHT, fill=Y)
 
-                listbox = Listbox(list_frame, bd=0, yscrollcommand=scrollbar.set, selectmode=SINGLE, width=190, height=400)
-                listbox.pack()
+                    listbox = Listbox(list_frame, bd=0, yscrollcommand=scrollbar.set, selectmode=SINGLE, width=190, height=400)
+                    listbox.pack()
 
-                scrollbar.config(command=listbox.yview)
+                    scrollbar.config(command=listbox.yview)
 
-                list_frame.pack()
+                    list_frame.pack()
 
-                for item in sorted(match_results):
-                    insert_string = item[1] + " (" + str(item[2]) + ")"
-                    listbox.insert(END, insert_string)
+                    for item in sorted(match_results):
+                        insert_string = item[1] + " (" + str(item[2]) + ")"
+                        listbox.insert(END, insert_string)
 
 #                 self.saved_results.append((self.search_string.get(), match_results))
 
-                listbox.bind("<<ListboxSelect>>", double_click)
+                    listbox.bind("<<ListboxSelect>>", double_click)
 
-                search_window.mainloop()
+            self.worker.run('search', lambda: self.jamf_client.get_json(api_call), show_matches, functools.partial(self.report_error, logs.caller()))
 
 
-def login(logger):
+def login(logger, stall_seconds=watchdog.STALL_SECONDS):
     """
     if the user has proper privleges, consider them an authorized user and proceed
     """
@@ -1524,7 +1708,7 @@ def login(logger):
         """
         Read specified config file or create default data structure
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
         config_path = ''
 
         executable_name = os.path.basename(sys.argv[0])
@@ -1587,7 +1771,7 @@ def login(logger):
         """
         Create data structures from config file
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
         config_options = {}
         config_options["login"] = {}
 
@@ -1615,7 +1799,7 @@ def login(logger):
         """
         Convert data structures back into config file and write out changes.
         """
-        logger.info("%s: activated" % inspect.stack()[0][3])
+        logger.info("%s: activated" % logs.caller())
 
         hostnames.remove("https://new_server:8443")
 
@@ -1631,201 +1815,37 @@ def login(logger):
             except Exception as exception_message:
                 logger.error("Error writing configuration file [%s]. %s" % (config_path, exception_message))
 
+    @profiling.profiler.profiled('login')
     def try_login():
         """
         jamf api call for login test
         """
 
-        def call_jss(logger, api_call):
-            """
-            consolidate API calls to single function
-            pass in logger and api call.
-            """
-            logger.info("%s: activated" % inspect.stack()[0][3])
-
-            try:
-                url = jamf_hostname.get() + '/JSSResource/' + api_call
+        startup.timer.wait_end()
+        logger.info("%s: activated" % logs.caller())
 
-                logger.info("%s called with %s" % (inspect.stack()[0][3], api_call))
+        jss = client.JamfClient(jamf_hostname.get(), jamf_username.get(), jamf_password.get(), logger)
+        login_cache = cache.Cache(cache.default_path('tugboat'), logger)
 
-                request = urllib2.Request(url)
-                request.add_header('Accept', 'application/json')
-                request.add_header('Authorization', 'Basic ' + base64.b64encode(jamf_username.get() + ':' + jamf_password.get()))
-
-                response = urllib2.urlopen(request)
-
-                logger.info("Code returned: %s %s" % (response.code, api_call))
-
-                if response.code != 200:
-                    logger.error("login: Invalid response from Jamf (" + api_call + ")")
-                    tkMessageBox.showerror("Jamf login", "Invalid response from Jamf")
-                    root.destroy() # clean up after yourself!
-                    sys.exit()
-
-                response_json = json.loads(response.read())
-
-                return response_json
-
-            #
-            # handle various communication errors
-            except urllib2.HTTPError, error:
-                if error.code == 401:
-                    logger.error("%s: Invalid username or password. (%r) (%s)" % (inspect.stack()[0][3], jamf_username.get(), api_call))
-                    tkMessageBox.showerror("Jamf login", "Invalid username or password.")
-                elif error.code == 404:
-                    logger.warn("%s: JSS account not found. [%s]" % (inspect.stack()[0][3], jamf_username.get()))
-                    return None
-                else:
-                    logger.error("%s: Error communicating with JSS. %s %s" % (inspect.stack()[0][3], jamf_hostname.get(), api_call))
-                    tkMessageBox.showerror("Jamf login", "HTTP error from:\n%s" % jamf_hostname.get())
-            except urllib2.URLError:
-                logger.error("%s: Error contacting JSS: %s %s" % (inspect.stack()[0][3], jamf_hostname.get(), api_call))
-                tkMessageBox.showerror("Jamf login", "Unable to contact:\n%s" % jamf_hostname.get())
-            except Exception as exception_message:
-                # this could be so many different things... :(
-                logger.error("%s: Generic error. (%r) %s" % (inspect.stack()[0][3], exception_message, api_call))
-                tkMessageBox.showerror("Jamf login", "Generic error from %s." % jamf_hostname.get())
-
-            #
-            # handle bad condition exits here...
-            logger.error("%s: Exiting, Error calling %s" % (inspect.stack()[0][3], api_call))
-            sys.exit()
-
-        logger.info("%s: activated" % inspect.stack()[0][3])
-
-        valid_user_read = False
-        valid_user_full = False
         global access_level
+        global access_remembered
 
         try:
-
-            jss_accounts = call_jss(logger, 'accounts')
-
-            raw_ldap = call_jss(logger, 'ldapservers')
-            ldap_servers = raw_ldap['ldap_servers']
-            logger.info("JSS LDAP servers: %r" % ldap_servers)
-
-            #
-            # store list of user and group privileges
-            user_list = jss_accounts['accounts']['users']
-            group_list = jss_accounts['accounts']['groups']
-
-            #
-            # find groups on jss that have required_privileges
-            valid_full_groups = []
-            valid_read_groups = []
-
-            for item in group_list:
-                missing_ldap_read_privileges = []
-                missing_ldap_update_privileges = []
-                valid_ldap_read = False
-                valid_ldap_update = False
-
-                raw_privs = call_jss(logger, 'accounts/groupid/' + str(item['id']))
-                this_group_privs = raw_privs['group']['privileges']['jss_objects']
-
-                for read_item in read_privileges:
-                    if read_item not in this_group_privs:
-                        missing_ldap_read_privileges.append(read_item)
-                if not missing_ldap_read_privileges:
-                    valid_ldap_read = True
-
-                for update_item in update_privileges:
-                    if update_item not in this_group_privs:
-                        missing_ldap_update_privileges.append(update_item)
-                if not missing_ldap_update_privileges:
-                    valid_ldap_update = True
-
-                if valid_ldap_read and valid_ldap_update:
-                    logger.info("%s is read and update valid." % item['name'])
-                    valid_full_groups.append([item['id'], item['name']])
-
-                elif valid_ldap_read:
-                    logger.info("%s is read valid." % item['name'])
-                    valid_read_groups.append([item['id'], item['name']])
-                    logger.warn("login: Group %r lacks appropriate update privileges: %r" % (item['name'], (missing_ldap_read_privileges + missing_ldap_update_privileges)))
-
-                else:
-                    logger.error("login: Group %r lacks appropriate privileges: %r" % (item['name'], missing_ldap_read_privileges + missing_ldap_update_privileges))
-
-            #
-            # find servers with valid groups the user is a member of
-            valid_full_servers = []
-            valid_read_servers = []
-
-            for server in ldap_servers:
-                for group in valid_full_groups:
-                    raw_group_membership = call_jss(logger, 'ldapservers/id/' + str(server['id']) + '/group/' + urllib.quote(str(group[1])) + '/user/' + jamf_username.get())
-
-                    if raw_group_membership['ldap_users']:
-                        logger.info("login: %s is a member of full group %s on server %s" % (jamf_username.get(), group[1], server['name']))
-                        valid_full_servers.append(server['name'])
-
-                for group in valid_read_groups:
-                    raw_group_membership = call_jss(logger, 'ldapservers/id/' + str(server['id']) + '/group/' + urllib.quote(str(group[1])) + '/user/' + jamf_username.get())
-
-                    if raw_group_membership['ldap_users']:
-                        logger.info("login: %s is a member of read group %s on server %s" % (jamf_username.get(), group[1], server['name']))
-                        valid_read_servers.append(server['name'])
-
-            #
-            # Check user's privileges
-            user_update = False
-            user_read = False
-            missing_read_privileges = []
-            missing_update_privileges = []
-            try:
-                raw_privileges = call_jss(logger, 'accounts/username/' + jamf_username.get())
-
-                if raw_privileges:
-                    user_privileges = raw_privileges['account']['privileges']['jss_objects']
-
-                    for item in read_privileges:
-                        if item not in user_privileges:
-                            missing_read_privileges.append(item)
-
-                    if not missing_read_privileges:
-                        user_read = True
-
-                    for item in update_privileges:
-                        if item not in user_privileges:
-                            missing_update_privileges.append(item)
-
-                    if not missing_update_privileges:
-                        user_update = True
-
-                    if missing_read_privileges or missing_update_privileges:
-                        logger.warn("login: %s is missing privileges for full access: %r" % (jamf_username.get(), missing_read_privileges + missing_update_privileges))
-
-            except Exception as exception_message:
-                logger.warn("%s: Error checking user account info. (%r)" % (inspect.stack()[0][3], exception_message))
+            with startup.timer.phase('privileges'):
+                access, access_remembered = privileges.authorize(jss, jamf_username.get(), jamf_password.get(), READ_PRIVILEGES, UPDATE_PRIVILEGES, login_cache, auth_ttl, logger)
+            startup.timer.note(access_remembered=access_remembered)
 
             #
             # if all require privileges accounted for, proceed
             # else alert and fail
-            if user_read and user_update:
-                logger.info("login: valid full user login. (%r)" % jamf_username.get())
+            if access.level:
+                logger.info("login: valid %s %s login. (%r)" % (access.level, access.source, jamf_username.get()))
                 root.destroy()  # clean up after yourself!
-                access_level = 'full'
-                return
-            elif valid_full_servers:
-                logger.info("login: valid full LDAP login. (%r)" % jamf_username.get())
-                root.destroy()  # clean up after yourself!
-                access_level = 'full'
-                return
-            elif user_read:
-                logger.info("login: valid read user login. (%r)" % jamf_username.get())
-                root.destroy()  # clean up after yourself!
-                access_level = 'read-only'
-                return
-            elif valid_read_servers:
-                logger.info("login: valid read LDAP login. (%r)" % jamf_username.get())
-                root.destroy()  # clean up after yourself!
-                access_level = 'read-only'
+                access_level = access.level
                 return
             else:
-                logger.error("login: User %r lacks appropriate privileges: %r" % (jamf_username.get(), missing_privileges))
-                tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % missing_privileges)
+                logger.error("login: User %r lacks appropriate privileges: %r" % (jamf_username.get(), access.missing))
+                tkMessageBox.showerror("Jamf login", "User lacks appropriate privileges.\n%r" % access.missing)
 
         #
         # handle various communication errors
@@ -1834,32 +1854,52 @@ def login(logger):
             logger.info("Code returned: %s" % error.code)
 
             if error.code == 401:
-                logger.error("%s: Invalid username or password. (%r)" % (inspect.stack()[0][3], jamf_username.get()))
+                logger.error("%s: Invalid username or password. (%r)" % (logs.caller(), jamf_username.get()))
                 tkMessageBox.showerror("Jamf login", "Invalid username or password.")
             else:
-                logger.error("%s: Error communicating with JSS. %s" % (inspect.stack()[0][3], jamf_hostname.get()))
+                logger.error("%s: Error communicating with JSS. %s" % (logs.caller(), jamf_hostname.get()))
                 tkMessageBox.showerror("Jamf login", "HTTP error from:\n%s" % jamf_hostname.get())
         except urllib2.URLError:
-            logger.error("%s: Error contacting JSS: %s" % (inspect.stack()[0][3], jamf_hostname.get()))
+            logger.error("%s: Error contacting JSS: %s" % (logs.caller(), jamf_hostname.get()))
             tkMessageBox.showerror("Jamf login", "Unable to contact:\n%s" % jamf_hostname.get())
         except Exception as exception_message:
-            logger.error("%s: Generic error. (%r)" % (inspect.stack()[0][3], exception_message))
+            logger.error("%s: Generic error. (%r)" % (logs.caller(), exception_message))
             tkMessageBox.showerror("Jamf login", "Generic error from %s." % jamf_hostname.get())
 
         sys.exit()
 
-    #
-    # This is really important. This list contains the required rights for the fields we need to access.
-    read_privileges = ['Read Accounts', 'Read Buildings', 'Read Computers', 'Read Departments', 'Read User', 'Read LDAP Servers']
-    update_privileges = ['Update Computers', 'Update User']
+    global access_remembered
+    access_remembered = False
 
     # read or create prefs
-    preference_file, preference_path = read_create_prefs(logger)
-    hostnames = injest_prefs(logger, preference_file).split(',')
+    with startup.timer.phase('prefs'):
+        preference_file, preference_path = read_create_prefs(logger)
+        hostnames = injest_prefs(logger, preference_file).split(',')
+
+    #
+    # seconds a successful login is remembered, auth_cache_minutes = 0 checks privileges every time
+    auth_ttl = privileges.AUTH_CACHE_TTL
+    if preference_file.has_option('login', 'auth_cache_minutes'):
+        try:
+            auth_ttl = preference_file.getint('login', 'auth_cache_minutes') * 60
+        except ValueError:
+            logger.warn("Invalid auth_cache_minutes in configuration file, using %i." % (auth_ttl / 60))
+
+    #
+    # profile = true profiles the login, startup and each action, as --profile does
+    #  it is read before the login window is up, so try_login is profiled
+    if preference_file.has_option('login', 'profile'):
+        try:
+            if preference_file.getboolean('login', 'profile'):
+                profiling.profiler.start(profiling.default_directory('tugboat'), logger)
+        except ValueError:
+            logger.warn("Invalid profile in configuration file, not profiling.")
 
     if 'new_server' not in hostnames[0]:
         hostnames.append("https://new_server:8443")
 
+    login_ui = startup.timer.begin('login_ui')
+
     root = Tk()
     jamf_username = StringVar()
     jamf_password = StringVar()
@@ -1904,14 +1944,18 @@ def login(logger):
     root.bind('<Return>', lambda event: try_login())
 
     uname_entry.focus()
-    root.mainloop()
+    root.update_idletasks()
+    startup.timer.end(login_ui)
+    startup.timer.wait_begin()
+    with watchdog.watching(root, logger, stall_seconds):
+        root.mainloop()
 
     if preference_path:
         modify_prefs(logger, preference_file, preference_path, hostnames, jamf_hostname.get())
     else:
         logger.error("No path to preferences, no save attempt.")
 
-    return (jamf_hostname.get(), jamf_username.get(), jamf_password.get(), access_level)
+    return (jamf_hostname.get(), jamf_username.get(), jamf_password.get(), access_level, access_remembered)
 
 
 def main():
@@ -1920,18 +1964,47 @@ def main():
     """
     access_level = ''
 
-    logger = loggers.file_logger(name='tugboat')
+    parser = argparse.ArgumentParser(description="Edit Jamf computer records.")
+    parser.add_argument('--bulk', metavar='CSV', help="apply a CSV of updates without opening the window")
+    parser.add_argument('--results', metavar='CSV', help="where bulk results are written, and read to resume (default: next to the input)")
+    parser.add_argument('--host', help="Jamf server for --bulk, e.g. https://jamf.example.edu:8443")
+    parser.add_argument('--username', help="Jamf account for --bulk (default: current user)")
+    parser.add_argument('--concurrency', type=int, default=fetch.DEFAULT_CONCURRENCY, help="most bulk updates in flight at once")
+    parser.add_argument('--profile', metavar='DIR', nargs='?', const='', help="write cProfile stats for startup and each action to DIR (default: a timestamped directory next to the cache)")
+    parser.add_argument('--stall-seconds', type=float, default=watchdog.STALL_SECONDS, help="log the main thread's stack when the window stops responding for this long, 0 turns this off (default: %(default)s)")
+    #
+    # macOS may add a -psn_ argument when launched from the Finder
+    args, _ = parser.parse_known_args()
+
+    #
+    # file writes happen on a background thread
+    logger = logs.background(loggers.file_logger(name='tugboat'))
+    metrics.dump_at_exit(logger)
     logger.info("Running Tugboat")
     logger.info("Level: Method/function: Message")
 
-    jamf_hostname, jamf_username, jamf_password, access_level = login(logger)
+    if args.bulk:
+        if not args.host:
+            parser.error("--bulk needs --host")
+        sys.exit(bulk_update(logger, args))
+
+    #
+    # phases up to the first paint of the main window are written to a startup report
+    startup.timer.start('tugboat')
+
+    if args.profile is not None:
+        profiling.profiler.start(args.profile or profiling.default_directory('tugboat'), logger)
+
+    jamf_hostname, jamf_username, jamf_password, access_level, access_remembered = login(logger, args.stall_seconds)
     if not jamf_username:
         sys.exit(0)
 
     root = Tk()
-    my_app = Computer(root, logger, jamf_hostname, jamf_username, jamf_password, access_level)
+    with profiling.profiler.action('startup'):
+        my_app = Computer(root, logger, jamf_hostname, jamf_username, jamf_password, access_level, revalidate=access_remembered)
 
-    root.mainloop()
+    with watchdog.watching(root, logger, args.stall_seconds):
+        root.mainloop()
 
 if __name__ == '__main__':
     main()